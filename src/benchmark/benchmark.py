@@ -0,0 +1,360 @@
+from board.board import Board
+from board.geometry import get_geometry
+from game.game import Game, MOVE_ORDERINGS
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+RESULTS_VERSION = 1
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "positions.json")
+ENGINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "engine.py")
+# metrics compared against the baseline: True if higher is better
+METRICS = {"nodes_per_second": True, "leaf_evaluations_per_second": True, "seconds": False,
+           "peak_memory_bytes": False, "calls_per_second": True, "process_seconds": False}
+# searches that took less than this in the baseline are too short to compare one by one
+MIN_COMPARED_SECONDS = 0.005
+# board sizes of the scaling benchmark
+SCALING_SIZES = ((6, 7), (10, 10), (15, 15), (20, 20))
+
+
+class CountingBoard(Board):
+    """
+    Board that counts the moves played on it (= nodes searched, besides the root), the leaf evaluations and the
+    windows whose score the moves update
+    """
+    def __init__(self, rows, columns, win_length=4):
+        super().__init__(rows, columns, win_length)
+        self.moves_made = 0
+        self.evaluations = 0
+        self.window_updates = 0
+        self._cell_windows = get_geometry(rows, columns, win_length).cell_windows
+
+    def make_move(self, column, piece):
+        self.moves_made += 1
+        return super().make_move(column, piece)
+
+    def get_score(self, piece):
+        self.evaluations += 1
+        return super().get_score(piece)
+
+    def update_evaluation(self, row, column, previous_piece, piece):
+        self.window_updates += len(self._cell_windows[column * (self.get_number_of_rows + 1) + row])
+        super().update_evaluation(row, column, previous_piece, piece)
+
+
+def load_corpus(path=CORPUS):
+    """
+    Function that reads the benchmark positions
+    :param path: json file with the version, board size and positions (name, phase, moves) of the corpus
+    :return: dictionary read from the file
+    """
+    with open(path) as file:
+        return json.load(file)
+
+
+def create_board(corpus, moves, board_class=Board):
+    board = board_class(corpus["rows"], corpus["columns"])
+    for index, column in enumerate(moves):
+        board.make_move(column, 1 + index % 2)
+    return board
+
+
+def benchmark_search(corpus, position, depth, repeat):
+    """
+    Function that times minimax_alpha_beta_pruning on a position (best of repeat runs, each with a new game and
+    transposition table), then runs it once more under tracemalloc for the peak memory
+    :return: dictionary of results
+    """
+    best_time = math.inf
+    nodes = evaluations = 0
+    for _ in range(repeat):
+        board = create_board(corpus, position["moves"], CountingBoard)
+        game = Game(board, None)
+        board.moves_made = board.evaluations = 0
+        start = time.perf_counter()
+        game.minimax_alpha_beta_pruning(depth, -math.inf, math.inf, True)
+        best_time = min(best_time, time.perf_counter() - start)
+        nodes = board.moves_made + 1
+        evaluations = board.evaluations
+
+    game = Game(create_board(corpus, position["moves"]), None)
+    tracemalloc.start()
+    game.minimax_alpha_beta_pruning(depth, -math.inf, math.inf, True)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"position": position["name"], "phase": position["phase"], "depth": depth, "seconds": best_time,
+            "nodes": nodes, "nodes_per_second": nodes / best_time, "leaf_evaluations": evaluations,
+            "leaf_evaluations_per_second": evaluations / best_time, "peak_memory_bytes": peak_memory}
+
+
+def benchmark_calls(function, repeat, number=2000):
+    """
+    Function that times a function without arguments
+    :return: best number of calls per second of repeat runs
+    """
+    best_time = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        best_time = min(best_time, time.perf_counter() - start)
+    return number / best_time
+
+
+def measure_startup(repeat=3, moves=(3,), depth=5):
+    """
+    Function that times new processes of the headless engine (engine.py) answering one move, as a short lived analysis
+    process would
+    :param repeat: number of processes, the fastest one is kept
+    :param moves: position of the move
+    :param depth: search depth of the move
+    :return: dictionary with the seconds of the whole process (interpreter start included), of the imports of the
+    engine and of its move, and the number of modules the process loaded
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        command = [sys.executable, ENGINE, "--timing", "--depth", str(depth)] + [str(move) for move in moves]
+        output = subprocess.run(command, capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(ENGINE)).stdout
+        process_seconds = time.perf_counter() - start
+        if best is None or process_seconds < best["process_seconds"]:
+            timing = json.loads(output)
+            best = {"process_seconds": process_seconds, "import_seconds": timing["import_seconds"],
+                    "first_move_seconds": timing["first_move_seconds"], "modules": timing["modules"]}
+    return best
+
+
+def benchmark_scaling(sizes=SCALING_SIZES, win_length=4, repeat=3, number=2000, depth=3, seed=0):
+    """
+    Function that measures how the cost of a move grows with the board: on random half full positions of every size,
+    the time of make_move, get_winner, get_score and undo_move together, and the time per node of a minimax search
+    :param sizes: (rows, columns) of the boards
+    :param win_length:
+    :param repeat: number of runs of every measurement, the best one is kept
+    :param number: moves timed per run
+    :param depth: depth of the searches
+    :param seed: seed of the positions
+    :return: list of dictionaries, one per size, with the move and node times in microseconds and the windows updated
+    by a move (and its undo)
+    """
+    import random
+    generator = random.Random(seed)
+    results = []
+    for rows, columns in sizes:
+        board = CountingBoard(rows, columns, win_length)
+        for index in range(rows * columns // 2):   # half full, with random moves that make no line
+            piece = 1 + index % 2
+            safe = [column for column in board.get_available_locations()
+                    if not board.is_line_through(board.get_next_available_row(column), column, piece)]
+            if not safe:
+                break
+            board.make_move(generator.choice(safe), piece)
+        piece = 1 + len(board.get_moves()) % 2
+        columns_played = [board.get_available_locations()[index % len(board.get_available_locations())]
+                          for index in range(number)]
+
+        def play_moves():
+            for column in columns_played:
+                board.make_move(column, piece)
+                board.get_winner()
+                board.get_score(piece)
+                board.undo_move()
+        best_time = math.inf
+        board.window_updates = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            play_moves()
+            best_time = min(best_time, time.perf_counter() - start)
+
+        best_node_time = math.inf
+        for _ in range(repeat):
+            game = Game(board, None, 0, endgame_threshold=0)
+            board.moves_made = 0
+            start = time.perf_counter()
+            game.minimax_alpha_beta_pruning(depth, -math.inf, math.inf, piece == 2)
+            best_node_time = min(best_node_time, (time.perf_counter() - start) / max(1, board.moves_made))
+        results.append({"rows": rows, "columns": columns, "win_length": win_length,
+                        "move_microseconds": best_time / number * 1e6, "node_microseconds": best_node_time * 1e6,
+                        "window_updates_per_move": board.window_updates / (repeat * number)})
+    return results
+
+
+def benchmark_move_orderings(corpus, depth=6, orderings=MOVE_ORDERINGS, phases=None):
+    """
+    Function that compares the move orderings of the search: every position of the corpus is searched by iterative
+    deepening up to depth with each ordering (a new game and transposition table for every search)
+    :param corpus: dictionary returned by load_corpus
+    :param depth: search depth
+    :param orderings: move orderings to compare, see game.game.MOVE_ORDERINGS
+    :param phases: phases of the positions to use (opening, midgame, endgame), None for all
+    :return: list of dictionaries, one per ordering, with the nodes, seconds and rate of first move cutoffs
+    """
+    positions = [position for position in corpus["positions"] if phases is None or position["phase"] in phases]
+    results = []
+    for ordering in orderings:
+        nodes = first_move_cutoffs = cutoffs = 0
+        seconds = 0
+        for position in positions:
+            board = create_board(corpus, position["moves"], CountingBoard)
+            game = Game(board, None, search_statistics=True, move_ordering=ordering)
+            statistics = game.get_search_statistics()
+            statistics.start_move(board)
+            board.moves_made = 0
+            start = time.perf_counter()
+            game.iterative_deepening(depth)
+            seconds += time.perf_counter() - start
+            nodes += board.moves_made + 1
+            position_cutoffs = sum(statistics.beta_cutoffs) + sum(statistics.alpha_cutoffs)
+            if position_cutoffs:
+                cutoffs += position_cutoffs
+                first_move_cutoffs += statistics.get_first_move_cutoff_rate() * position_cutoffs
+        results.append({"move_ordering": ordering, "depth": depth, "nodes": nodes, "seconds": seconds,
+                        "first_move_cutoff_rate": first_move_cutoffs / cutoffs if cutoffs else None})
+    return results
+
+
+def run_benchmark(corpus, depths=(1, 2, 3, 4, 5), repeat=3, phases=None):
+    """
+    Function that runs the whole benchmark: the minimax search of every position of the corpus at every depth, and
+    the per call speed of get_score, is_winning_move, is_line_through and pick_best_move over the corpus, and the
+    startup time of the headless engine
+    :param corpus: dictionary returned by load_corpus
+    :param depths: search depths
+    :param repeat: number of runs of every measurement, the best one is kept
+    :param phases: phases of the positions to use (opening, midgame, endgame), None for all
+    :return: dictionary of results, ready to be written as json
+    """
+    positions = [position for position in corpus["positions"] if phases is None or position["phase"] in phases]
+    search = [benchmark_search(corpus, position, depth, repeat) for position in positions for depth in depths]
+
+    boards = [create_board(corpus, position["moves"]) for position in positions]
+    games = [Game(board, None) for board in boards]
+    calls = {
+        "get_score": benchmark_calls(lambda: [board.get_score(2) for board in boards], repeat) * len(boards),
+        "is_winning_move": benchmark_calls(lambda: [board.is_winning_move(1) for board in boards], repeat)
+        * len(boards),
+        "is_line_through": benchmark_calls(lambda: [board.is_line_through(0, 0, 1) for board in boards], repeat)
+        * len(boards),
+        "pick_best_move": benchmark_calls(lambda: [game.pick_best_move(2) for game in games], repeat, 200)
+        * len(games),
+    }
+
+    total_time = sum(result["seconds"] for result in search)
+    totals = {
+        "seconds": total_time,
+        "nodes_per_second": sum(result["nodes"] for result in search) / total_time,
+        "leaf_evaluations_per_second": sum(result["leaf_evaluations"] for result in search) / total_time,
+        "peak_memory_bytes": max(result["peak_memory_bytes"] for result in search),
+    }
+    return {"version": RESULTS_VERSION, "corpus_version": corpus["version"], "python": platform.python_version(),
+            "depths": list(depths), "search": search, "calls_per_second": calls, "totals": totals,
+            "startup": measure_startup(repeat)}
+
+
+def find_regressions(results, baseline, threshold):
+    """
+    Function that compares results with a baseline
+    :param results: dictionary returned by run_benchmark
+    :param baseline: results of an earlier run, with the same corpus
+    :param threshold: allowed relative change, 0.2 = 20% slower (or more memory) than the baseline
+    :return: list of messages, one for every metric that regressed past the threshold
+    """
+    if results["corpus_version"] != baseline["corpus_version"]:
+        return ["corpus version " + str(results["corpus_version"]) + " does not match the baseline's (" +
+                str(baseline["corpus_version"]) + ")"]
+    pairs = []  # (name, metric, value, baseline value)
+    for metric in ("seconds", "nodes_per_second", "leaf_evaluations_per_second", "peak_memory_bytes"):
+        pairs.append(("totals", metric, results["totals"][metric], baseline["totals"][metric]))
+    baseline_search = {(result["position"], result["depth"]): result for result in baseline["search"]}
+    for result in results["search"]:
+        old = baseline_search.get((result["position"], result["depth"]))
+        if old is not None and old["seconds"] >= MIN_COMPARED_SECONDS:
+            name = result["position"] + " depth " + str(result["depth"])
+            pairs.append((name, "nodes_per_second", result["nodes_per_second"], old["nodes_per_second"]))
+    for function, value in results["calls_per_second"].items():
+        if function in baseline["calls_per_second"]:
+            pairs.append((function, "calls_per_second", value, baseline["calls_per_second"][function]))
+    if "startup" in results and "startup" in baseline:     # older results have no startup time
+        pairs.append(("startup", "process_seconds", results["startup"]["process_seconds"],
+                      baseline["startup"]["process_seconds"]))
+
+    regressions = []
+    for name, metric, value, old_value in pairs:
+        if METRICS[metric]:
+            regressed = value < old_value * (1 - threshold)
+        else:
+            regressed = value > old_value * (1 + threshold)
+        if regressed:
+            regressions.append("%s %s: %.6g (baseline %.6g)" % (name, metric, value, old_value))
+    return regressions
+
+
+def print_results(results):
+    print("%-12s %5s %10s %10s %14s %12s" % ("position", "depth", "ms", "nodes", "nodes/s", "peak bytes"))
+    for result in results["search"]:
+        print("%-12s %5d %10.2f %10d %14.0f %12d" % (result["position"], result["depth"], result["seconds"] * 1000,
+                                                     result["nodes"], result["nodes_per_second"],
+                                                     result["peak_memory_bytes"]))
+    for function, value in results["calls_per_second"].items():
+        print("%s: %.0f calls/s" % (function, value))
+    startup = results["startup"]
+    print("engine startup: %.1f ms process, %.1f ms imports, %.1f ms first move, %d modules" % (
+        startup["process_seconds"] * 1000, startup["import_seconds"] * 1000, startup["first_move_seconds"] * 1000,
+        startup["modules"]))
+    totals = results["totals"]
+    print("total: %.3fs, %.0f nodes/s, %.0f leaf evaluations/s" % (totals["seconds"], totals["nodes_per_second"],
+                                                                   totals["leaf_evaluations_per_second"]))
+
+
+if __name__ == "__main__":
+    # python -m benchmark.benchmark [--depths 1 2 3 4 5] [--output results.json] [--baseline baseline.json]
+    import argparse
+
+    arguments = argparse.ArgumentParser(description="Benchmark the Connect Four engine")
+    arguments.add_argument("--corpus", default=CORPUS)
+    arguments.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3, 4, 5])
+    arguments.add_argument("--phases", nargs="+", choices=["opening", "midgame", "endgame"], default=None)
+    arguments.add_argument("--repeat", type=int, default=3)
+    arguments.add_argument("--output", help="write the results to this json file")
+    arguments.add_argument("--baseline", help="fail if the results regressed against this json file")
+    arguments.add_argument("--threshold", type=float, default=0.2)
+    arguments.add_argument("--scaling", action="store_true", help="only measure the cost of a move by board size")
+    arguments.add_argument("--win-length", type=int, default=4, help="win length of the --scaling boards")
+    arguments.add_argument("--orderings", type=int, metavar="DEPTH",
+                           help="only compare the move orderings, searching the positions up to this depth")
+    options = arguments.parse_args()
+
+    if options.orderings:
+        print("%-8s %10s %10s %20s" % ("ordering", "nodes", "ms", "first move cutoffs"))
+        for ordering in benchmark_move_orderings(load_corpus(options.corpus), options.orderings,
+                                                 phases=options.phases):
+            print("%-8s %10d %10.1f %19.1f%%" % (ordering["move_ordering"], ordering["nodes"],
+                                                 ordering["seconds"] * 1000,
+                                                 (ordering["first_move_cutoff_rate"] or 0) * 100))
+        sys.exit(0)
+
+    if options.scaling:
+        print("%-8s %10s %12s %12s %15s" % ("board", "win length", "move us", "node us", "window updates"))
+        for size in benchmark_scaling(win_length=options.win_length, repeat=options.repeat):
+            print("%-8s %10d %12.2f %12.2f %15.1f" % ("%dx%d" % (size["rows"], size["columns"]), size["win_length"],
+                                                      size["move_microseconds"], size["node_microseconds"],
+                                                      size["window_updates_per_move"]))
+        sys.exit(0)
+
+    benchmark_results = run_benchmark(load_corpus(options.corpus), options.depths, options.repeat, options.phases)
+    print_results(benchmark_results)
+    if options.output:
+        with open(options.output, "w") as output:
+            json.dump(benchmark_results, output, indent=2)
+    if options.baseline:
+        with open(options.baseline) as baseline_file:
+            found = find_regressions(benchmark_results, json.load(baseline_file), options.threshold)
+        for message in found:
+            print("REGRESSION " + message)
+        sys.exit(1 if found else 0)
@@ -0,0 +1,85 @@
+from board.board import Board
+from board.geometry import get_geometry
+import numpy as np
+
+_batch_tables = {}
+
+
+def get_batch_tables(rows, columns, win_length=4):
+    """
+    Function that converts the window geometry and pattern scores of a board size to NumPy arrays, once per size
+    :param rows:
+    :param columns:
+    :param win_length:
+    :return: tuple of (cells, negative_diagonals, scores): the (windows, win_length) matrix indices of the cells of
+    every window, the (windows,) negative diagonal flags and the (2 pieces, 2 flags, codes) pattern scores
+    """
+    tables = _batch_tables.get((rows, columns, win_length))
+    if tables is None:
+        geometry = get_geometry(rows, columns, win_length)
+        cells = np.array([[(cell % (rows + 1)) * columns + cell // (rows + 1) for cell in window]
+                          for window in geometry.windows], dtype=np.int64).reshape(-1, win_length)
+        negative_diagonals = np.array(geometry.negative_diagonals, dtype=np.int64)
+        pattern_scores = Board(rows, columns, win_length).get_pattern_scores()
+        scores = np.array([[pattern_scores[flag][piece] for flag in range(2)] for piece in range(2)], dtype=np.int64)
+        tables = (cells, negative_diagonals, scores)
+        _batch_tables[(rows, columns, win_length)] = tables
+    return tables
+
+
+def evaluate_boards(boards, win_length=4):
+    """
+    Function that computes Board.get_score of many positions in one call: the cells of every window of every board
+    are gathered at once, encoded like Board's window codes and looked up in the pattern score tables
+    :param boards: (positions, rows, columns) array of pieces, row 0 being the bottom row as in Board.get_matrix()
+    :param win_length:
+    :return: (positions, 2) array of the scores of the player (piece 1) and of the computer (piece 2)
+    """
+    boards = np.asarray(boards)
+    number_of_positions, rows, columns = boards.shape
+    cells, negative_diagonals, scores = get_batch_tables(rows, columns, win_length)
+    pieces = boards.reshape(number_of_positions, rows * columns)
+    # only the player's and computer's pieces are evaluated
+    digits = np.where(pieces == 1, 1, np.where(pieces == 2, win_length + 1, 0)).astype(np.int64)
+    codes = digits[:, cells].sum(axis=2)    # (positions, windows)
+    result = np.empty((number_of_positions, 2), dtype=np.int64)
+    center = boards[:, :, columns // 2]
+    for piece in range(2):
+        result[:, piece] = scores[piece][negative_diagonals, codes].sum(axis=1) + 3 * (center == piece + 1).sum(axis=1)
+    return result
+
+
+def boards_to_array(boards):
+    """
+    Function that stacks Board objects into an array for evaluate_boards
+    :param boards: list of boards of the same size
+    :return: (positions, rows, columns) array
+    """
+    return np.array([board.get_matrix() for board in boards], dtype=np.int8)
+
+
+if __name__ == "__main__":
+    # positions/sec of evaluate_boards against a loop over Board.recompute_score: python -m board.batch [positions]
+    import random
+    import sys
+    import time
+
+    number_of_positions = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    generator = random.Random(0)
+    positions = []
+    for _ in range(number_of_positions):
+        board = Board(6, 7)
+        for index in range(generator.randint(0, 30)):
+            board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+        positions.append(board)
+    array = boards_to_array(positions)
+
+    start = time.perf_counter()
+    batch_scores = evaluate_boards(array)
+    batch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scalar_scores = [(board.recompute_score(1), board.recompute_score(2)) for board in positions]
+    scalar_time = time.perf_counter() - start
+    assert batch_scores.tolist() == [list(scores) for scores in scalar_scores]
+    print("batch:  %.0f positions/s" % (number_of_positions / batch_time))
+    print("scalar: %.0f positions/s" % (number_of_positions / scalar_time))
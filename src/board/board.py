@@ -1,16 +1,97 @@
-import copy
-from texttable import Texttable
+from board.geometry import get_geometry
+import random
+
+_zobrist_keys = {}
+_pattern_scores = {}
+
+
+def get_zobrist_keys(number_of_bits, piece):
+    """
+    Function that returns the Zobrist keys of a piece: one random 64-bit number for every bit of the bitboards.
+    Keys are generated from a fixed seed and cached, so every board of the same size (in any process) uses the same keys
+    :param number_of_bits: number of bits of a bitboard = columns * (rows + 1)
+    :param piece:
+    :return: list of keys, indexed by bit
+    """
+    keys = _zobrist_keys.get((number_of_bits, piece))
+    if keys is None:
+        generator = random.Random(number_of_bits * 1000 + piece)
+        keys = [generator.getrandbits(64) for _ in range(number_of_bits)]
+        _zobrist_keys[(number_of_bits, piece)] = keys
+    return keys
 
 
 class Board:
-    def __init__(self, rows, columns):
+    """
+    Class that represents the board as bitboards: one integer per piece with a bit set for every cell that piece
+    occupies, plus a mask of all occupied cells. Bit (column * (number_of_rows + 1) + row) stands for cell (row, column);
+    the extra bit on top of every column is always 0, so shifted lines never wrap into the next column.
+    A player wins with win_length pieces in a row (4 in Connect Four)
+    """
+    def __init__(self, rows, columns, win_length=4):
         self._number_of_rows = rows
         self._number_of_columns = columns
-        self._board = []
+        self._win_length = win_length
         self._player_piece = 1
         self._computer_piece = 2
+        # what a piece adds to the code of a window: the code counts the pieces of both players
+        self._piece_digits = {self._player_piece: 1, self._computer_piece: win_length + 1}
+        self._column_height = rows + 1                  # bits used by one column (rows + 1 sentinel bit)
+        self._column_mask = (1 << rows) - 1             # bits of the playable cells of column 0
+        self._board_mask = 0                            # bits of all the playable cells of the board
+        for column in range(columns):
+            self._board_mask |= self._column_mask << (column * self._column_height)
+        # vertical, diagonal downwards, horizontal and diagonal upwards neighbours
+        self._directions = (1, self._column_height - 1, self._column_height, self._column_height + 1)
+        self._bitboards = {}
+        self._mask = 0
+        self._heights = []
+        self._available_locations = []
+        self._last_move = None
+        self._winner = None                             # cached result of get_winner(), None until computed
+        self._zobrist_keys = {}
+        self._hash = 0
+        self._mirrored_hash = 0                         # hash of the left-right mirror image of the position
+        self._moves = []                                # stack of drops, for undo_move
+        # windows of win_length cells, shared by all boards of this size
+        self._geometry = get_geometry(rows, columns, win_length)
+        self._pattern_scores = self.get_pattern_scores()
+        self._window_codes = []                         # code of the content of every window
+        self._scores = {}                               # running get_score() of player and computer
         self.create_new_board()
 
+    def get_pattern_scores(self):
+        """
+        Method that returns the score of every possible content of a window, computed once per win length with the
+        same functions get_score used to apply to the window itself, and shared by all boards. The score of a window
+        only depends on how many pieces of each player it holds, so there are (win_length + 1) ** 2 codes
+        :return: tuple indexed by the negative diagonal flag of a window, of (player scores, computer scores) lists
+        indexed by window code (player pieces + (win_length + 1) * computer pieces)
+        """
+        tables = _pattern_scores.get(self._win_length)
+        if tables is None:
+            length = self._win_length
+            tables = []
+            for compute_score in (self.compute_score, self.compute_negative_diagonal_score):
+                player_scores = []
+                computer_scores = []
+                for code in range((length + 1) ** 2):
+                    player_pieces = code % (length + 1)
+                    computer_pieces = code // (length + 1)
+                    empty_cells = length - player_pieces - computer_pieces
+                    if empty_cells < 0:     # cannot happen
+                        player_scores.append(0)
+                        computer_scores.append(0)
+                        continue
+                    group = [self._player_piece] * player_pieces + [self._computer_piece] * computer_pieces + \
+                        [0] * empty_cells
+                    player_scores.append(compute_score(group, self._player_piece))
+                    computer_scores.append(compute_score(group, self._computer_piece))
+                tables.append((player_scores, computer_scores))
+            tables = tuple(tables)
+            _pattern_scores[self._win_length] = tables
+        return tables
+
     @property
     def get_number_of_rows(self):
         return self._number_of_rows
@@ -19,22 +100,206 @@ class Board:
     def get_number_of_columns(self):
         return self._number_of_columns
 
+    @property
+    def get_win_length(self):
+        return self._win_length
+
+    def get_hash(self):
+        """
+        Method that returns the Zobrist hash of the position: the XOR of the keys of all the pieces on the board,
+        updated with every drop
+        :return: 64-bit integer
+        """
+        return self._hash
+
+    def get_mirrored_hash(self):
+        """
+        Method that returns the Zobrist hash of the left-right mirror image of the position, updated with every drop
+        like get_hash
+        :return: 64-bit integer
+        """
+        return self._mirrored_hash
+
+    def get_bitboard(self, piece):
+        return self._bitboards.get(int(piece), 0)
+
+    def get_mask(self):
+        """
+        Method that returns the bitboard of all the occupied cells
+        :return:
+        """
+        return self._mask
+
+    def get_position_key(self):
+        """
+        Method that returns a key of the position that does not depend on the order of the moves: the player's bitboard
+        plus the mask. In every column the mask is a run of 1s from the bottom, and adding the player's bits to it gives
+        a different number for every content of the column, so the key is unique (for positions holding only the
+        player's and computer's pieces, dropped from the bottom)
+        :return: integer of columns * (rows + 1) bits
+        """
+        return self._bitboards[self._player_piece] + self._mask
+
+    def get_mirrored_position_key(self):
+        """
+        Method that returns the position key of the left-right mirror image of the board
+        :return:
+        """
+        key = self.get_position_key()
+        column_bits = (1 << self._column_height) - 1
+        mirrored_key = 0
+        for column in range(self._number_of_columns):
+            column_key = (key >> (column * self._column_height)) & column_bits
+            mirrored_key |= column_key << ((self._number_of_columns - 1 - column) * self._column_height)
+        return mirrored_key
+
+    def get_canonical_key(self):
+        """
+        Method that returns the same key for a position and its mirror image: the smaller of their position keys
+        :return:
+        """
+        return min(self.get_position_key(), self.get_mirrored_position_key())
+
+    def get_number_of_empty_cells(self):
+        return self._number_of_rows * self._number_of_columns - bin(self._mask).count("1")
+
     def get_board_value(self, row, column):
-        return int(self._board[row][column])
+        position = 1 << (column * self._column_height + row)
+        if self._mask & position:
+            for piece, bits in self._bitboards.items():
+                if bits & position:
+                    return piece
+        return 0
 
     def create_new_board(self):
         """
-        Function that creates a new board as a matrix with all elements 0
+        Function that creates a new, empty board: no pieces, every column at height 0
         :return: new board
         """
-        for row in range(self._number_of_rows):
-            row = []
-            for column in range(self._number_of_columns):
-                row.append(0)
-            self._board.append(row)
+        self._bitboards = {self._player_piece: 0, self._computer_piece: 0}
+        self._mask = 0
+        self._heights = [0] * self._number_of_columns
+        self._available_locations = list(range(self._number_of_columns))
+        self._last_move = None
+        self._winner = 0
+        self._zobrist_keys = {piece: get_zobrist_keys(self._column_height * self._number_of_columns, piece)
+                              for piece in self._bitboards}
+        self._hash = 0
+        self._mirrored_hash = 0
+        self._moves = []
+        self._window_codes = [0] * len(self._geometry.windows)
+        self._scores = {self._player_piece: 0, self._computer_piece: 0}
 
     def drop_piece_on_board(self, row, column, piece):
-        self._board[row][column] = int(piece)
+        piece = int(piece)
+        previous_piece = self._set_cell(row, column, piece)
+        self._moves.append((row, column, piece, previous_piece))
+        self._last_move = (row, column, piece)
+        self._winner = None
+
+    def make_move(self, column, piece):
+        """
+        Method that drops a piece in a column, on the next available row (column must not be full)
+        :param column:
+        :param piece:
+        :return: the row the piece fell on
+        """
+        row = self._heights[column]
+        self.drop_piece_on_board(row, column, piece)
+        return row
+
+    def undo_move(self):
+        """
+        Method that takes back the last drop: the cell gets back whatever it held before (empty for a normal move)
+        :return: tuple of (row, column, piece) of the drop that was taken back
+        """
+        row, column, piece, previous_piece = self._moves.pop()
+        self._set_cell(row, column, previous_piece)
+        if self._moves:
+            self._last_move = self._moves[-1][:3]
+            self._winner = None
+        else:
+            self._last_move = None
+            self._winner = 0
+        return row, column, piece
+
+    def get_moves(self):
+        """
+        Method that returns the drops made on the board, in order
+        :return: list of tuples of (row, column, piece, previous_piece)
+        """
+        return self._moves
+
+    def _set_cell(self, row, column, piece):
+        """
+        Method that puts piece (0 = empty) on cell (row, column) and keeps the mask, heights, available columns and
+        hash up to date. It is not recorded as a move: use drop_piece_on_board or make_move for that
+        :param row:
+        :param column:
+        :param piece:
+        :return: the piece that was on the cell before
+        """
+        shift = column * self._column_height
+        mirrored_bit = (self._number_of_columns - 1 - column) * self._column_height + row
+        position = 1 << (shift + row)
+        previous_piece = 0
+        if self._mask & position:   # overwrite: remove the piece that was there before
+            for other_piece, bits in self._bitboards.items():
+                if bits & position:
+                    previous_piece = other_piece
+                    self._bitboards[other_piece] = bits & ~position
+                    self._hash ^= self._zobrist_keys[other_piece][shift + row]
+                    self._mirrored_hash ^= self._zobrist_keys[other_piece][mirrored_bit]
+            self._mask &= ~position
+        if piece != 0:
+            if piece not in self._zobrist_keys:
+                self._zobrist_keys[piece] = get_zobrist_keys(self._column_height * self._number_of_columns, piece)
+            self._bitboards[piece] = self._bitboards.get(piece, 0) | position
+            self._mask |= position
+            self._hash ^= self._zobrist_keys[piece][shift + row]
+            self._mirrored_hash ^= self._zobrist_keys[piece][mirrored_bit]
+
+        if previous_piece != piece:
+            self.update_evaluation(row, column, previous_piece, piece)
+
+        was_valid = self._heights[column] < self._number_of_rows
+        self._heights[column] = ((self._mask >> shift) & self._column_mask).bit_length()
+        if was_valid != (self._heights[column] < self._number_of_rows):  # column got filled (or emptied) to the top
+            self._available_locations = [index for index in range(self._number_of_columns)
+                                         if self._heights[index] < self._number_of_rows]
+        return previous_piece
+
+    def update_evaluation(self, row, column, previous_piece, piece):
+        """
+        Method that updates the running scores when a cell changes: for every window through the cell, change its code
+        and replace its old score with the score of the new code. Only the player's and computer's pieces are
+        evaluated, other pieces count as empty cells
+        :param row:
+        :param column:
+        :param previous_piece: piece the cell held (0 = empty)
+        :param piece: piece the cell holds now (0 = empty)
+        :return:
+        """
+        digits = self._piece_digits
+        change = digits.get(piece, 0) - digits.get(previous_piece, 0)
+        if change == 0:
+            return
+        codes = self._window_codes
+        pattern_scores = self._pattern_scores
+        player_score = self._scores[self._player_piece]
+        computer_score = self._scores[self._computer_piece]
+        for window, negative_diagonal in self._geometry.cell_windows[column * self._column_height + row]:
+            player_scores, computer_scores = pattern_scores[negative_diagonal]
+            code = codes[window]
+            new_code = code + change
+            player_score += player_scores[new_code] - player_scores[code]
+            computer_score += computer_scores[new_code] - computer_scores[code]
+            codes[window] = new_code
+        if column == self._number_of_columns // 2:  # center column
+            player_score += 3 * ((piece == self._player_piece) - (previous_piece == self._player_piece))
+            computer_score += 3 * ((piece == self._computer_piece) - (previous_piece == self._computer_piece))
+        self._scores[self._player_piece] = player_score
+        self._scores[self._computer_piece] = computer_score
 
     def is_valid_column(self, column):
         """
@@ -42,25 +307,49 @@ class Board:
         :param column:
         :return:
         """
-        return self._board[self._number_of_rows-1][column] == 0
+        return self._heights[column] < self._number_of_rows
 
     def get_next_available_row(self, column):
         """
         Check on which row of the selected column the piece will fall on
         :param column:
-        :return:
+        :return: the row, or None if the column is full
         """
-        for row in range(self._number_of_rows):
-            if self._board[row][column] == 0:
-                return row
+        if self._heights[column] < self._number_of_rows:
+            return self._heights[column]
+
+    def get_matrix(self):
+        """
+        Method that expands the bitboards into a matrix of pieces, row 0 being the bottom row
+        :return: list of rows, each a list of pieces (0 for an empty cell)
+        """
+        matrix = [[0] * self._number_of_columns for _ in range(self._number_of_rows)]
+        for piece, bits in self._bitboards.items():
+            while bits:
+                position = bits & -bits
+                index = position.bit_length() - 1
+                matrix[index % self._column_height][index // self._column_height] = piece
+                bits ^= position
+        return matrix
 
     def get_board_copy(self):
         """
         Method that returns a copy of the current board
         :return: a Board() type object representing the current state of the board
         """
-        board = Board(self._number_of_rows, self._number_of_columns)
-        board._board = copy.deepcopy(self._board)
+        board = Board(self._number_of_rows, self._number_of_columns, self._win_length)
+        board._bitboards = dict(self._bitboards)
+        board._mask = self._mask
+        board._heights = list(self._heights)
+        board._available_locations = list(self._available_locations)
+        board._last_move = self._last_move
+        board._winner = self._winner
+        board._zobrist_keys = dict(self._zobrist_keys)
+        board._hash = self._hash
+        board._mirrored_hash = self._mirrored_hash
+        board._moves = list(self._moves)
+        board._window_codes = list(self._window_codes)
+        board._scores = dict(self._scores)
         return board
 
     def to_str(self):  # ended up not using this
@@ -83,6 +372,7 @@ class Board:
         Method that converts the board to a text table format for printing
         :return:
         """
+        from texttable import Texttable     # only the text interface prints boards
         table = Texttable()
         header = [' ']
         for index in range(self.get_number_of_columns):
@@ -96,140 +386,204 @@ class Board:
         return table.draw()
 
     def is_winning_move(self, piece):
-        # Check horizontal locations for win
-        for column in range(self._number_of_columns-3):  # winning move cannot begin on last 3 columns
-            for row in range(self._number_of_rows):
-                if int(self._board[row][column]) == int(piece) and int(self._board[row][column+1]) == int(piece) \
-                   and int(self._board[row][column+2]) == int(piece) and int(self._board[row][column+3]) == int(piece):
-                    return True
+        """
+        Check if piece has win_length in a row anywhere on the board: for every direction, AND the bitboard with itself
+        shifted by one neighbour (the first cells of lines of 2), then these with themselves shifted by two neighbours
+        (lines of 4), and so on, doubling the length of the lines up to win_length
+        :param piece:
+        :return: True if piece has a line of win_length, False otherwise
+        """
+        bits = self._bitboards.get(int(piece), 0)
+        for shift in self._directions:
+            lines = bits
+            length = 1
+            while length < self._win_length and lines:
+                step = min(length, self._win_length - length)
+                lines &= lines >> (step * shift)
+                length += step
+            if lines:
+                return True
+        return False
 
-        # Check vertical locations for win
-        for column in range(self._number_of_columns):
-            for row in range(self._number_of_rows-3):  # winning move cannot begin on last 3 rows
-                if int(self._board[row][column]) == int(piece) and int(self._board[row+1][column]) == int(piece) \
-                   and int(self._board[row+2][column]) == int(piece) and int(self._board[row+3][column]) == int(piece):
-                    return True
+    def get_last_move(self):
+        """
+        Method that returns the last piece dropped on the board
+        :return: tuple of (row, column, piece), or None if no piece was dropped yet
+        """
+        return self._last_move
 
-        # Check diagonals upwards for win (positively sloped diagonals)
-        for column in range(self._number_of_columns-3):  # winning move cannot begin on last 3 columns
-            for row in range(self._number_of_rows-3):  # winning move cannot begin on last 3 rows
-                if int(self._board[row][column]) == int(piece) and int(self._board[row+1][column+1]) == int(piece) \
-                   and int(self._board[row+2][column+2]) == int(piece) and int(self._board[row+3][column+3]) == int(piece):
-                    return True
+    def get_winner(self):
+        """
+        Check if the last dropped piece completed a line of win_length. Only the lines through that cell are tested,
+        and the result is cached until the next drop
+        :return: the winning piece, or 0 if the last move did not win
+        """
+        if self._winner is None:
+            row, column, piece = self._last_move
+            self._winner = piece if self.is_line_through(row, column, piece) else 0
+        return self._winner
 
-        # Check diagonals downwards for win (negatively sloped diagonals)
-        for column in range(self._number_of_columns-3):  # winning move cannot begin on last 3 columns
-            for row in range(3, self._number_of_rows):  # winning move cannot begin on first 3 rows
-                if int(self._board[row][column]) == int(piece) and int(self._board[row-1][column+1]) == int(piece) \
-                   and int(self._board[row-2][column+2]) == int(piece) and int(self._board[row-3][column+3]) == int(piece):
+    def is_line_through(self, row, column, piece):
+        """
+        Check if cell (row, column) is part of a line of win_length pieces of the given piece (the cell itself is counted
+        as holding the piece): look for a window through the cell whose code, with the cell's digit replaced by the
+        piece's, is win_length times that digit. Other pieces than the player's and computer's are not in the window
+        codes, so for them walk from the cell in both senses of every direction, counting consecutive pieces
+        :param row:
+        :param column:
+        :param piece:
+        :return: True if there is a line of win_length through the cell, False otherwise
+        """
+        piece = int(piece)
+        index = column * self._column_height + row
+        digit = self._piece_digits.get(piece)
+        if digit is not None:
+            codes = self._window_codes
+            change = digit - self._piece_digits.get(self.get_board_value(row, column), 0)
+            line_code = self._win_length * digit
+            for window, negative_diagonal in self._geometry.cell_windows[index]:
+                if codes[window] + change == line_code:
                     return True
+            return False
+
+        bits = self._bitboards.get(piece, 0)
+        for shift in self._directions:
+            count = 1
+            position = index + shift
+            while count < self._win_length and (bits >> position) & 1:
+                count += 1
+                position += shift
+            position = index - shift
+            while count < self._win_length and position >= 0 and (bits >> position) & 1:
+                count += 1
+                position -= shift
+            if count == self._win_length:
+                return True
+        return False
 
     def is_board_full(self):
         """
         Method that checks is board is full = no more available moves -> draw
         :return:
         """
-        for row in range(self._number_of_rows):
-            for column in range(self._number_of_columns):
-                if int(self.get_board_value(row, column)) == 0:
-                    return False  # found first empty position, so board is not full
-        return True
+        return self._mask == self._board_mask
 
     """
     Functions for Minimax Algorithm 
     """
     def get_available_locations(self):
         """
-        Method that creates and returns a list of all possible locations of a move = all columns that are not completely
-        filled
+        Method that returns a list of all possible locations of a move = all columns that are not completely
+        filled (kept up to date by drop_piece_on_board, so callers must not modify it)
         :return:
         """
-        valid_locations = []
-        for column in range(self._number_of_columns):
-            if self.is_valid_column(column):
-                valid_locations.append(column)
-        return valid_locations
+        return self._available_locations
 
     def compute_score(self, group, piece):
         """
-        Evaluate each group of 4 pieces and compute score
+        Evaluate each group of win_length pieces and compute score
         """
         if int(piece) == int(self._player_piece):   # figure out which is the opponent
             opponent_piece = int(self._computer_piece)
         else:
             opponent_piece = int(self._player_piece)
 
+        length = self._win_length
         score = 0
-        if int(group.count(piece)) == 4:        # if we have a group of 4 in a row, that's great so we increase score by 100
+        if int(group.count(piece)) == length:        # if we have a group of 4 in a row, that's great so we increase score by 100
             score += 100
-        elif int(group.count(piece)) == 3 and int(group.count(0)) == 1:  # if we have a group of 3 in a row, increase score by 5
+        elif int(group.count(piece)) == length - 1 and int(group.count(0)) == 1:  # if we have a group of 3 in a row, increase score by 5
             score += 5
-        elif int(group.count(piece)) == 2 and int(group.count(0)) == 2:  # if we have a group of 2 in a row, increase score by 2
+        elif int(group.count(piece)) == length - 2 and int(group.count(0)) == 2:  # if we have a group of 2 in a row, increase score by 2
             score += 2
 
         # check 3 in a row for opponent because it's more important to make a winning move than to block opponent
-        if int(group.count(opponent_piece)) == 3 and int(group.count(0)) == 1:
+        if int(group.count(opponent_piece)) == length - 1 and int(group.count(0)) == 1:
             score -= 4
         return score
 
+    def compute_negative_diagonal_score(self, group, piece):
+        """
+        Evaluate a group of win_length pieces on a negatively sloped diagonal: these only count own pieces, and 3 in a
+        row (win_length - 1) is worth more than on the other lines
+        """
+        score = 0
+        if int(group.count(piece)) == self._win_length:  # if we find 4 pieces in a row -> score increases by 100
+            score += 100
+        elif int(group.count(piece)) == self._win_length - 1 and int(group.count(0)) == 1:  # 0 means empty
+            score += 10
+        return score
+
     def get_score(self, piece):
+        """
+        Heuristic score of the board for piece. The scores of both pieces are kept up to date by every drop
+        (see update_evaluation), so this is a lookup; other pieces are scored by recompute_score
+        :param piece: piece that we are searching for (1 for player, 2 for computer)
+        :return:
+        """
+        if piece == self._player_piece or piece == self._computer_piece:
+            return self._scores[piece]
+        return self.recompute_score(piece)
+
+    def recompute_score(self, piece):
         """
         Look at current board and count how many 4, 3 and 2 s in a row we have + central column
-        In each group of 4 consecutive squares count how many empty and filled in squares there are
+        In each group of win_length consecutive squares count how many empty and filled in squares there are
+        (full scan of the board, the reference the running scores of get_score must agree with)
         :param piece: piece that we are searching for (1 for player, 2 for computer)
         :return:
         """
         score = 0
+        matrix = self.get_matrix()
 
         # Score Center column because you have way more move possibilities if you're in the centre
         center_list = []
         for row in range(self._number_of_rows):
             middle_column = self._number_of_columns//2
-            center_list.append(self.get_board_value(row, middle_column))
+            center_list.append(matrix[row][middle_column])
         center_count = center_list.count(piece)
         score += center_count * 3
 
+        length = self._win_length
+
         # Score Horizontally
         for row in range(self._number_of_rows):
             row_list = []
             for column in range(self._number_of_columns):
-                row_list.append(self.get_board_value(row, column))
+                row_list.append(matrix[row][column])
 
-            # look at each group of 4 squares
-            for column in range(self.get_number_of_columns-3):
-                group = row_list[column:column+4]
+            # look at each group of win_length squares
+            for column in range(self.get_number_of_columns - length + 1):
+                group = row_list[column:column + length]
                 score += self.compute_score(group, piece)
 
         # Score Vertically
         for column in range(self._number_of_columns):
             column_list = []
             for row in range(self._number_of_rows):
-                column_list.append(self.get_board_value(row, column))
+                column_list.append(matrix[row][column])
 
-            # look at each group of 4 squares
-            for row in range(self._number_of_rows - 3):
-                group = column_list[row:row + 4]
+            # look at each group of win_length squares
+            for row in range(self._number_of_rows - length + 1):
+                group = column_list[row:row + length]
                 score += self.compute_score(group, piece)
 
         # Score Diagonally positively sloped
-        for row in range(self._number_of_rows - 3):
-            for column in range(self._number_of_columns - 3):
-                # look at each group of 4 squares
+        for row in range(self._number_of_rows - length + 1):
+            for column in range(self._number_of_columns - length + 1):
+                # look at each group of win_length squares
                 group = []
-                for i in range(4):
-                    group.append(self.get_board_value(row + i, column + i))
+                for i in range(length):
+                    group.append(matrix[row + i][column + i])
                 score += self.compute_score(group, piece)
 
         # Score Diagonally negatively sloped
-        for row in range(self._number_of_rows - 3):
-            for column in range(self._number_of_columns - 3):
-                # look at each group of 4 squares
+        for row in range(self._number_of_rows - length + 1):
+            for column in range(self._number_of_columns - length + 1):
+                # look at each group of win_length squares
                 group = []
-                for i in range(4):
-                    group.append(self.get_board_value(row + 3 - i, column + i))
-                if int(group.count(piece)) == 4:  # if we find 4 pieces in a row -> score increases by 100
-                    score += 100
-                elif int(group.count(piece)) == 3 and int(group.count(0)) == 1:  # 0 means empty
-                    score += 10
+                for i in range(length):
+                    group.append(matrix[row + length - 1 - i][column + i])
+                score += self.compute_negative_diagonal_score(group, piece)
 
         return score
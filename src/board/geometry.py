@@ -0,0 +1,56 @@
+_geometries = {}
+
+
+class BoardGeometry:
+    """
+    Class that lists every window of a board size - every group of win_length cells in a row, horizontally, vertically
+    or on a diagonal - and indexes them by cell. Cells are bit indices of the bitboards: column * (rows + 1) + row.
+    A window's content is encoded by the number of pieces of each player in it: player pieces + (win_length + 1) *
+    computer pieces, so a cell through which at most 4 * win_length windows pass is updated in as many steps, whatever
+    the size of the board
+    """
+    def __init__(self, rows, columns, win_length=4):
+        self._column_height = rows + 1
+        self.win_length = win_length
+        self.windows = []                   # tuples of the cells of every window
+        self.negative_diagonals = []        # 1 for the windows on negatively sloped diagonals, 0 for the others
+        # for every cell: tuples of (window, negative diagonal flag)
+        self.cell_windows = [[] for _ in range(self._column_height * columns)]
+
+        # same order as Board.recompute_score
+        length = win_length
+        for row in range(rows):
+            for column in range(columns - length + 1):
+                self.add_window([(row, column + i) for i in range(length)], 0)
+        for column in range(columns):
+            for row in range(rows - length + 1):
+                self.add_window([(row + i, column) for i in range(length)], 0)
+        for row in range(rows - length + 1):
+            for column in range(columns - length + 1):
+                self.add_window([(row + i, column + i) for i in range(length)], 0)
+        for row in range(rows - length + 1):
+            for column in range(columns - length + 1):
+                self.add_window([(row + length - 1 - i, column + i) for i in range(length)], 1)
+        self.cell_windows = [tuple(windows) for windows in self.cell_windows]
+
+    def add_window(self, cells, negative_diagonal):
+        cells = [column * self._column_height + row for row, column in cells]
+        for cell in cells:
+            self.cell_windows[cell].append((len(self.windows), negative_diagonal))
+        self.windows.append(tuple(cells))
+        self.negative_diagonals.append(negative_diagonal)
+
+
+def get_geometry(rows, columns, win_length=4):
+    """
+    Function that returns the windows of a board size and win length, building them the first time they are used
+    :param rows:
+    :param columns:
+    :param win_length: number of pieces in a row that win
+    :return: BoardGeometry shared by all the boards of that size and win length
+    """
+    geometry = _geometries.get((rows, columns, win_length))
+    if geometry is None:
+        geometry = BoardGeometry(rows, columns, win_length)
+        _geometries[(rows, columns, win_length)] = geometry
+    return geometry
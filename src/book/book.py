@@ -0,0 +1,145 @@
+from board.board import Board
+from book.table import SortedTable, TableWriter
+import struct
+
+MAGIC = b"C4OB"
+VERSION = 3
+# after the key of every entry: best column, score
+ENTRY_VALUE = struct.Struct(">Bq")
+
+
+class OpeningBook:
+    """
+    Class that reads an opening book: a sorted table (book/table.py) of positions by canonical key, each with the best
+    column (for the canonical orientation of the position) and its score. The file is memory-mapped read-only the
+    first time it is needed, so processes using the same book share its pages, and positions are found by binary
+    search
+    """
+    def __init__(self, path):
+        self._table = SortedTable(path, MAGIC, VERSION, ENTRY_VALUE, "opening book")
+
+    def open(self):
+        self._table.open()
+
+    def __len__(self):
+        return len(self._table)
+
+    def probe(self, board):
+        """
+        Method that looks up the position of a board
+        :param board:
+        :return: tuple of (best_column, score), or None if the position is not in the book (or the book was built for
+        another board size or win length)
+        """
+        table = self._table
+        if not table.is_for(board):
+            return None
+        key = board.get_position_key()
+        mirrored_key = board.get_mirrored_position_key()
+        entry = table.find(min(key, mirrored_key))
+        if entry is None:
+            return None
+        column, score = entry
+        if mirrored_key < key:  # the book holds the mirror image of this position
+            column = table.get_number_of_columns - 1 - column
+        return column, score
+
+    def is_for(self, board):
+        """
+        Method that checks if the book was built for the board's size and win length
+        :param board:
+        :return:
+        """
+        return self._table.is_for(board)
+
+    def close(self):
+        self._table.close()
+
+
+def write_opening_book(path, rows, columns, entries, win_length=4):
+    """
+    Function that writes an opening book file
+    :param path:
+    :param rows:
+    :param columns:
+    :param entries: dictionary of canonical key -> (best column, score)
+    :param win_length:
+    :return:
+    """
+    with TableWriter(path, MAGIC, VERSION, rows, columns, win_length, ENTRY_VALUE) as writer:
+        for key in sorted(entries):
+            column, score = entries[key]
+            writer.write(key, (column, int(score)))
+
+
+def build_opening_book(path, rows=6, columns=7, plies=4, depth=8, transposition_table_size=1 << 20, progress=None,
+                       win_length=4):
+    """
+    Function that searches the best computer move of every position of the first plies of a game (the human moves
+    first, so the computer moves in the positions with an odd number of pieces) and writes them to an opening book.
+    A position and its mirror image are searched once
+    :param path: file to write
+    :param rows:
+    :param columns:
+    :param plies: positions with fewer pieces than this are in the book
+    :param depth: search depth of every position
+    :param transposition_table_size:
+    :param progress: function called with (number of positions searched, number of positions) after every search
+    :param win_length:
+    :return: number of positions in the book
+    """
+    from game.game import Game
+    game = Game(Board(rows, columns, win_length), None, transposition_table_size)
+    board = game.get_board
+    positions = []      # moves leading to every distinct computer position
+    seen = set()
+    level = [[]]
+    for ply in range(plies):
+        next_level = []
+        for moves in level:
+            board.create_new_board()
+            for index, column in enumerate(moves):
+                board.make_move(column, 1 + index % 2)
+            if board.get_winner() != 0 or board.is_board_full():
+                continue
+            key = board.get_canonical_key()
+            if key in seen:
+                continue
+            seen.add(key)
+            if ply % 2 == 1:
+                positions.append(moves)
+            for column in board.get_available_locations():
+                next_level.append(moves + [column])
+        level = next_level
+
+    entries = {}
+    for number, moves in enumerate(positions):
+        board.create_new_board()
+        for index, column in enumerate(moves):
+            board.make_move(column, 1 + index % 2)
+        column, score, searched_depth = game.iterative_deepening(depth)
+        if board.get_mirrored_position_key() < board.get_position_key():
+            column = columns - 1 - column
+        entries[board.get_canonical_key()] = (column, score)
+        if progress is not None:
+            progress(number + 1, len(positions))
+    write_opening_book(path, rows, columns, entries, win_length)
+    return len(entries)
+
+
+if __name__ == "__main__":
+    # python -m book.book output_file [--plies 4] [--depth 8] [--rows 6] [--columns 7]
+    import argparse
+
+    arguments = argparse.ArgumentParser(description="Build an opening book for the computer player")
+    arguments.add_argument("output")
+    arguments.add_argument("--plies", type=int, default=4)
+    arguments.add_argument("--depth", type=int, default=8)
+    arguments.add_argument("--rows", type=int, default=6)
+    arguments.add_argument("--columns", type=int, default=7)
+    arguments.add_argument("--win-length", type=int, default=4)
+    options = arguments.parse_args()
+    count = build_opening_book(options.output, options.rows, options.columns, options.plies, options.depth,
+                               progress=lambda done, total: print("\r%d/%d positions" % (done, total), end=""),
+                               win_length=options.win_length)
+    print("\nOpening book with " + str(count) + " positions written to " + options.output)
@@ -0,0 +1,195 @@
+import mmap
+import os
+import struct
+
+# magic, version, rows, columns, win length, bytes of a key, number of entries
+HEADER = struct.Struct(">4sBBBBBQ")
+
+
+def get_key_bytes(rows, columns):
+    return (columns * (rows + 1) + 7) // 8
+
+
+class TableWriter:
+    """
+    Class that writes a sorted table file: the header, then the entries, which must be written in increasing order of
+    key. The file is written under a temporary name and renamed when it is closed, so readers never see half a file
+    """
+    def __init__(self, path, magic, version, rows, columns, win_length, value):
+        """
+        :param path:
+        :param magic: 4 bytes that identify the kind of file
+        :param version: version of the kind of file
+        :param rows:
+        :param columns:
+        :param win_length: win length of the games the positions come from
+        :param value: struct.Struct of the value that follows every key
+        """
+        self._path = path
+        self._temporary_path = str(path) + ".tmp"
+        self._magic = magic
+        self._version = version
+        self._number_of_rows = rows
+        self._number_of_columns = columns
+        self._win_length = win_length
+        self._key_bytes = get_key_bytes(rows, columns)
+        self._value = value
+        self._number_of_entries = 0
+        self._file = open(self._temporary_path, "wb")
+        self._file.write(self.pack_header())
+
+    def pack_header(self):
+        return HEADER.pack(self._magic, self._version, self._number_of_rows, self._number_of_columns, self._win_length,
+                           self._key_bytes, self._number_of_entries)
+
+    @property
+    def get_key_bytes(self):
+        return self._key_bytes
+
+    @property
+    def get_number_of_entries(self):
+        return self._number_of_entries
+
+    def write(self, key, values):
+        """
+        Method that adds an entry
+        :param key: integer key, or key bytes as read from another table of the same size
+        :param values: fields of the value
+        :return:
+        """
+        if isinstance(key, int):
+            key = key.to_bytes(self._key_bytes, "big")
+        self._file.write(key)
+        self._file.write(self._value.pack(*values))
+        self._number_of_entries += 1
+
+    def close(self):
+        """
+        Method that writes the number of entries in the header and puts the file in place
+        :return: number of entries
+        """
+        self._file.seek(0)
+        self._file.write(self.pack_header())
+        self._file.close()
+        os.replace(self._temporary_path, self._path)
+        return self._number_of_entries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        if exception_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._temporary_path)
+
+
+class SortedTable:
+    """
+    Class that reads a sorted table file: a header, then fixed size entries - a big-endian key of get_key_bytes bytes
+    and a value - sorted by key. The file is memory-mapped read-only the first time it is needed, so processes
+    reading the same file share its pages, and keys are found by binary search
+    """
+    def __init__(self, path, magic, version, value, name):
+        """
+        :param path:
+        :param magic: 4 bytes the file must start with
+        :param version: version the file must have
+        :param value: struct.Struct of the value that follows every key
+        :param name: kind of file, for the error messages
+        """
+        self._path = path
+        self._magic = magic
+        self._version = version
+        self._value = value
+        self._name = name
+        self._file = None
+        self._map = None
+        self._number_of_rows = 0
+        self._number_of_columns = 0
+        self._win_length = 0
+        self._key_bytes = 0
+        self._entry_size = 0
+        self._number_of_entries = 0
+
+    def open(self):
+        """
+        Method that maps the file and reads its header
+        :return:
+        """
+        self._file = open(self._path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rows, columns, win_length, key_bytes, number_of_entries = HEADER.unpack_from(self._map, 0)
+        if magic != self._magic or version != self._version:
+            self.close()
+            raise ValueError("Invalid " + self._name + " file: " + str(self._path))
+        self._number_of_rows = rows
+        self._number_of_columns = columns
+        self._win_length = win_length
+        self._key_bytes = key_bytes
+        self._entry_size = key_bytes + self._value.size
+        self._number_of_entries = number_of_entries
+
+    @property
+    def get_number_of_rows(self):
+        if self._map is None:
+            self.open()
+        return self._number_of_rows
+
+    @property
+    def get_number_of_columns(self):
+        if self._map is None:
+            self.open()
+        return self._number_of_columns
+
+    @property
+    def get_win_length(self):
+        if self._map is None:
+            self.open()
+        return self._win_length
+
+    def is_for(self, board):
+        """
+        Method that checks if the positions of the table come from games of the board's size and win length
+        :param board:
+        :return:
+        """
+        return (board.get_number_of_rows, board.get_number_of_columns, board.get_win_length) == \
+            (self.get_number_of_rows, self.get_number_of_columns, self.get_win_length)
+
+    def __len__(self):
+        if self._map is None:
+            self.open()
+        return self._number_of_entries
+
+    def find(self, key):
+        """
+        Method that looks up a key
+        :param key: integer key
+        :return: tuple of the fields of its value, or None if the key is not in the table
+        """
+        if self._map is None:
+            self.open()
+        target = key.to_bytes(self._key_bytes, "big")
+        low = 0
+        high = self._number_of_entries
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * self._entry_size
+            entry_key = self._map[offset:offset + self._key_bytes]
+            if entry_key < target:
+                low = middle + 1
+            elif entry_key > target:
+                high = middle
+            else:
+                return self._value.unpack_from(self._map, offset + self._key_bytes)
+        return None
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
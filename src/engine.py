@@ -0,0 +1,57 @@
+import time
+start_time = time.perf_counter()
+from board.board import Board
+from game.game import Game
+import sys
+import_seconds = time.perf_counter() - start_time
+
+"""
+Headless engine: prints the computer's answer to a position, without settings, user interface or optional dependencies
+(only the board and game modules are imported), for scripts and short lived analysis processes
+"""
+
+
+def get_engine_move(moves, rows=6, columns=7, search_depth=5, search_time_ms=0, transposition_table_size=65536):
+    """
+    Function that searches the computer move of a position
+    :param moves: columns played from the empty board, the human (piece 1) first
+    :param rows:
+    :param columns:
+    :param search_depth:
+    :param search_time_ms: time budget in milliseconds, 0 for no limit
+    :param transposition_table_size:
+    :return: the column
+    """
+    game = Game(Board(rows, columns), None, transposition_table_size, search_depth, search_time_ms)
+    board = game.get_board
+    for index, column in enumerate(moves):
+        board.make_move(column, 1 + index % 2)
+    try:
+        return game.get_ai_column()
+    finally:
+        game.close()
+
+
+if __name__ == "__main__":
+    # python engine.py 3 3 2 [--depth 5] [--time-ms 0] [--timing]
+    # the computer must be to move: an odd number of moves; with --timing, prints json timings instead of the column
+    import argparse
+    import json
+
+    arguments = argparse.ArgumentParser(description="Print the computer's move in a Connect Four position")
+    arguments.add_argument("moves", type=int, nargs="*", help="columns played, the human first")
+    arguments.add_argument("--rows", type=int, default=6)
+    arguments.add_argument("--columns", type=int, default=7)
+    arguments.add_argument("--depth", type=int, default=5)
+    arguments.add_argument("--time-ms", type=int, default=0)
+    arguments.add_argument("--table-size", type=int, default=65536)
+    arguments.add_argument("--timing", action="store_true", help="print the import time and the time of the move")
+    options = arguments.parse_args()
+    move_start = time.perf_counter()
+    engine_column = get_engine_move(options.moves, options.rows, options.columns, options.depth, options.time_ms,
+                                    options.table_size)
+    if options.timing:
+        print(json.dumps({"column": engine_column, "import_seconds": import_seconds,
+                          "first_move_seconds": time.perf_counter() - move_start, "modules": len(sys.modules)}))
+    else:
+        print(engine_column)
@@ -4,3 +4,17 @@ class SettingsError(Exception):
 
 class InputError(Exception):
     pass
+
+
+class RequestError(Exception):
+    """
+    Raised by the game server for a request it cannot answer; the message is sent back to the client
+    """
+    pass
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out or it is stopped
+    """
+    pass
@@ -1,14 +1,83 @@
+from exceptions.exceptions import SearchTimeout
+from game.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND, MAXIMIZING_PLAYER_KEY
 from random import shuffle
 import random
 import math
+import threading
+import time
+
+WINNING_SCORE = 100000000000
+# orders in which the minimax search tries the moves of a node. All of them try the best move of an earlier search of
+# the position (transposition table, previous iteration) first, then:
+#   none: left to right
+#   center: from the center column outwards
+#   killer: the killer moves of the ply (the last two moves that caused a cutoff at that ply), then center out
+#   history: the killer moves, then by history score (how much the move caused cutoffs before), center out among equals
+MOVE_ORDERINGS = ("none", "center", "killer", "history")
+# how the computer searches its moves with AI: the minimax search, or Monte Carlo tree search (game/mcts.py)
+MINIMAX = "minimax"
+MCTS = "mcts"
+STRATEGIES = (MINIMAX, MCTS)
+
+# the parallel search, opening book, endgame solver, ponderer, tree search and search statistics are imported when a
+# game first uses them: a game that does not pays nothing for their modules (the process pool of the parallel search
+# alone takes longer to import than the board and this module)
 
 
 class Game:
-    def __init__(self, board, board_valid):
+    def __init__(self, board, board_valid, transposition_table_size=65536, search_depth=5, search_time_ms=0,
+                 search_workers=1, opening_book=None, search_statistics=False, statistics_file=None,
+                 endgame_threshold=12, ponder=False, mirror_symmetry=True, move_ordering="history", strategy=MINIMAX,
+                 mcts_playouts=20000, mcts_rollout="random", stop_flag=None):
         self._board = board
         self._board_validator = board_valid
         self._player_piece = 1
         self._computer_piece = 2
+        self._search_depth = search_depth       # maximum depth of the iterative deepening search
+        self._search_time_ms = search_time_ms   # time budget of a computer move, 0 = no limit
+        self._search_deadline = None
+        self._search_nodes = 0
+        # set by stop_search, from another thread, and polled by every search of the game: minimax, parallel search,
+        # tree search and endgame solver. Worker processes get a multiprocessing event instead
+        self._search_stopped = stop_flag if stop_flag is not None else threading.Event()
+        # a position finds the won and lost scores of its mirror image in the transposition table. The heuristic score
+        # weighs the two diagonal directions differently, so the other scores of the mirror image are not used
+        self._mirror_symmetry = mirror_symmetry
+        self._move_ordering = move_ordering
+        columns = board.get_number_of_columns
+        self._center_order = sorted(range(columns), key=lambda column: abs(2 * column - columns + 1))
+        # killer moves of every ply, indexed by the number of moves on the board, so they stay valid for the next
+        # searches; history scores of every column, for each piece
+        self._killers = [[None, None] for _ in range(board.get_number_of_rows * columns + 1)]
+        self._history = [[0] * columns for _ in range(3)]
+        self._transposition_table = None
+        if transposition_table_size > 0:
+            self._transposition_table = TranspositionTable(transposition_table_size)
+        self._strategy = strategy
+        self._search_workers = search_workers
+        self._mcts_playouts = mcts_playouts     # playouts of a tree search move, 0 for no limit (search_time_ms only)
+        self._mcts_rollout = mcts_rollout       # see game.mcts.ROLLOUT_POLICIES
+        self._tree_search = None                # created by the first computer move, with the mcts strategy
+        self._parallel_search = None            # processes searching the root columns, None to search serially
+        if search_workers > 1 and strategy == MINIMAX:
+            from game.parallel import ParallelSearch
+            self._parallel_search = ParallelSearch(search_workers, transposition_table_size, mirror_symmetry,
+                                                   move_ordering, self._search_stopped)
+        self._opening_book = None               # file is only opened by the first computer move
+        if opening_book:
+            from book.book import OpeningBook
+            self._opening_book = OpeningBook(opening_book)
+        self._statistics = None                 # counters of the last computer move, None when disabled
+        if search_statistics or statistics_file:
+            from game.statistics import SearchStatistics
+            self._statistics = SearchStatistics()
+        self._statistics_file = statistics_file  # json lines file the statistics of every computer move are added to
+        self._endgame_threshold = endgame_threshold     # number of empty cells from which moves are solved, 0 = never
+        self._endgame_solver = None             # created by the first move of an endgame
+        self._ponderer = None                   # searches during the human's turn, None to wait idle (minimax only)
+        if ponder and strategy == MINIMAX:
+            from game.ponder import Ponderer
+            self._ponderer = Ponderer(self, search_depth)
 
     @property
     def get_board(self):
@@ -18,6 +87,43 @@ class Game:
     def get_validator(self):
         return self._board_validator
 
+    @property
+    def get_transposition_table(self):
+        return self._transposition_table
+
+    @property
+    def get_mirror_symmetry(self):
+        return self._mirror_symmetry
+
+    @property
+    def get_move_ordering(self):
+        return self._move_ordering
+
+    @property
+    def get_strategy(self):
+        return self._strategy
+
+    def get_transposition_table_size(self):
+        if self._transposition_table is None:
+            return 0
+        return self._transposition_table.get_size
+
+    def get_transposition_statistics(self):
+        """
+        Method that returns the hit/miss/collision counters of the transposition table
+        :return: dictionary of counters, or None if the table is disabled
+        """
+        if self._transposition_table is None:
+            return None
+        return self._transposition_table.get_statistics()
+
+    def get_search_statistics(self):
+        """
+        Method that returns the statistics of the last computer move
+        :return: SearchStatistics, or None if they are disabled
+        """
+        return self._statistics
+
     def move_human(self, move):
         """
         Method that handles human moves
@@ -30,52 +136,66 @@ class Game:
         else:
             return False   # chosen column is not a valid location = column is full
 
-    def move_computer_random(self):
+    def get_random_column(self):
         """
-        Method that handles computer moves: random
+        Method that chooses a random available column
         :return:
         """
         choices = []
         for column in range(int(self._board.get_number_of_columns)):
             if self._board.is_valid_column(column):
-                row = self._board.get_next_available_row(column)
-                choices.append((row, column))
+                choices.append(column)
         shuffle(choices)
-        move = choices[0]
-        self._board.drop_piece_on_board(move[0], move[1], self._computer_piece)
-        print("Computer moves on column " + str(move[1]) + " and row " + str(move[0]) + "!\n")
+        return choices[0]
 
-    def move_computer_no_ai(self):
+    def move_computer_random(self):
         """
-        Method that handles computer moves: try to win
+        Method that handles computer moves: random
+        :return:
+        """
+        self.play_computer_move(self.get_random_column())
+
+    def get_no_ai_column(self):
+        """
+        Method that chooses the column of a computer move without AI: a winning move, else a move that stops the
+        human from winning, else a random one
         :return:
         """
         # First try to win
         for column in range(int(self._board.get_number_of_columns)):  # try to find a winning move
             if self._board.is_valid_column(column):
                 row = self._board.get_next_available_row(column)
-                # simulate move
-                board = self._board.get_board_copy()
-                board.drop_piece_on_board(row, column, self._computer_piece)  # board[row][column] = 2
-                if board.is_winning_move(self._computer_piece) is True:
-                    self._board.drop_piece_on_board(row, column, self._computer_piece)
-                    print("Computer moves on column " + str(column) + " and row " + str(row) + "!\n")
-                    return
+                # check the lines the piece would complete, without dropping it
+                if self._board.is_line_through(row, column, self._computer_piece):
+                    return column
 
         # If winning is not possible, prevent human from winning
         for column in range(int(self._board.get_number_of_columns)):
             if self._board.is_valid_column(column):
                 row = self._board.get_next_available_row(column)
-                # simulate move
-                board = self._board.get_board_copy()
-                board.drop_piece_on_board(row, column, self._player_piece)  # try each move for human player
-                if board.is_winning_move(self._player_piece) is True:
-                    self._board.drop_piece_on_board(row, column, self._computer_piece)
-                    print("Computer moves on column " + str(column) + " and row " + str(row) + "!\n")
-                    return
+                # try each move for human player
+                if self._board.is_line_through(row, column, self._player_piece):
+                    return column
 
         # If previous strategies did not work, move randomly
-        self.move_computer_random()
+        return self.get_random_column()
+
+    def move_computer_no_ai(self):
+        """
+        Method that handles computer moves: try to win
+        :return:
+        """
+        self.play_computer_move(self.get_no_ai_column())
+
+    def play_computer_move(self, column):
+        """
+        Method that drops the computer's piece in a column
+        :param column:
+        :return:
+        """
+        row = int(self._board.get_next_available_row(column))
+        self._board.drop_piece_on_board(row, column, self._computer_piece)
+        print("Computer moves on column " + str(column) + " and row " + str(row) + "!\n")
 
     """
     Minimax Algorithm - look down at every branch possible and pick the one with the best score
@@ -83,12 +203,79 @@ class Game:
     def is_terminal_node(self):
         """
         terminal_node = human winning or computer winning or board is full
+        Only the last move can have ended the game, so this relies on the board's cached last-move check
+        :return:
+        """
+        return self._board.get_winner() != 0 or self._board.is_board_full()
+
+    def create_search_game(self):
+        """
+        Method that creates a game on a copy of the board, with the same search settings and transposition table, to
+        search on another thread without touching this game's board
+        :return:
+        """
+        game = Game(self._board.get_board_copy(), self._board_validator, 0, self._search_depth,
+                    endgame_threshold=0, mirror_symmetry=self._mirror_symmetry, move_ordering=self._move_ordering)
+        game._transposition_table = self._transposition_table
+        return game
+
+    def start_pondering(self):
+        """
+        Method that starts searching the answers to the human's possible moves in the background, if pondering is on;
+        the human must be to move. It is stopped by the next computer move, stop_pondering or close
         :return:
         """
-        return self._board.is_winning_move(self._player_piece) or self._board.is_winning_move(self._computer_piece) \
-               or len(self._board.get_available_locations()) == 0
+        if self._ponderer is not None and self._board.get_winner() == 0 and not self._board.is_board_full():
+            self._ponderer.start()
+
+    def stop_pondering(self):
+        if self._ponderer is not None:
+            self._ponderer.stop()
+
+    @property
+    def get_ponderer(self):
+        return self._ponderer
+
+    def solve_endgame(self):
+        """
+        Method that solves the position exactly, if there are at most endgame_threshold empty cells
+        :return: tuple of (best_column, outcome, distance) as returned by EndgameSolver.solve, or None if the position
+        is not an endgame or cannot be solved
+        """
+        if self._board.get_number_of_empty_cells() > self._endgame_threshold:
+            return None
+        rows = self._board.get_number_of_rows
+        columns = self._board.get_number_of_columns
+        if self._endgame_solver is None:
+            from game.solver import EndgameSolver
+            self._endgame_solver = EndgameSolver(rows, columns, win_length=self._board.get_win_length,
+                                                 stop_flag=self._search_stopped)
+        return self._endgame_solver.solve(self._board, self._computer_piece)
 
-    def minimax_alpha_beta_pruning(self, depth, alpha, beta, maximizingPlayer):     # fail soft version
+    def search_tree(self):
+        """
+        Method that chooses the computer move by Monte Carlo tree search, within mcts_playouts playouts and the time
+        budget of a move (search_workers processes play the playouts)
+        :return: tuple of (best_column, win rate of the move for the computer)
+        """
+        if self._tree_search is None:
+            from game.mcts import MonteCarloTreeSearch
+            self._tree_search = MonteCarloTreeSearch(self._board.get_number_of_rows,
+                                                     self._board.get_number_of_columns, self._board.get_win_length,
+                                                     self._mcts_playouts, self._search_time_ms, self._search_workers,
+                                                     self._mcts_rollout, stop_flag=self._search_stopped)
+        return self._tree_search.search(self._board, self._computer_piece)
+
+    def get_tree_search_statistics(self):
+        """
+        Method that returns what the last tree search did
+        :return: dictionary of playouts, nodes, seconds and playouts_per_second, or None if there was no tree search
+        """
+        if self._tree_search is None:
+            return None
+        return self._tree_search.get_statistics()
+
+    def minimax_alpha_beta_pruning(self, depth, alpha, beta, maximizingPlayer, first_column=None):  # fail soft version
         """
         Alpha–beta pruning applied to a standard minimax tree -> decreases the number of nodes that are evaluated by the minimax algorithm
                                                               -> search time can be limited to the 'more promising' subtree
@@ -104,57 +291,284 @@ class Game:
         :param beta: For a min node: the current best value is at most beta
         :param depth: how far we're searching
         :param maximizingPlayer: True for AI, False for human
+        :param first_column: column to search first (best move of a previous search), None to use the default order.
+        When given, the other columns are in the static order of the move ordering (without killer moves and history),
+        like the root columns of the parallel search
         :return: tuple of (best_column, best_score)
         """                                                     # MINIMAX ALGORITHM PSEUDOCODE
+        if self._search_deadline is not None:   # check the clock and the stop flag every 256 nodes
+            self._search_nodes += 1
+            if self._search_nodes & 255 == 0 and (time.perf_counter() > self._search_deadline or
+                                                  self._search_stopped.is_set()):
+                raise SearchTimeout()
+        statistics = self._statistics
+        if statistics is not None:
+            statistics.count_node(self._board)
         valid_locations = self._board.get_available_locations()
         is_terminal = self.is_terminal_node()                   # function alphabeta(node, depth, α, β, maximizingPlayer) is
 
         # static evaluation
         if depth == 0 or is_terminal:                             # if depth = 0 or node is a terminal node then
+            if statistics is not None:
+                if is_terminal:
+                    statistics.terminal_nodes += 1
+                else:
+                    statistics.leaf_evaluations += 1
             if is_terminal:                                         # return the heuristic value of node
-                if self._board.is_winning_move(self._computer_piece):  # return a VERY high score to FORCE this move
-                    return None, 100000000000
-                elif self._board.is_winning_move(self._player_piece):  # return a VERY low score to AVOID this happening
-                    return None, -100000000000
+                winner = self._board.get_winner()
+                if winner == self._computer_piece:                  # return a VERY high score to FORCE this move
+                    return None, WINNING_SCORE
+                elif winner == self._player_piece:                  # return a VERY low score to AVOID this happening
+                    return None, -WINNING_SCORE
                 else:
                     return None, 0    # game over -> board is full -> draw
             else:               # depth == 0
                 return None, self._board.get_score(self._computer_piece)
 
+        # transposition table: reuse the result of an earlier search of the same position, or the won or lost score of
+        # an earlier search of its mirror image (with the column mirrored)
+        table = self._transposition_table
+        table_column = None
+        if table is not None:
+            key = self._board.get_hash()
+            if maximizingPlayer:
+                key ^= MAXIMIZING_PLAYER_KEY
+            alpha_original = alpha
+            beta_original = beta
+            entry = table.probe(key)
+            mirrored = False
+            if entry is None and self._mirror_symmetry:
+                mirrored_key = key ^ self._board.get_hash() ^ self._board.get_mirrored_hash()
+                entry = table.probe(mirrored_key) if mirrored_key != key else None
+                if entry is not None and abs(entry[2]) >= WINNING_SCORE:
+                    mirrored = True
+                else:
+                    entry = None
+            if entry is not None:
+                entry_depth, flag, score, column = entry
+                if mirrored and column is not None:
+                    column = self._board.get_number_of_columns - 1 - column
+                if entry_depth >= depth:
+                    if flag == EXACT:
+                        if statistics is not None:
+                            statistics.transposition_cutoffs += 1
+                        return column, score
+                    elif flag == LOWER_BOUND:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if alpha >= beta:
+                        if statistics is not None:
+                            statistics.transposition_cutoffs += 1
+                        return column, score
+                table_column = column
+        valid_locations = self.order_moves(valid_locations, maximizingPlayer, (first_column, table_column),
+                                           first_column is None)
+
         if maximizingPlayer:  # computer                          # if maximizingPlayer then
             best_score = -math.inf                                # value := −∞
             best_column = random.choice(valid_locations)
             for column in valid_locations:                           # for each child of node do
-                row = self._board.get_next_available_row(column)            # value := max(value, alphabeta(child, depth − 1, α, β, FALSE))
-                board = self._board.get_board_copy()
-                board.drop_piece_on_board(row, column, self._computer_piece)    # simulate move
-                game = Game(board, self._board_validator)
-                new_score = game.minimax_alpha_beta_pruning(depth - 1, alpha, beta, False)[1]
+                self._board.make_move(column, self._computer_piece)        # value := max(value, alphabeta(child, depth − 1, α, β, FALSE))
+                new_score = self.minimax_alpha_beta_pruning(depth - 1, alpha, beta, False)[1]
+                self._board.undo_move()
                 if new_score > best_score:    # maximum
                     best_score = new_score
                     best_column = column
                 alpha = max(alpha, best_score)                         # α := max(α, value)
                 if alpha >= beta:                                      # if α ≥ β then
+                    self.add_cutoff(column, self._computer_piece, depth)
+                    if statistics is not None:
+                        statistics.count_cutoff(True, valid_locations.index(column))
                     break                                                 # break (* β cutoff *)
+            if table is not None:
+                self.store_search_result(key, depth, alpha_original, beta_original, best_column, best_score)
             return best_column, best_score                             # return value
 
         else:   # minimizingPlayer = human                             # else (* minimizing player *)
             best_score = math.inf                                 # value := +∞
             best_column = random.choice(valid_locations)
             for column in valid_locations:                           # for each child of node do
-                row = self._board.get_next_available_row(column)            # value := min(value, alphabeta(child, depth − 1, α, β, TRUE))
-                board = self._board.get_board_copy()
-                board.drop_piece_on_board(row, column, self._player_piece)      # simulate move
-                game = Game(board, self._board_validator)
-                new_score = game.minimax_alpha_beta_pruning(depth - 1, alpha, beta, True)[1]
+                self._board.make_move(column, self._player_piece)          # value := min(value, alphabeta(child, depth − 1, α, β, TRUE))
+                new_score = self.minimax_alpha_beta_pruning(depth - 1, alpha, beta, True)[1]
+                self._board.undo_move()
                 if new_score < best_score:     # minimum
                     best_score = new_score
                     best_column = column
                 beta = min(beta, best_score)                          # β := min(β, value)
                 if alpha >= beta:                                     # if β ≤ α then
+                    self.add_cutoff(column, self._player_piece, depth)
+                    if statistics is not None:
+                        statistics.count_cutoff(False, valid_locations.index(column))
                     break                                                # break (* α cutoff *)
+            if table is not None:
+                self.store_search_result(key, depth, alpha_original, beta_original, best_column, best_score)
             return best_column, best_score                            # return value
 
+    def order_moves(self, valid_locations, maximizingPlayer, first_columns=(), dynamic=True):
+        """
+        Method that puts the moves of a node in the order they are searched, see MOVE_ORDERINGS
+        :param valid_locations: available columns, left to right
+        :param maximizingPlayer: True if the computer is to move
+        :param first_columns: columns to search before the others, in this order (None items are skipped)
+        :param dynamic: False to leave out the killer moves and history scores, which depend on the earlier searches
+        :return: list of columns
+        """
+        ordering = self._move_ordering
+        if ordering != "none":
+            available = valid_locations
+            valid_locations = [column for column in self._center_order if column in available]
+            if dynamic and ordering != "center":
+                if ordering == "history":
+                    piece = self._computer_piece if maximizingPlayer else self._player_piece
+                    # reverse keeps the center out order among equal scores
+                    valid_locations.sort(key=self._history[piece].__getitem__, reverse=True)
+                killers = self._killers[len(self._board.get_moves())]
+                for killer in reversed(killers):
+                    if killer is not None and killer in available:
+                        valid_locations.remove(killer)
+                        valid_locations.insert(0, killer)
+        for column in reversed(first_columns):
+            if column is not None and column in valid_locations:
+                valid_locations = [column] + [location for location in valid_locations if location != column]
+        return valid_locations
+
+    def add_cutoff(self, column, piece, depth):
+        """
+        Method that remembers a move that caused a cutoff: it becomes the first killer move of its ply, and its history
+        score grows with the square of the depth left (cutoffs far from the leaves save the most nodes)
+        :param column:
+        :param piece: piece of the move
+        :param depth: depth left at the node
+        :return:
+        """
+        killers = self._killers[len(self._board.get_moves())]
+        if killers[0] != column:
+            killers[1] = killers[0]
+            killers[0] = column
+        self._history[piece][column] += depth * depth
+
+    def age_history(self):
+        """
+        Method that halves the history scores, so the moves of the current position weigh more than older ones
+        :return:
+        """
+        for scores in self._history:
+            for column in range(len(scores)):
+                scores[column] >>= 1
+
+    def store_search_result(self, key, depth, alpha, beta, best_column, best_score):
+        """
+        Save the result of a (fail soft) search in the transposition table, with the kind of bound it is
+        :param key: hash of the searched position
+        :param depth:
+        :param alpha: alpha the position was searched with
+        :param beta: beta the position was searched with
+        :param best_column:
+        :param best_score:
+        :return:
+        """
+        if best_score <= alpha:     # no move reached alpha: the real score is at most best_score
+            flag = UPPER_BOUND
+        elif best_score >= beta:    # cutoff: the real score is at least best_score
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._transposition_table.store(key, depth, flag, best_score, best_column)
+
+    def iterative_deepening(self, max_depth, time_ms=0):
+        """
+        Search the computer move at depth 1, 2, 3... up to max_depth, starting every search with the best column of the
+        previous one. With a time budget, a search that runs out of time is abandoned and the result of the deepest
+        completed search is returned; a new depth is not started once half of the budget is spent, because it would
+        most likely not finish. Depth 1 always completes
+        :param max_depth:
+        :param time_ms: time budget in milliseconds, 0 for no limit
+        :return: tuple of (best_column, best_score, depth) of the deepest completed search
+        """
+        start = time.perf_counter()
+        number_of_moves = len(self._board.get_moves())
+        self.age_history()
+        max_depth = max(1, min(max_depth, self._board.get_number_of_empty_cells()))
+        best_column, best_score = self.minimax_alpha_beta_pruning(1, -math.inf, math.inf, True)
+        completed_depth = 1
+        statistics = self._statistics
+        if statistics is not None:
+            statistics.add_iteration(1, time.perf_counter() - start, best_column, best_score)
+        self._search_deadline = start + time_ms / 1000 if time_ms else math.inf
+        self._search_nodes = 0
+        try:
+            for depth in range(2, max_depth + 1):
+                if abs(best_score) >= WINNING_SCORE:    # forced win or loss found, searching deeper changes nothing
+                    break
+                if self._search_stopped.is_set():
+                    break
+                if time_ms and (time.perf_counter() - start) * 2000 > time_ms:
+                    break
+                iteration_start = time.perf_counter()
+                if self._parallel_search is not None:
+                    time_left = time_ms - (time.perf_counter() - start) * 1000 if time_ms else 0
+                    root_columns = self.order_moves(self._board.get_available_locations(), True, (best_column,),
+                                                    False)
+                    best_column, best_score = self._parallel_search.search(self._board, depth, root_columns,
+                                                                           time_left)
+                else:
+                    best_column, best_score = self.minimax_alpha_beta_pruning(depth, -math.inf, math.inf, True,
+                                                                              best_column)
+                completed_depth = depth
+                if statistics is not None:
+                    statistics.add_iteration(depth, time.perf_counter() - iteration_start, best_column, best_score)
+        except SearchTimeout:
+            while len(self._board.get_moves()) > number_of_moves:   # take back the moves of the abandoned search
+                self._board.undo_move()
+        finally:
+            self._search_deadline = None
+        return best_column, best_score, completed_depth
+
+    def stop_search(self):
+        """
+        Method that makes a running computer move (on another thread) return early: iterative_deepening and the
+        parallel search return the result of the deepest search completed so far, as if their time budget had run out,
+        the tree search plays its most visited move so far and the endgame solver gives up. The next computer move
+        starts a new search normally
+        :return:
+        """
+        self._search_stopped.set()
+
+    def search_child(self, depth, alpha, beta, maximizingPlayer, time_ms=0, first_column=None):
+        """
+        Run minimax_alpha_beta_pruning with a time budget, checking the stop flag
+        :param depth:
+        :param alpha:
+        :param beta:
+        :param maximizingPlayer:
+        :param time_ms: time budget in milliseconds, 0 for no limit
+        :param first_column: column to search first, see minimax_alpha_beta_pruning
+        :return: tuple of (best_column, best_score)
+        :raises SearchTimeout: if the time ran out or the search was stopped (the board is left in the middle of the
+        search)
+        """
+        self._search_deadline = time.perf_counter() + time_ms / 1000 if time_ms else math.inf
+        self._search_nodes = 0
+        try:
+            return self.minimax_alpha_beta_pruning(depth, alpha, beta, maximizingPlayer, first_column)
+        finally:
+            self._search_deadline = None
+
+    def close(self):
+        """
+        Method that stops pondering and the processes of the parallel search or tree search and closes the opening
+        book, if any
+        :return:
+        """
+        self.stop_pondering()
+        if self._parallel_search is not None:
+            self._parallel_search.close()
+        if self._tree_search is not None:
+            self._tree_search.close()
+        if self._opening_book is not None:
+            self._opening_book.close()
+
     def pick_best_move(self, piece):
         """
         For each possible column run get_score() and pick highest score returned
@@ -165,11 +579,9 @@ class Game:
         valid_locations = self._board.get_available_locations()
         best_move = random.choice(valid_locations)
         for column in valid_locations:
-            row = self._board.get_next_available_row(column)
-            # simulate move
-            board = self._board.get_board_copy()
-            board.drop_piece_on_board(row, column, piece)
-            score = board.get_score(piece)
+            self._board.make_move(column, piece)    # simulate move
+            score = self._board.get_score(piece)
+            self._board.undo_move()
             if int(score) >= int(best_score):
                 best_score = score
                 best_move = column
@@ -181,31 +593,95 @@ class Game:
         and picking the highest one
         :return:
         """
-        move = int(self.pick_best_move(self._computer_piece))
-        row = int(self._board.get_next_available_row(move))
-        self._board.drop_piece_on_board(row, move, self._computer_piece)
-        print("Computer moves on column " + str(move) + " and row " + str(row) + "!\n")
+        self.play_computer_move(int(self.pick_best_move(self._computer_piece)))
+
+    def get_ai_column(self):
+        """
+        Method that chooses the column of a computer move with AI: the opening book move if the position is in the
+        book, otherwise creates a strategy using minimax algorithm, searching deeper while the time budget allows, or
+        Monte Carlo tree search with the mcts strategy (the win rate of its move is recorded as the score). Near the end
+        of the game (endgame_threshold empty cells or less) the position is solved exactly instead. With
+        pondering, an answer found during the human's turn is played at once if it is as deep as search_depth (or a
+        forced win or loss), and otherwise is kept if it is deeper than what the search reaches in its time budget.
+        The board is used by the search, but is back to the same position when the method returns
+        :return:
+        """
+        self._search_stopped.clear()
+        statistics = self._statistics
+        if statistics is not None:
+            statistics.start_move(self._board)
+        pondered = None
+        if self._ponderer is not None:
+            self._ponderer.stop()
+            pondered = self._ponderer.get_result(self._board)
+        solution = None
+        if self._endgame_threshold:
+            start = time.perf_counter()
+            try:
+                solution = self.solve_endgame()
+            except SearchTimeout:   # stopped: the search below only completes depth 1
+                solution = None
+            if statistics is not None:
+                statistics.add_phase_time("endgame", time.perf_counter() - start)
+        book_move = None
+        if solution is None and self._opening_book is not None:
+            start = time.perf_counter()
+            book_move = self._opening_book.probe(self._board)
+            if statistics is not None:
+                statistics.add_phase_time("book", time.perf_counter() - start)
+        if solution is not None:
+            from game.solver import WIN, LOSS
+            move, outcome, depth = solution
+            minimax_score = WINNING_SCORE if outcome == WIN else -WINNING_SCORE if outcome == LOSS else 0
+        elif book_move is not None:
+            move, minimax_score = book_move
+            depth = 0
+        elif pondered is not None and (abs(pondered[1]) >= WINNING_SCORE or pondered[2] >= min(
+                self._search_depth, self._board.get_number_of_empty_cells())):
+            move, minimax_score, depth = pondered
+        elif self._strategy == MCTS:
+            start = time.perf_counter()
+            move, minimax_score = self.search_tree()
+            depth = 0
+            if statistics is not None:
+                statistics.add_phase_time("tree search", time.perf_counter() - start)
+                tree_statistics = self._tree_search.get_statistics()
+                statistics.add_playouts(tree_statistics["playouts"], tree_statistics["seconds"])
+        else:
+            start = time.perf_counter()
+            move, minimax_score, depth = self.iterative_deepening(self._search_depth, self._search_time_ms)
+            if pondered is not None and pondered[2] > depth:
+                move, minimax_score, depth = pondered
+            if statistics is not None:
+                statistics.add_phase_time("parallel search" if self._parallel_search is not None else "search",
+                                          time.perf_counter() - start)
+        if statistics is not None:
+            statistics.finish_move(move, minimax_score, depth)
+            if self._statistics_file:
+                statistics.write(self._statistics_file)
+        return move
 
     def move_computer_ai_better(self):
         """
-        Method that handles computer moves: creates a strategy using minimax algorithm
+        Method that handles computer moves: plays the column chosen by get_ai_column
         :return:
         """
-        alpha = -math.inf
-        beta = math.inf
-        depth = 5
-        move, minimax_score = self.minimax_alpha_beta_pruning(depth, alpha, beta, True)
-        row = int(self._board.get_next_available_row(move))
-        self._board.drop_piece_on_board(row, move, self._computer_piece)
-        print("Computer moves on column " + str(move) + " and row " + str(row) + "!\n")
+        self.play_computer_move(self.get_ai_column())
+
+    def compute_computer_move(self, ai):
+        """
+        Method that chooses the next computer move - either with or without AI - without playing it, so it can run
+        on another thread than the user interface (which must not use the board until it returns)
+        :return: the column
+        """
+        if ai is True:
+            # return self.pick_best_move(self._computer_piece)
+            return self.get_ai_column()
+        return self.get_no_ai_column()
 
     def move_computer(self, ai):
         """
         Method that handles computer moves - either with or without AI
         :return:
         """
-        if ai is True:
-            # self.move_computer_ai_simple()
-            self.move_computer_ai_better()
-        else:
-            self.move_computer_no_ai()
+        self.play_computer_move(self.compute_computer_move(ai))
@@ -0,0 +1,371 @@
+from array import array
+import math
+import random
+import time
+
+RANDOM = "random"
+NO_AI = "no_ai"
+# how the moves of a playout are chosen: at random, or like the computer without AI (Game.get_no_ai_column)
+ROLLOUT_POLICIES = (RANDOM, NO_AI)
+
+# node is not the end of the game / its move won / its move filled the board
+NOT_TERMINAL = 0
+TERMINAL_WIN = 1
+TERMINAL_DRAW = 2
+
+# playouts of a worker process: kept between tasks
+_worker_playouts = None
+
+
+class Playouts:
+    """
+    Class that plays games to the end from positions given as bitboards (bit index column * (rows + 1) + row, as in
+    Board), for the rollouts of the tree search. With the random policy every move is a random available column; with
+    the no_ai policy a player takes a winning cell if there is one, else blocks a winning cell of the opponent, else
+    plays at random
+    """
+    def __init__(self, rows, columns, win_length=4, policy=RANDOM, seed=None):
+        self._column_height = rows + 1
+        self._win_length = win_length
+        self._policy = policy
+        self._random = random.Random(seed)
+        self._bottom_mask = 0
+        for column in range(columns):
+            self._bottom_mask |= 1 << (column * self._column_height)
+        self._board_mask = self._bottom_mask * ((1 << rows) - 1)
+        self._column_masks = [((1 << rows) - 1) << (column * self._column_height) for column in range(columns)]
+        self._directions = (1, self._column_height, self._column_height - 1, self._column_height + 1)
+        self._solver = None     # for its winning cells, with the no_ai policy
+        if policy == NO_AI:
+            from game.solver import EndgameSolver
+            self._solver = EndgameSolver(rows, columns, 1, win_length)
+
+    @property
+    def get_board_mask(self):
+        return self._board_mask
+
+    def seed(self, seed):
+        self._random.seed(seed)
+
+    def get_possible_moves(self, mask):
+        """
+        :param mask: bitboard of all the pieces
+        :return: bitboard with the cell of every available move
+        """
+        return (mask + self._bottom_mask) & self._board_mask
+
+    def get_column_move(self, mask, column):
+        """
+        :param mask: bitboard of all the pieces
+        :param column:
+        :return: bitboard with the cell a piece dropped in column falls on, 0 if the column is full
+        """
+        return self.get_possible_moves(mask) & self._column_masks[column]
+
+    def has_line(self, bits):
+        """
+        Check if a bitboard has win_length in a row, doubling the length of the lines like Board.is_winning_move
+        :param bits:
+        :return:
+        """
+        for shift in self._directions:
+            lines = bits
+            length = 1
+            while length < self._win_length and lines:
+                step = min(length, self._win_length - length)
+                lines &= lines >> (step * shift)
+                length += step
+            if lines:
+                return True
+        return False
+
+    def play(self, player, opponent, mask):
+        """
+        Method that plays a game to the end
+        :param player: bitboard of the pieces of the player to move
+        :param opponent: bitboard of the pieces of the other player
+        :param mask: bitboard of all the pieces
+        :return: 1 if the player to move wins, -1 if the opponent wins, 0 for a draw
+        """
+        sign = 1
+        column_masks = self._column_masks
+        choice = self._random.choice
+        while True:
+            possible = (mask + self._bottom_mask) & self._board_mask
+            if not possible:
+                return 0
+            if self._solver is not None:
+                if self._solver.get_winning_cells(player, mask) & possible:
+                    return sign
+                threats = self._solver.get_winning_cells(opponent, mask) & possible
+                if threats:
+                    move = threats & -threats
+                else:
+                    move = choice([possible & column_mask for column_mask in column_masks if possible & column_mask])
+                player |= move
+                mask |= move
+            else:
+                move = choice([possible & column_mask for column_mask in column_masks if possible & column_mask])
+                player |= move
+                mask |= move
+                if self.has_line(player):
+                    return sign
+            player, opponent = opponent, player
+            sign = -sign
+
+
+def run_playouts(rows, columns, win_length, policy, positions, seed):
+    """
+    Function run by the worker processes: play a game to the end from every position
+    :param rows:
+    :param columns:
+    :param win_length:
+    :param policy: see ROLLOUT_POLICIES
+    :param positions: list of (player, opponent, mask) bitboards, the player to move first
+    :param seed: seed of the random moves of this batch
+    :return: list of results, as returned by Playouts.play
+    """
+    global _worker_playouts
+    if _worker_playouts is None or _worker_playouts[0] != (rows, columns, win_length, policy):
+        _worker_playouts = ((rows, columns, win_length, policy), Playouts(rows, columns, win_length, policy))
+    playouts = _worker_playouts[1]
+    playouts.seed(seed)
+    return [playouts.play(player, opponent, mask) for player, opponent, mask in positions]
+
+
+class MonteCarloTreeSearch:
+    """
+    Class that chooses moves by Monte Carlo tree search with UCT: the tree of the position is grown one node per
+    playout, following at every node the child with the highest win rate plus exploration bonus, and the result of a
+    game played to the end from the new node is added to every node on its path. The most visited move is played.
+    Nodes are rows of parallel arrays (move, parent, first child, number of children, visits, value, terminal flag)
+    instead of objects, and the children of a node are next to each other, so a tree of a million nodes takes a few tens
+    of megabytes. With several workers the playouts run on a process pool in batches: the paths of a batch are chosen
+    first, each counted as a lost visit until its result comes back (virtual loss), so they spread over the tree. A stop
+    flag set from another thread ends a search after the current batch
+    """
+    def __init__(self, rows, columns, win_length=4, playouts=20000, time_ms=0, workers=1, policy=RANDOM,
+                 batch_size=32, exploration=1.4, seed=None, stop_flag=None):
+        self._number_of_rows = rows
+        self._number_of_columns = columns
+        self._win_length = win_length
+        self._max_playouts = playouts     # playouts of a search, 0 for no limit (time_ms must be set)
+        self._time_ms = time_ms           # time budget of a search in milliseconds, 0 for no limit
+        self._workers = workers
+        self._policy = policy
+        self._batch_size = batch_size     # playouts of a worker task
+        self._exploration = exploration
+        self._random = random.Random(seed)
+        self._playouts = Playouts(rows, columns, win_length, policy, seed)
+        self._stop_flag = stop_flag       # threading.Event checked after every batch, None for none
+        self._executor = None
+        self._statistics = {"playouts": 0, "nodes": 0, "seconds": 0, "playouts_per_second": 0}
+        self.clear()
+
+    def clear(self):
+        self._columns = array("b")          # move that leads to the node, -1 for the root
+        self._parents = array("i")
+        self._first_children = array("i")   # -1 until the node is expanded
+        self._child_counts = array("b")
+        self._visits = array("i")
+        self._values = array("d")           # wins + draws / 2 of the player who made the node's move
+        self._terminal = array("b")
+
+    def add_node(self, column, parent, terminal):
+        self._columns.append(column)
+        self._parents.append(parent)
+        self._first_children.append(-1)
+        self._child_counts.append(0)
+        self._visits.append(0)
+        self._values.append(0.0)
+        self._terminal.append(terminal)
+        return len(self._columns) - 1
+
+    @property
+    def get_number_of_nodes(self):
+        return len(self._columns)
+
+    def get_statistics(self):
+        """
+        Method that returns what the last search did
+        :return: dictionary of playouts, nodes, seconds and playouts_per_second
+        """
+        return dict(self._statistics)
+
+    def expand(self, node, player, opponent, mask):
+        """
+        Method that adds a child to a node for every available move
+        :param node:
+        :param player: bitboard of the player to move at the node
+        :param opponent:
+        :param mask:
+        :return:
+        """
+        self._first_children[node] = len(self._columns)
+        count = 0
+        full_mask = self._playouts.get_board_mask
+        for column in range(self._number_of_columns):
+            move = self._playouts.get_column_move(mask, column)
+            if move:
+                if self._playouts.has_line(player | move):
+                    terminal = TERMINAL_WIN
+                elif mask | move == full_mask:
+                    terminal = TERMINAL_DRAW
+                else:
+                    terminal = NOT_TERMINAL
+                self.add_node(column, node, terminal)
+                count += 1
+        self._child_counts[node] = count
+
+    def select(self, player, opponent, mask):
+        """
+        Method that walks down the tree from the root, expanding the first node visited twice, and counts a visit of
+        every node on the path
+        :param player: bitboards of the root
+        :param opponent:
+        :param mask:
+        :return: tuple of (path of nodes, bitboards (player to move first) of the last node)
+        """
+        node = 0
+        path = [0]
+        visits = self._visits
+        values = self._values
+        while not self._terminal[node]:
+            if self._first_children[node] < 0:
+                if visits[node] == 0 and node != 0:
+                    break
+                self.expand(node, player, opponent, mask)
+            first = self._first_children[node]
+            log_visits = math.log(visits[node] + 1)
+            best_child = first
+            best_value = -math.inf
+            for child in range(first, first + self._child_counts[node]):
+                if visits[child] == 0:
+                    best_child = child
+                    break
+                value = values[child] / visits[child] + self._exploration * math.sqrt(log_visits / visits[child])
+                if value > best_value:
+                    best_value = value
+                    best_child = child
+            move = self._playouts.get_column_move(mask, self._columns[best_child])
+            player, opponent, mask = opponent, player | move, mask | move
+            node = best_child
+            path.append(node)
+        for visited in path:
+            visits[visited] += 1
+        return path, (player, opponent, mask)
+
+    def backpropagate(self, path, result):
+        """
+        Method that adds the result of a playout to the nodes of its path (their visits were counted by select)
+        :param path:
+        :param result: 1 if the player to move at the last node won, -1 if they lost, 0 for a draw
+        :return:
+        """
+        score = (1 - result) / 2      # for the player who made the last node's move
+        for node in reversed(path):
+            self._values[node] += score
+            score = 1 - score
+
+    def search(self, board, piece):
+        """
+        Method that searches the move of piece in a position
+        :param board: position with no winner yet
+        :param piece: piece to move (1 or 2)
+        :return: tuple of (best_column, win rate of the move for piece, between 0 and 1)
+        """
+        start = time.perf_counter()
+        deadline = start + self._time_ms / 1000 if self._time_ms else None
+        root = (board.get_bitboard(piece), board.get_bitboard(3 - piece), board.get_mask())
+        self.clear()
+        self.add_node(-1, -1, NOT_TERMINAL)
+        batch_size = 1
+        if self._workers > 1:
+            batch_size = self._batch_size * self._workers
+            if self._executor is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        playouts = 0
+        while (not self._max_playouts or playouts < self._max_playouts) and \
+                (deadline is None or time.perf_counter() < deadline):
+            count = batch_size
+            if self._max_playouts:
+                count = min(count, self._max_playouts - playouts)
+            paths = []
+            positions = []
+            for _ in range(count):
+                path, position = self.select(*root)
+                terminal = self._terminal[path[-1]]
+                if terminal:    # the last move ended the game: no playout needed
+                    self.backpropagate(path, -1 if terminal == TERMINAL_WIN else 0)
+                else:
+                    paths.append(path)
+                    positions.append(position)
+            if self._executor is None:
+                results = [self._playouts.play(*position) for position in positions]
+            else:
+                results = []
+                chunks = [positions[index:index + self._batch_size]
+                          for index in range(0, len(positions), self._batch_size)]
+                futures = [self._executor.submit(run_playouts, self._number_of_rows, self._number_of_columns,
+                                                 self._win_length, self._policy, chunk, self._random.getrandbits(64))
+                           for chunk in chunks]
+                for future in futures:
+                    results.extend(future.result())
+            for path, result in zip(paths, results):
+                self.backpropagate(path, result)
+            playouts += count
+            if self._max_playouts == 0 and deadline is None:
+                break
+            if self._stop_flag is not None and self._stop_flag.is_set():     # the first batch expands the root
+                break
+
+        first = self._first_children[0]
+        best_child = first
+        for child in range(first, first + self._child_counts[0]):
+            if self._visits[child] > self._visits[best_child]:
+                best_child = child
+        seconds = time.perf_counter() - start
+        self._statistics = {"playouts": playouts, "nodes": len(self._columns), "seconds": seconds,
+                            "playouts_per_second": playouts / seconds if seconds > 0 else 0}
+        return self._columns[best_child], self._values[best_child] / max(1, self._visits[best_child])
+
+    def close(self):
+        """
+        Method that stops the worker processes
+        :return:
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+if __name__ == "__main__":
+    # playouts/sec of the tree search: python -m game.mcts [--playouts 20000] [--workers 1 2 4] [--policy random]
+    import argparse
+    from board.board import Board
+
+    arguments = argparse.ArgumentParser(description="Measure the playouts/sec of the Monte Carlo tree search")
+    arguments.add_argument("moves", type=int, nargs="*", help="columns played, the human first")
+    arguments.add_argument("--playouts", type=int, default=20000)
+    arguments.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    arguments.add_argument("--policy", choices=ROLLOUT_POLICIES, default=RANDOM)
+    arguments.add_argument("--rows", type=int, default=6)
+    arguments.add_argument("--columns", type=int, default=7)
+    options = arguments.parse_args()
+    position = Board(options.rows, options.columns)
+    for index, played in enumerate(options.moves):
+        position.make_move(played, 1 + index % 2)
+    print("%-8s %10s %10s %14s %8s %10s" % ("workers", "playouts", "nodes", "playouts/s", "column", "win rate"))
+    for number_of_workers in options.workers:
+        tree_search = MonteCarloTreeSearch(options.rows, options.columns, playouts=options.playouts,
+                                           workers=number_of_workers, policy=options.policy, seed=0)
+        try:
+            if number_of_workers > 1:   # start the worker processes before timing
+                tree_search.search(position, 1 + len(options.moves) % 2)
+            best, win_rate = tree_search.search(position, 1 + len(options.moves) % 2)
+        finally:
+            tree_search.close()
+        statistics = tree_search.get_statistics()
+        print("%-8d %10d %10d %14.0f %8d %10.3f" % (number_of_workers, statistics["playouts"], statistics["nodes"],
+                                                   statistics["playouts_per_second"], best, win_rate))
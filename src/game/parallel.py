@@ -0,0 +1,170 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from board.board import Board
+from exceptions.exceptions import SearchTimeout
+import math
+import multiprocessing
+import time
+
+# game of a worker process: kept between tasks, so its transposition table keeps the results of earlier searches
+_worker_game = None
+# multiprocessing event of a worker process, set to stop the column it searches
+_stop_flag = None
+
+
+def set_stop_flag(stop_flag):
+    """
+    Function run by every worker process when it starts
+    :param stop_flag: multiprocessing event shared with the ParallelSearch
+    :return:
+    """
+    global _stop_flag
+    _stop_flag = stop_flag
+
+
+def search_column(rows, columns, moves, column, depth, alpha, transposition_table_size, time_ms, mirror_symmetry=True,
+                  win_length=4, move_ordering="history"):
+    """
+    Function run by the worker processes: rebuild the position, play the computer move in column and search the
+    human's replies
+    :param rows:
+    :param columns:
+    :param moves: moves of the position, as returned by Board.get_moves()
+    :param column: root column to search
+    :param depth: depth of the root search
+    :param alpha: best score found so far by the other root columns
+    :param transposition_table_size:
+    :param time_ms: time left for the search in milliseconds, 0 for no limit
+    :param mirror_symmetry: whether the search uses the won and lost scores of mirrored positions (see Game)
+    :param win_length:
+    :param move_ordering: move ordering of the search, see game.game.MOVE_ORDERINGS
+    :return: tuple of (column, score)
+    """
+    global _worker_game
+    from game.game import Game  # game.game imports this module
+    board = _worker_game.get_board if _worker_game is not None else None
+    if board is None or (board.get_number_of_rows, board.get_number_of_columns, board.get_win_length) != \
+            (rows, columns, win_length) \
+            or _worker_game.get_transposition_table_size() != transposition_table_size \
+            or _worker_game.get_mirror_symmetry != mirror_symmetry or _worker_game.get_move_ordering != move_ordering:
+        _worker_game = Game(Board(rows, columns, win_length), None, transposition_table_size,
+                            mirror_symmetry=mirror_symmetry, move_ordering=move_ordering, stop_flag=_stop_flag)
+        board = _worker_game.get_board
+    board.create_new_board()
+    for row, move_column, piece, previous_piece in moves:
+        board.drop_piece_on_board(row, move_column, piece)
+    board.make_move(column, 2)
+    # search with alpha - 1 (scores are integers): a column as good as the best one so far gets its exact score,
+    # so ties are broken the same way as in the serial search
+    return column, _worker_game.search_child(depth - 1, alpha - 1, math.inf, False, time_ms)[1]
+
+
+class ParallelSearch:
+    """
+    Class that searches the root of the minimax tree on several processes: every root column is searched by a worker
+    of a process pool that is created on the first search and reused for the next ones. The first column is searched
+    alone, so the other columns start with its score as alpha; every later column starts with the best score returned
+    so far. A stop flag set from another thread stops the search like a timeout, and the columns being searched too
+    """
+    def __init__(self, workers, transposition_table_size, mirror_symmetry=True, move_ordering="history",
+                 stop_flag=None):
+        self._workers = workers
+        self._transposition_table_size = transposition_table_size
+        self._mirror_symmetry = mirror_symmetry
+        self._move_ordering = move_ordering
+        self._stop_flag = stop_flag             # threading.Event polled while the columns are searched, None for none
+        self._worker_stop_flag = None           # multiprocessing event the workers poll, set when the search stops
+        self._executor = None
+
+    @property
+    def get_workers(self):
+        return self._workers
+
+    def search(self, board, depth, columns=None, time_ms=0):
+        """
+        Method that searches the computer move at the given depth
+        :param board:
+        :param depth:
+        :param columns: available columns in the order they are searched (see Game.order_moves), None for left to right
+        :param time_ms: time left for the search in milliseconds, 0 for no limit
+        :return: tuple of (best_column, best_score), the same as a serial minimax_alpha_beta_pruning
+        :raises SearchTimeout: if the time ran out or the search was stopped before every column was searched
+        """
+        if self._executor is None:
+            self._worker_stop_flag = multiprocessing.Event()
+            self._executor = ProcessPoolExecutor(max_workers=self._workers, initializer=set_stop_flag,
+                                                 initargs=(self._worker_stop_flag,))
+        start = time.perf_counter()
+        if columns is None:
+            columns = list(board.get_available_locations())
+        moves = list(board.get_moves())
+        scores = {}
+        alpha = -math.inf
+        running = set()
+        next_column = 0
+        try:
+            while len(scores) < len(columns):
+                # start columns while there are free workers (only the first column until it is done)
+                while next_column < len(columns) and len(running) < self._workers and (scores or not running):
+                    time_left = 0
+                    if time_ms:
+                        time_left = max(1, time_ms - (time.perf_counter() - start) * 1000)
+                    running.add(self._executor.submit(search_column, board.get_number_of_rows,
+                                                      board.get_number_of_columns, moves, columns[next_column],
+                                                      depth, alpha, self._transposition_table_size, time_left,
+                                                      self._mirror_symmetry, board.get_win_length,
+                                                      self._move_ordering))
+                    next_column += 1
+                done, running = wait(running, timeout=0.05, return_when=FIRST_COMPLETED)
+                for future in done:
+                    column, score = future.result()
+                    scores[column] = score
+                    alpha = max(alpha, score)
+                if self._stop_flag is not None and self._stop_flag.is_set():
+                    raise SearchTimeout()
+        except SearchTimeout:
+            # the columns still being searched stop within 256 nodes, so the workers are free for the next search
+            self._worker_stop_flag.set()
+            for future in running:
+                future.cancel()
+            wait(running)
+            self._worker_stop_flag.clear()
+            raise
+
+        # first column in search order with the best score, like the serial search
+        best_column = columns[0]
+        for column in columns:
+            if scores[column] > scores[best_column]:
+                best_column = column
+        return best_column, scores[best_column]
+
+    def close(self):
+        """
+        Method that stops the worker processes
+        :return:
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+if __name__ == "__main__":
+    # speedup of the parallel search over the serial one: python -m game.parallel [depth]
+    import sys
+    from game.game import Game
+
+    search_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    positions = [[3], [3, 3, 2], [3, 2, 3, 3, 4], [3, 3, 3, 3, 2, 4, 4]]
+    serial_time = None
+    for workers in range(1, 8):
+        elapsed = 0
+        for position in positions:
+            game = Game(Board(6, 7), None, search_workers=workers)
+            for index, move in enumerate(position):
+                game.get_board.make_move(move, 1 + index % 2)
+            game.iterative_deepening(2)     # start the worker processes before timing
+            start_time = time.perf_counter()
+            game.iterative_deepening(search_depth)
+            elapsed += time.perf_counter() - start_time
+            game.close()
+        serial_time = serial_time or elapsed
+        print("workers: %d  time: %.3fs  speedup: %.2f" % (workers, elapsed, serial_time / elapsed))
@@ -0,0 +1,103 @@
+from exceptions.exceptions import SearchTimeout
+from game.solver import get_column_order
+import math
+import threading
+
+
+class Ponderer:
+    """
+    Class that thinks about the computer's next move while the human is choosing theirs: a background thread plays
+    every possible human reply on a copy of the board and searches the computer's answer to it, one depth at a time for
+    all the replies (so every reply gets a shallow answer before any gets a deep one). The searches use the game's
+    transposition table, which only this thread uses until pondering is stopped, and their results are kept by
+    position, for the computer move after the human's actual reply
+    """
+    def __init__(self, game, max_depth):
+        self._game = game
+        self._max_depth = max_depth
+        self._thread = None
+        self._stopped = threading.Event()
+        self._search_game = None    # game searching the copy of the board, for the running thread
+        self._results = {}          # position key -> (best_column, best_score, depth)
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        """
+        Method that starts pondering on the current position of the game (the human is to move)
+        :return:
+        """
+        self.stop()
+        self._results = {}
+        self._stopped.clear()
+        self._search_game = self._game.create_search_game()
+        self._thread = threading.Thread(target=self.ponder, args=(self._search_game,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Method that stops pondering and waits for the thread to end; the results found so far are kept
+        :return:
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._search_game.stop_search()
+        self._thread.join()
+        self._thread = None
+        self._search_game = None
+
+    def join(self, timeout=None):
+        """
+        Method that waits for pondering to end by itself, when every answer is searched to the maximum depth
+        :param timeout: seconds to wait at most, None to wait until it ends
+        :return: True if pondering ended
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def ponder(self, game):
+        """
+        Method run by the thread: search the computer's answer to every human reply at depth 1, 2, 3... until the
+        maximum depth or until stopped
+        :param game: game with a copy of the board, with the human to move
+        :return:
+        """
+        from game.game import WINNING_SCORE    # game.game imports this module
+        board = game.get_board
+        replies = [column for column in get_column_order(board.get_number_of_columns)
+                   if board.is_valid_column(column)]
+        try:
+            for depth in range(1, self._max_depth + 1):
+                searched = False
+                for reply in replies:
+                    if self._stopped.is_set():
+                        return
+                    board.make_move(reply, 1)
+                    if board.get_winner() == 0 and not board.is_board_full() \
+                            and depth <= board.get_number_of_empty_cells():
+                        key = board.get_position_key()
+                        previous = self._results.get(key)
+                        if previous is None or abs(previous[1]) < WINNING_SCORE:
+                            first_column = previous[0] if previous is not None else None
+                            # with a deadline, so the search checks the stop flag
+                            column, score = game.search_child(depth, -math.inf, math.inf, True,
+                                                              first_column=first_column)
+                            self._results[key] = (column, score, depth)
+                            searched = True
+                    board.undo_move()
+                if not searched:    # every answer is decided or as deep as the board allows
+                    return
+        except SearchTimeout:   # stopped in the middle of a search, the copy of the board is not used again
+            pass
+
+    def get_result(self, board):
+        """
+        Method that returns what pondering found for the current position (after the human's reply)
+        :param board:
+        :return: tuple of (best_column, best_score, depth), or None if the position was not searched
+        """
+        return self._results.get(board.get_position_key())
@@ -0,0 +1,235 @@
+from exceptions.exceptions import SearchTimeout
+
+WIN = "win"
+DRAW = "draw"
+LOSS = "loss"
+
+# columns are searched from the center outwards
+_column_orders = {}
+
+
+def get_column_order(columns):
+    order = _column_orders.get(columns)
+    if order is None:
+        order = sorted(range(columns), key=lambda column: (abs(2 * column - columns + 1), column))
+        _column_orders[columns] = order
+    return order
+
+
+class EndgameSolver:
+    """
+    Class that solves positions exactly, for the end of a game: a negamax search on the bitboards of the position,
+    without any heuristic, that only stops at wins and full boards. The score of a position is positive if the player
+    to move wins, the sooner the higher (half the number of empty cells left after the winning move, plus 1), 0 for a
+    draw and negative if the player to move loses. The exact score is found by null-window searches (alpha = beta - 1)
+    that halve the range of possible scores, sharing a bounded cache of score bounds. Only moves that do not let the
+    opponent win right away are searched, the ones that make the most winning cells first. A player wins with
+    win_length pieces in a row. A stop flag set from another thread makes the search give up
+    """
+    def __init__(self, rows, columns, cache_size=65536, win_length=4, stop_flag=None):
+        self._number_of_rows = rows
+        self._number_of_columns = columns
+        self._win_length = win_length
+        self._column_height = rows + 1
+        self._size = rows * columns
+        self._bottom_mask = 0
+        for column in range(columns):
+            self._bottom_mask |= 1 << (column * self._column_height)
+        self._board_mask = self._bottom_mask * ((1 << rows) - 1)
+        self._column_masks = [((1 << rows) - 1) << (column * self._column_height) for column in range(columns)]
+        self._order = get_column_order(columns)
+        self._cache_size = max(1, cache_size)
+        self._cache_keys = [None] * self._cache_size
+        self._cache_values = [0] * self._cache_size
+        self._cache_lower = [False] * self._cache_size   # True if the value is a lower bound, False if an upper bound
+        self._nodes = 0
+        self._stop_flag = stop_flag     # threading.Event checked every 1024 nodes, None for none
+
+    @property
+    def get_nodes(self):
+        return self._nodes
+
+    def get_winning_cells(self, position, mask):
+        """
+        Method that finds the empty cells that would complete a line of win_length for the player whose pieces are
+        position
+        :param position: bitboard of the player's pieces
+        :param mask: bitboard of all the pieces
+        :return: bitboard of the cells (reachable or not)
+        """
+        length = self._win_length
+        # vertical: the win_length - 1 cells below are the player's
+        cells = position << 1
+        for distance in range(2, length):
+            cells &= position << distance
+        for shift in (self._column_height - 1, self._column_height, self._column_height + 1):
+            # before[k] / after[k]: cells with k pieces of the player right before / after them in the direction
+            before = [-1]
+            after = [-1]
+            for distance in range(1, length):
+                before.append(before[-1] & (position << (distance * shift)))
+                after.append(after[-1] & (position >> (distance * shift)))
+            # the cell is the first, second, ... or last cell of the line
+            for index in range(length):
+                cells |= before[index] & after[length - 1 - index]
+        return cells & (self._board_mask ^ mask)
+
+    def get_non_losing_moves(self, position, mask):
+        """
+        Method that finds the moves that do not let the opponent win on the next move: if the opponent has a winning
+        cell that can be played, that cell must be taken (with two of them every move loses), and no move may be right
+        below a winning cell of the opponent
+        :param position: bitboard of the pieces of the player to move
+        :param mask:
+        :return: bitboard with the cell of every such move
+        """
+        possible = (mask + self._bottom_mask) & self._board_mask
+        opponent_cells = self.get_winning_cells(position ^ mask, mask)
+        forced = possible & opponent_cells
+        if forced:
+            if forced & (forced - 1):
+                return 0
+            possible = forced
+        return possible & ~(opponent_cells >> 1)
+
+    def negamax(self, position, mask, moves, alpha, beta):
+        """
+        Method that scores a position where the player to move cannot win with the next move
+        :param position: bitboard of the pieces of the player to move
+        :param mask: bitboard of all the pieces
+        :param moves: number of pieces on the board
+        :param alpha:
+        :param beta:
+        :return: the exact score if it is between alpha and beta, otherwise a bound on the same side of the window
+        :raises SearchTimeout: if the stop flag is set
+        """
+        self._nodes += 1
+        if self._nodes & 1023 == 0 and self._stop_flag is not None and self._stop_flag.is_set():
+            raise SearchTimeout()
+        possible = self.get_non_losing_moves(position, mask)
+        if possible == 0:       # every move lets the opponent win next
+            return -((self._size - moves) // 2)
+        if moves >= self._size - 2:     # the last two pieces cannot win any more
+            return 0
+
+        lowest = -((self._size - 2 - moves) // 2)   # the opponent cannot win on the next move
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (self._size - 1 - moves) // 2     # the player cannot win on this move
+        key = position + mask
+        index = key % self._cache_size
+        if self._cache_keys[index] == key:
+            value = self._cache_values[index]
+            if self._cache_lower[index]:
+                if alpha < value:
+                    alpha = value
+                    if alpha >= beta:
+                        return alpha
+            elif highest > value:
+                highest = value
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        children = []
+        for column in self._order:
+            move = possible & self._column_masks[column]
+            if move:
+                threats = bin(self.get_winning_cells(position | move, mask)).count("1")
+                children.append((-threats, len(children), move))
+        children.sort()
+        for threats, order, move in children:
+            score = -self.negamax(position ^ mask, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                self._store(key, index, score, True)
+                return score
+            if score > alpha:
+                alpha = score
+        self._store(key, index, alpha, False)
+        return alpha
+
+    def _store(self, key, index, value, lower):
+        self._cache_keys[index] = key
+        self._cache_values[index] = value
+        self._cache_lower[index] = lower
+
+    def get_score(self, position, mask, moves):
+        """
+        Method that finds the exact score of a position, with null-window searches
+        :param position: bitboard of the pieces of the player to move
+        :param mask: bitboard of all the pieces
+        :param moves: number of pieces on the board
+        :return:
+        """
+        if self.get_winning_cells(position, mask) & ((mask + self._bottom_mask) & self._board_mask):
+            return (self._size + 1 - moves) // 2
+        lowest = -((self._size - moves) // 2)
+        highest = (self._size + 1 - moves) // 2
+        while lowest < highest:
+            middle = lowest + (highest - lowest) // 2
+            # try the windows near 0 first, they are the cheapest to search
+            if middle <= 0 and int(lowest / 2) < middle:
+                middle = int(lowest / 2)
+            elif middle >= 0 and int(highest / 2) > middle:
+                middle = int(highest / 2)
+            score = self.negamax(position, mask, moves, middle, middle + 1)
+            if score <= middle:
+                highest = score
+            else:
+                lowest = score
+        return lowest
+
+    def get_outcome(self, score, moves):
+        """
+        Method that converts a score to the result of the game
+        :param score: score of a position, for the player to move
+        :param moves: number of pieces on the board in the position
+        :return: tuple of (WIN, DRAW or LOSS, number of moves until the game ends, counting both players)
+        """
+        if score == 0:
+            return DRAW, self._size - moves
+        # the winning piece is number size + 1 - 2 * |score| or the next one, whichever the winner plays
+        last_move = self._size + 1 - 2 * abs(score)
+        winner_parity = (moves + 1) % 2 if score > 0 else moves % 2
+        if last_move % 2 != winner_parity:
+            last_move += 1
+        return (WIN if score > 0 else LOSS), last_move - moves
+
+    def solve(self, board, piece):
+        """
+        Method that finds the best move of piece in a position, and how the game ends if both players play perfectly
+        :param board: position with only the pieces of the two players, and no winner yet
+        :param piece: piece to move
+        :return: tuple of (best_column, outcome, distance): outcome is WIN, DRAW or LOSS for piece and distance the
+        number of moves (of both players) until the end of the game; None if the board is full (there is no move to
+        find), holds other pieces or is not of the solver's size and win length
+        :raises SearchTimeout: if the stop flag is set
+        """
+        if (board.get_number_of_rows, board.get_number_of_columns, board.get_win_length) != \
+                (self._number_of_rows, self._number_of_columns, self._win_length):
+            return None
+        position = board.get_bitboard(piece)
+        mask = board.get_mask()
+        if position | board.get_bitboard(3 - piece) != mask or mask == self._board_mask:
+            return None
+        moves = bin(mask).count("1")
+        possible = (mask + self._bottom_mask) & self._board_mask
+        winning_cells = self.get_winning_cells(position, mask) & possible
+        best_column = None
+        best_score = None
+        for column in self._order:
+            if winning_cells & self._column_masks[column]:
+                return column, WIN, 1
+        for column in self._order:
+            move = possible & self._column_masks[column]
+            if not move:
+                continue
+            score = -self.get_score(position ^ mask, mask | move, moves + 1)
+            if best_score is None or score > best_score:
+                best_column = column
+                best_score = score
+        outcome, distance = self.get_outcome(best_score, moves)
+        return best_column, outcome, distance
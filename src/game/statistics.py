@@ -0,0 +1,129 @@
+import json
+
+
+class SearchStatistics:
+    """
+    Class that collects what the search of one computer move did: nodes visited at every ply, leaf evaluations,
+    terminal nodes, transposition table cutoffs, beta cutoffs (at computer nodes) and alpha cutoffs (at human nodes)
+    with the index of the move that caused them, time spent in every phase, the iterations of the iterative deepening
+    and, with the tree search, the playouts and their speed. Nodes searched by the worker processes of a parallel search
+    are not counted
+    """
+    def __init__(self):
+        self._root_moves = 0
+        self.nodes = []                 # nodes visited at every ply from the root
+        self.leaf_evaluations = 0
+        self.terminal_nodes = 0
+        self.transposition_cutoffs = 0
+        self.beta_cutoffs = []          # cutoffs caused by the move at every index of the move order
+        self.alpha_cutoffs = []
+        self.phases = {}                # seconds spent in every phase
+        self.playouts = 0               # games played to the end by the tree search, and their time
+        self.playout_seconds = 0
+        self.iterations = []            # depth, nodes, seconds, best column and score of every completed depth
+        self.column = None
+        self.score = None
+        self.depth = 0
+
+    def start_move(self, board):
+        """
+        Method that resets the counters before searching the move of a position
+        :param board: the position, plies are counted from it
+        :return:
+        """
+        self.__init__()
+        self._root_moves = len(board.get_moves())
+
+    def count_node(self, board):
+        ply = len(board.get_moves()) - self._root_moves
+        while len(self.nodes) <= ply:
+            self.nodes.append(0)
+        self.nodes[ply] += 1
+
+    def count_cutoff(self, maximizing_player, index):
+        """
+        Method that counts a cutoff
+        :param maximizing_player: True for a beta cutoff (computer node), False for an alpha cutoff (human node)
+        :param index: index of the move that caused it in the move order of the node, 0 = first move searched
+        :return:
+        """
+        cutoffs = self.beta_cutoffs if maximizing_player else self.alpha_cutoffs
+        while len(cutoffs) <= index:
+            cutoffs.append(0)
+        cutoffs[index] += 1
+
+    def add_phase_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def add_playouts(self, playouts, seconds):
+        self.playouts += playouts
+        self.playout_seconds += seconds
+
+    def get_playouts_per_second(self):
+        if self.playout_seconds <= 0:
+            return None
+        return self.playouts / self.playout_seconds
+
+    def add_iteration(self, depth, seconds, column, score):
+        """
+        Method that records a completed depth of the iterative deepening
+        :return:
+        """
+        nodes = self.get_total_nodes() - sum(iteration["nodes"] for iteration in self.iterations)
+        self.iterations.append({"depth": depth, "nodes": nodes, "seconds": seconds, "column": column, "score": score})
+
+    def finish_move(self, column, score, depth):
+        self.column = column
+        self.score = score
+        self.depth = depth
+
+    def get_total_nodes(self):
+        return sum(self.nodes)
+
+    def get_first_move_cutoff_rate(self):
+        """
+        Method that computes the share of the cutoffs caused by the first move searched, a measure of the move ordering
+        :return: the rate, or None if there was no cutoff
+        """
+        cutoffs = sum(self.beta_cutoffs) + sum(self.alpha_cutoffs)
+        if cutoffs == 0:
+            return None
+        first_move_cutoffs = sum(counts[0] for counts in (self.beta_cutoffs, self.alpha_cutoffs) if counts)
+        return first_move_cutoffs / cutoffs
+
+    def get_effective_branching_factor(self):
+        """
+        Method that computes the effective branching factor: the growth of the number of nodes between the last two
+        iterations of the iterative deepening, or total nodes ** (1 / plies) if there was a single search
+        :return: the factor, or None if nothing was searched
+        """
+        if len(self.iterations) >= 2:
+            previous_nodes = self.iterations[-2]["nodes"]
+            if previous_nodes > 0:
+                return self.iterations[-1]["nodes"] / previous_nodes
+        total_nodes = self.get_total_nodes()
+        if total_nodes == 0 or len(self.nodes) < 2:
+            return None
+        return total_nodes ** (1 / (len(self.nodes) - 1))
+
+    def to_dict(self):
+        return {"column": self.column, "score": self.score, "depth": self.depth, "nodes": self.get_total_nodes(),
+                "nodes_per_ply": list(self.nodes), "leaf_evaluations": self.leaf_evaluations,
+                "terminal_nodes": self.terminal_nodes, "transposition_cutoffs": self.transposition_cutoffs,
+                "beta_cutoffs": list(self.beta_cutoffs), "alpha_cutoffs": list(self.alpha_cutoffs),
+                "first_move_cutoff_rate": self.get_first_move_cutoff_rate(), "playouts": self.playouts,
+                "playouts_per_second": self.get_playouts_per_second(),
+                "effective_branching_factor": self.get_effective_branching_factor(), "phases": dict(self.phases),
+                "iterations": list(self.iterations)}
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    def write(self, path):
+        """
+        Method that appends the statistics of the move as one line of json to a file
+        :param path:
+        :return:
+        """
+        with open(path, "a") as file:
+            file.write(self.to_json() + "\n")
@@ -0,0 +1,83 @@
+EXACT = 0
+LOWER_BOUND = 1     # fail high: the real score is at least the stored score
+UPPER_BOUND = 2     # fail low: the real score is at most the stored score
+
+# XOR-ed into the board hash when the computer (maximizing player) is to move
+MAXIMIZING_PLAYER_KEY = 0x9E3779B97F4A7C15
+
+
+class TranspositionTable:
+    """
+    Class that stores search results of positions indexed by Zobrist hash, so a position reached again through a
+    different move order is not searched again. The table has a fixed capacity: each bucket holds a depth-preferred
+    entry, only replaced by a search at least as deep, and an always-replace entry holding the most recent result
+    """
+    def __init__(self, size):
+        self._number_of_buckets = max(1, size // 2)
+        entries = 2 * self._number_of_buckets
+        self._keys = [None] * entries
+        self._depths = [0] * entries
+        self._flags = [EXACT] * entries
+        self._scores = [0] * entries
+        self._moves = [None] * entries
+        self._hits = 0
+        self._misses = 0
+        self._collisions = 0    # results overwritten by the result of another position
+        self._stores = 0
+
+    @property
+    def get_size(self):
+        return 2 * self._number_of_buckets
+
+    def probe(self, key):
+        """
+        Method that looks up a position
+        :param key: hash of the position
+        :return: tuple of (depth, flag, score, best_column), or None if the position is not in the table
+        """
+        index = 2 * (key % self._number_of_buckets)
+        if self._keys[index] != key:
+            index += 1
+            if self._keys[index] != key:
+                self._misses += 1
+                return None
+        self._hits += 1
+        return self._depths[index], self._flags[index], self._scores[index], self._moves[index]
+
+    def store(self, key, depth, flag, score, best_column):
+        """
+        Method that saves the result of a search
+        :param key: hash of the position
+        :param depth: depth the position was searched to
+        :param flag: EXACT, LOWER_BOUND or UPPER_BOUND
+        :param score:
+        :param best_column:
+        :return:
+        """
+        index = 2 * (key % self._number_of_buckets)
+        if self._keys[index] is not None and self._keys[index] != key and self._depths[index] > depth:
+            index += 1      # keep the deeper result, use the always-replace entry
+        if self._keys[index] is not None and self._keys[index] != key:
+            self._collisions += 1
+        self._keys[index] = key
+        self._depths[index] = depth
+        self._flags[index] = flag
+        self._scores[index] = score
+        self._moves[index] = best_column
+        self._stores += 1
+
+    def clear(self):
+        """
+        Method that empties the table and resets its counters
+        :return:
+        """
+        self.__init__(self.get_size)
+
+    def get_statistics(self):
+        """
+        Method that returns the table counters
+        :return: dictionary with the size of the table and the number of hits, misses, collisions (stores that
+        overwrote another position) and stores
+        """
+        return {"size": self.get_size, "hits": self._hits, "misses": self._misses,
+                "collisions": self._collisions, "stores": self._stores}
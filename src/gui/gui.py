@@ -1,9 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 import pygame
 import sys
 import math
+import time
 
 # define size of 1 square
 square_size = 100  # pixels
+max_window_size = 1000  # pixels, the squares are smaller on boards that would not fit
 
 # define colors in RGB color model: color(red, green, blue); r,g,b int (0, 255)
 black = (0, 0, 0)
@@ -13,8 +16,9 @@ light_red = (240, 128, 128)
 green = (127, 255, 0)
 yellow = (255, 255, 130)
 
-# define radius of each circle
-circle_radius = int(square_size / 2 - 5)  # diameter/2 - something so circle < square
+frames_per_second = 30  # most redraws per second
+computer_delay = 0.5    # seconds a computer move without AI is shown as thinking, so it does not look instant
+game_over_delay = 5     # seconds the window stays open after the end of the game
 
 
 class Gui:
@@ -23,7 +27,10 @@ class Gui:
     in each blue square a black circle in which the pieces will be put. Then using the mouse motion detection, I drew
     a piece (red for human and yellow for computer). At each user click, we get the position of the click using (x,y)
     coordinates in pixels and depending on the interval in which they are in, we calculate the column chosen by the user
-    and drop the piece there.
+    and drop the piece there. The computer moves are computed on a background thread, so the window keeps handling
+    events while the computer is thinking.
+    The empty board and the pieces are drawn once to cached surfaces: a move only copies a piece on its cell, and only
+    the changed parts of the window (the top row, the cell of the move) are sent to the display.
     """
     def __init__(self, game, ai):
         self._game = game
@@ -36,95 +43,214 @@ class Gui:
         self._computer = 1
         self._player_piece = 1
         self._computer_piece = 2
+        # large boards get smaller squares, so the window fits on the screen
+        self._square_size = min(square_size, max_window_size // max(self._number_of_columns, self._number_of_rows + 1))
+        self._circle_radius = int(self._square_size / 2 - self._square_size // 20)
         # initialize pygame
         pygame.init()
 
         # define height and width of board
-        self.screen_width = self._number_of_columns * square_size
-        self.screen_height = (self._number_of_rows + 1) * square_size
+        self.screen_width = self._number_of_columns * self._square_size
+        self.screen_height = (self._number_of_rows + 1) * self._square_size
 
         size = (self.screen_width, self.screen_height)
 
         self.screen = pygame.display.set_mode(size)
         pygame.display.set_caption("Connect Four")        # set title of game window
 
-        # define a font for winning message
-        self.myfont = pygame.font.SysFont("verdana", 70)  # pygame.font.SysFont(name, size, bold=False, italic=False) -> Font
+        # define a font for winning message, scaled with the squares
+        # pygame.font.SysFont(name, size, bold=False, italic=False) -> Font
+        self.myfont = pygame.font.SysFont("verdana", 70 * self._square_size // square_size)
+        self.thinking_font = pygame.font.SysFont("verdana", 40 * self._square_size // square_size)
 
-    def draw_board(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)    # thread computing the computer moves
+        self._clock = pygame.time.Clock()                     # caps the number of frames per second
+        self._dirty_rects = []                                # parts of the screen changed since the last update
+
+        self._sprites = {0: self.create_cell_sprite(black), self._player_piece: self.create_cell_sprite(red),
+                         self._computer_piece: self.create_cell_sprite(yellow)}
+        self._hover_sprite = pygame.Surface((self._square_size, self._square_size), pygame.SRCALPHA)
+        pygame.draw.circle(self._hover_sprite, light_red, (self._square_size // 2, self._square_size // 2),
+                           self._circle_radius)
+        self._board_surface = pygame.Surface((self.screen_width, self._number_of_rows * self._square_size))
         for column in range(self._number_of_columns):
             for row in range(self._number_of_rows):
-                # pygame.draw.rect(surface, color, rect(left, top, width, height))
-                pygame.draw.rect(self.screen, blue, (column * square_size, row * square_size + square_size, square_size, square_size))
-                # pygame.draw.circle(surface, color, center, radius)
-                pygame.draw.circle(self.screen, black, (int(column * square_size + square_size / 2), int(row * square_size + square_size + square_size / 2)), circle_radius)
+                self._board_surface.blit(self._sprites[0], (column * self._square_size, row * self._square_size))
+
+    def create_cell_sprite(self, color):
+        """
+        Method that draws a cell of the board: a blue square with a circle of the color of its piece (black if empty)
+        :param color:
+        :return: Surface of one square
+        """
+        sprite = pygame.Surface((self._square_size, self._square_size))
+        # pygame.draw.rect(surface, color, rect(left, top, width, height))
+        sprite.fill(blue)
+        # pygame.draw.circle(surface, color, center, radius)
+        pygame.draw.circle(sprite, color, (self._square_size // 2, self._square_size // 2), self._circle_radius)
+        return sprite
 
+    def get_cell_rect(self, row, column):
+        # row 0 is at the bottom of the window
+        return pygame.Rect(column * self._square_size, self.screen_height - (row + 1) * self._square_size,
+                           self._square_size, self._square_size)
+
+    def draw_board(self):
+        """
+        Method that draws the whole board: the cached empty board, then the pieces
+        :return:
+        """
+        self.screen.blit(self._board_surface, (0, self._square_size))
         for column in range(self._number_of_columns):
             for row in range(self._number_of_rows):
-                if int(self._board.get_board_value(row, column)) == int(self._player_piece):  # player
-                    # pygame.draw.circle(surface, color, center, radius)
-                    pygame.draw.circle(self.screen, red, (int(column * square_size + square_size / 2), self.screen_height - int(row * square_size + square_size / 2)), circle_radius)
-                elif int(self._board.get_board_value(row, column)) == int(self._computer_piece):  # computer
-                    # pygame.draw.circle(surface, color, center, radius)
-                    pygame.draw.circle(self.screen, yellow, (int(column * square_size + square_size / 2), self.screen_height - int(row * square_size + square_size / 2)), circle_radius)
-        pygame.display.update()  # save changes to game board
+                piece = int(self._board.get_board_value(row, column))
+                if piece in (self._player_piece, self._computer_piece):
+                    self.screen.blit(self._sprites[piece], self.get_cell_rect(row, column))
+        self._dirty_rects.append(pygame.Rect(0, 0, self.screen_width, self.screen_height))
+
+    def draw_last_move(self):
+        """
+        Method that draws the piece of the last move on its cell
+        :return:
+        """
+        row, column, piece = self._board.get_last_move()
+        rect = self.get_cell_rect(row, column)
+        self.screen.blit(self._sprites.get(piece, self._sprites[0]), rect)
+        self._dirty_rects.append(rect)
+
+    def clear_top_row(self):
+        rect = pygame.Rect(0, 0, self.screen_width, self._square_size)
+        pygame.draw.rect(self.screen, black, rect)
+        self._dirty_rects.append(rect)
+
+    def draw_hover(self, pos_x):
+        """
+        Method that draws the human's piece in the top row, above the column the mouse is on
+        :param pos_x: x coordinate of the mouse
+        :return:
+        """
+        self.clear_top_row()
+        self.screen.blit(self._hover_sprite, (pos_x - self._square_size // 2, 0))
+
+    def draw_message(self, text, color):
+        """
+        Method that writes a message in the middle of the top row, shrunk if it is wider than the window
+        :param text:
+        :param color:
+        :return:
+        """
+        # render(text, antialias(pixels at edges appear smoother), color, background=None)
+        label = self.myfont.render(text, True, color)
+        if label.get_width() > self.screen_width:
+            height = label.get_height() * self.screen_width // label.get_width()
+            label = pygame.transform.smoothscale(label, (self.screen_width, height))
+        self.clear_top_row()
+        position = ((self.screen_width - label.get_width()) // 2, max(0, (self._square_size - label.get_height()) // 2))
+        self.screen.blit(label, position)   # blit = "assigning" pixels; only update screen at position (x,y)
+
+    def update_display(self):
+        """
+        Method that sends the changed parts of the screen to the display
+        :return:
+        """
+        if self._dirty_rects:
+            pygame.display.update(self._dirty_rects)
+            self._dirty_rects = []
+
+    def draw_thinking(self, elapsed):
+        """
+        Method that shows that the computer is thinking in the top row, with 0 to 3 dots changing every half second
+        :param elapsed: seconds since the computer started thinking
+        :return:
+        """
+        self.clear_top_row()
+        label = self.thinking_font.render("Thinking" + "." * (int(elapsed * 2) % 4), True, yellow)
+        self.screen.blit(label, (self._square_size // 5, self._square_size // 4))
 
     def start(self):
         self.draw_board()
-        pygame.display.update()
+        self.update_display()
         turn = self._player
         game_over = False
         is_running = True
-        while not game_over and is_running:
-            for event in pygame.event.get():   # get each event
+        computer_move = None    # future of the computer move, while the computer is thinking
+        thinking_since = 0
+        game_over_since = 0
+        if self._ai:
+            self._game.start_pondering()    # think about the computer's answers while the human chooses
+        while is_running:
+            if turn == self._player and not game_over:
+                events = [pygame.event.wait()] + pygame.event.get()    # nothing to draw until the human does something
+            else:
+                events = pygame.event.get()
+            hover_x = None
+            for event in events:   # get each event
                 if event.type == pygame.QUIT:  # quit
                     is_running = False
 
                 if event.type == pygame.MOUSEMOTION:  # display the piece at the top row in order to see where user clicks
-                    if turn == self._player:
-                        pygame.draw.rect(self.screen, black, (0, 0, self.screen_width, square_size))
-                        pos_x = event.pos[0]
-                        pygame.draw.circle(self.screen, light_red, (pos_x, int(square_size / 2)), circle_radius)
-
-                pygame.display.update()
+                    hover_x = event.pos[0]          # only the last position of the frame is drawn
 
                 # user chose a column by clicking
                 if event.type == pygame.MOUSEBUTTONDOWN:  # pygame.MOUSEBUTTONDOWN -> (pos, button, touch)
-                    if turn == self._player:              # human's turn
+                    if turn == self._player and not game_over:  # human's turn
                         pos_x = event.pos[0]
-                        move = int(math.floor(pos_x / square_size))   # calculate column based on pixels value of click
-                        self._game.move_human(move)
-                        if self._board.is_winning_move(1):                        # draw text on a new Surface
-                            # render(text, antialias(pixels at edges appear smoother), color, background=None)
-                            label = self.myfont.render("You win!", True, red)
-                            self.screen.blit(label, (205, 20))   # blit = "assigning" pixels; only update screen at position (x,y)
-                            game_over = True
-                        self.draw_board()
-                        turn += 1
-                        turn = turn % 2
+                        # calculate column based on pixels value of click
+                        move = int(math.floor(pos_x / self._square_size))
+                        if self._game.move_human(move) is not False:    # column was not full
+                            self.draw_last_move()
+                            if self._board.get_winner() == self._player_piece:
+                                self.draw_message("You win!", red)
+                                game_over = True
+                            elif self._board.is_board_full():     # no move left for the computer
+                                self.draw_message("It's draw!", green)
+                                game_over = True
+                            turn += 1
+                            turn = turn % 2
+
+            if hover_x is not None and turn == self._player and not game_over:
+                self.draw_hover(hover_x)
 
             if turn == self._computer and not game_over:  # computer's turn
-                if self._ai is False:
-                    pygame.time.wait(500)
-                self._game.move_computer(self._ai)
-                if self._board.is_winning_move(2):
-                    # render(text, antialias(pixels at edges appear smoother), color, background=None)
-                    label = self.myfont.render("Computer wins!", True, yellow)
-                    self.screen.blit(label, (70, 20))  # blit = "assigning" pixels; only update screen at position (x,y)
-                    game_over = True
-                self.draw_board()
-                turn += 1
-                turn = turn % 2
-
-            if self._board.is_board_full is True:
-                # render(text, antialias(pixels at edges appear smoother), color, background=None)
-                label = self.myfont.render("It's draw!", True, green)
-                self.screen.blit(label, (205, 20))  # blit = "assigning" pixels; only update screen at position (x,y)
+                # the board belongs to the computer's thread until its move is computed: only the top row is drawn
+                if computer_move is None:
+                    thinking_since = time.perf_counter()
+                    computer_move = self._executor.submit(self._game.compute_computer_move, self._ai)
+                thinking_time = time.perf_counter() - thinking_since
+                if computer_move.done() and (self._ai or thinking_time >= computer_delay):
+                    column = computer_move.result()
+                    computer_move = None
+                    self.clear_top_row()
+                    self._game.play_computer_move(column)
+                    self.draw_last_move()
+                    if self._board.get_winner() == self._computer_piece:
+                        self.draw_message("Computer wins!", yellow)
+                        game_over = True
+                    turn += 1
+                    turn = turn % 2
+                    if self._ai and not game_over:
+                        self._game.start_pondering()
+                else:
+                    self.draw_thinking(thinking_time)
+
+            if not game_over and computer_move is None and self._board.is_board_full():
+                self.draw_message("It's draw!", green)
                 game_over = True
 
-            if game_over:  # keep game window open for another 5 secs after end of game
-                pygame.time.wait(5000)  # 5000ms = 5s
+            if game_over:  # keep game window open for another 5 secs after end of game, still handling events
+                if not game_over_since:
+                    game_over_since = time.perf_counter()
+                    self._game.stop_pondering()
+                elif time.perf_counter() - game_over_since >= game_over_delay:
+                    is_running = False
+
+            self.update_display()
+            self._clock.tick(frames_per_second)     # also leaves the processor to the computer's thread
 
         # qui gui
+        if computer_move is not None:
+            self._game.stop_search()
+        self._executor.shutdown(cancel_futures=True)
+        self._game.close()      # stops pondering and the worker processes
         pygame.quit()
         sys.exit(0)
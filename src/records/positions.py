@@ -0,0 +1,185 @@
+from board.board import Board
+from book.table import SortedTable, TableWriter, get_key_bytes
+from records.records import read_records, FIRST_WON, SECOND_WON, DRAW
+import heapq
+import os
+import struct
+import tempfile
+
+MAGIC = b"C4PI"
+VERSION = 2
+# after the key of every entry: visits, games won by the first player, games won by the second player, draws
+ENTRY_VALUE = struct.Struct(">IIII")
+
+
+def get_game_positions(record, board, mirror=None):
+    """
+    Generator that replays a game and gives the canonical key of every position it went through, the empty board
+    included. A game never passes twice through the same position, since every move adds a piece
+    :param record: GameRecord
+    :param board: board of the game's size, cleared first
+    :param mirror: another board of the game's size, on which the mirror image of the game is played, so the keys are
+    min(key, mirrored key) without mirroring every position; None to compute them with get_canonical_key
+    :return: canonical keys
+    """
+    board.create_new_board()
+    if mirror is None:
+        yield board.get_canonical_key()
+        for index, column in enumerate(record.moves):
+            board.make_move(column, 1 + index % 2)
+            yield board.get_canonical_key()
+        return
+    mirror.create_new_board()
+    last_column = record.columns - 1
+    yield board.get_position_key()
+    for index, column in enumerate(record.moves):
+        board.make_move(column, 1 + index % 2)
+        mirror.make_move(last_column - column, 1 + index % 2)
+        yield min(board.get_position_key(), mirror.get_position_key())
+
+
+def write_run(path, counts, key_bytes):
+    """
+    Function that writes a sorted run: the entries of a dictionary, sorted by key, with no header
+    :param path:
+    :param counts: dictionary of canonical key -> [visits, first wins, second wins, draws]
+    :param key_bytes:
+    :return:
+    """
+    with open(path, "wb") as file:
+        for key in sorted(counts):
+            file.write(key.to_bytes(key_bytes, "big"))
+            file.write(ENTRY_VALUE.pack(*counts[key]))
+
+
+def read_run(path, key_bytes):
+    """
+    Generator that reads the entries of a sorted run one at a time
+    :param path:
+    :param key_bytes:
+    :return: tuples of (key bytes, (visits, first wins, second wins, draws))
+    """
+    entry_size = key_bytes + ENTRY_VALUE.size
+    with open(path, "rb") as file:
+        while True:
+            entry = file.read(entry_size)
+            if len(entry) < entry_size:
+                return
+            yield entry[:key_bytes], ENTRY_VALUE.unpack_from(entry, key_bytes)
+
+
+def build_position_index(path, records_paths, rows=6, columns=7, max_entries=1 << 20, win_length=4):
+    """
+    Function that counts, over game records files, how many games went through every position (a position and its
+    mirror image are counted together) and how they ended, and writes the counts to a position index. At most
+    max_entries positions are held in memory: when there are more, they are written to a sorted run in a temporary
+    folder, and the runs are merged at the end, so files of any size can be indexed. Games of other board sizes or win
+    lengths are skipped
+    :param path: file to write
+    :param records_paths: game records files
+    :param rows:
+    :param columns:
+    :param max_entries: positions counted in memory before a run is written
+    :param win_length:
+    :return: tuple of (number of games, number of positions in the index)
+    """
+    key_bytes = get_key_bytes(rows, columns)
+    board = Board(rows, columns, win_length)
+    mirror = Board(rows, columns, win_length)
+    outcomes = {FIRST_WON: 1, SECOND_WON: 2, DRAW: 3}   # result -> counter of the result
+    number_of_games = 0
+    folder = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryDirectory(dir=folder) as runs_folder:
+        runs = []
+        counts = {}
+        for records_path in records_paths:
+            for record in read_records(records_path):
+                if (record.rows, record.columns, record.win_length) != (rows, columns, win_length):
+                    continue
+                number_of_games += 1
+                outcome = outcomes.get(record.result)
+                for key in get_game_positions(record, board, mirror):
+                    entry = counts.get(key)
+                    if entry is None:
+                        entry = counts[key] = [0, 0, 0, 0]
+                    entry[0] += 1
+                    if outcome is not None:
+                        entry[outcome] += 1
+                if len(counts) >= max_entries:
+                    runs.append(os.path.join(runs_folder, "run" + str(len(runs))))
+                    write_run(runs[-1], counts, key_bytes)
+                    counts = {}
+        runs.append(os.path.join(runs_folder, "run" + str(len(runs))))
+        write_run(runs[-1], counts, key_bytes)
+        counts = None
+
+        with TableWriter(path, MAGIC, VERSION, rows, columns, win_length, ENTRY_VALUE) as writer:
+            current_key = None
+            current = None
+            for key, values in heapq.merge(*(read_run(run, key_bytes) for run in runs)):
+                if key != current_key:
+                    if current_key is not None:
+                        writer.write(current_key, current)
+                    current_key = key
+                    current = list(values)
+                else:
+                    for index, value in enumerate(values):
+                        current[index] += value
+            if current_key is not None:
+                writer.write(current_key, current)
+        number_of_entries = writer.get_number_of_entries
+    return number_of_games, number_of_entries
+
+
+class PositionIndex:
+    """
+    Class that reads a position index: a sorted table (book/table.py) of the canonical keys of the positions of recorded
+    games, each with the number of games that went through it and how they ended. Like the opening book, the file is
+    memory-mapped the first time it is needed and positions are found by binary search
+    """
+    def __init__(self, path):
+        self._table = SortedTable(path, MAGIC, VERSION, ENTRY_VALUE, "position index")
+
+    def open(self):
+        self._table.open()
+
+    def __len__(self):
+        return len(self._table)
+
+    def probe(self, board):
+        """
+        Method that looks up the position of a board, or of its mirror image
+        :param board: board of the index's size and win length, otherwise nothing is found
+        :return: tuple of (visits, first player wins, second player wins, draws), or None if no recorded game went
+        through the position
+        """
+        if not self._table.is_for(board):
+            return None
+        return self._table.find(board.get_canonical_key())
+
+    def close(self):
+        self._table.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    # python -m records.positions output_file games.c4r [more.c4r ...] [--max-entries 1048576]
+    import argparse
+
+    arguments = argparse.ArgumentParser(description="Count the games and outcomes of every position of game records")
+    arguments.add_argument("output")
+    arguments.add_argument("records", nargs="+")
+    arguments.add_argument("--rows", type=int, default=6)
+    arguments.add_argument("--columns", type=int, default=7)
+    arguments.add_argument("--win-length", type=int, default=4, help="only games of this win length are indexed")
+    arguments.add_argument("--max-entries", type=int, default=1 << 20, help="positions held in memory at once")
+    options = arguments.parse_args()
+    games, positions = build_position_index(options.output, options.records, options.rows, options.columns,
+                                            options.max_entries, options.win_length)
+    print("Position index of " + str(games) + " games, with " + str(positions) + " positions, written to " +
+          options.output)
@@ -0,0 +1,245 @@
+from board.board import Board
+import mmap
+import os
+import struct
+
+MAGIC = b"C4GR"
+VERSION = 2
+# magic, version
+FILE_HEADER = struct.Struct(">4sB")
+# rows, columns, win length, result, length of the strategy name, number of moves; then the strategy name and the
+# packed moves
+RECORD_HEADER = struct.Struct(">BBBBBH")
+# index file: offset of every record in the records file
+INDEX_ENTRY = struct.Struct(">Q")
+
+# results, by the piece that moved first (piece 1, the human in Game) and second
+UNFINISHED = 0
+FIRST_WON = 1
+SECOND_WON = 2
+DRAW = 3
+
+
+def get_bits_per_move(columns):
+    return max(1, (columns - 1).bit_length())
+
+
+def pack_moves(moves, columns):
+    """
+    Function that packs column indices on the fewest bits that can hold any column (3 bits for 7 columns)
+    :param moves: columns played, in order
+    :param columns: number of columns of the board
+    :return: bytes, the first move in the highest bits
+    """
+    bits = get_bits_per_move(columns)
+    value = 0
+    for column in moves:
+        value = (value << bits) | column
+    number_of_bytes = (len(moves) * bits + 7) // 8
+    return (value << (number_of_bytes * 8 - len(moves) * bits)).to_bytes(number_of_bytes, "big")
+
+
+def unpack_moves(data, number_of_moves, columns):
+    bits = get_bits_per_move(columns)
+    value = int.from_bytes(data, "big") >> (len(data) * 8 - number_of_moves * bits)
+    mask = (1 << bits) - 1
+    return [(value >> (bits * (number_of_moves - 1 - index))) & mask for index in range(number_of_moves)]
+
+
+class GameRecord:
+    """
+    Class that holds a recorded game: the board size and win length, the columns played (the first player, piece 1,
+    starts), the result and the name of the strategy that played it
+    """
+    def __init__(self, moves, result=UNFINISHED, strategy="", rows=6, columns=7, win_length=4):
+        self.moves = list(moves)
+        self.result = result
+        self.strategy = strategy
+        self.rows = rows
+        self.columns = columns
+        self.win_length = win_length
+
+    def get_fields(self):
+        return self.moves, self.result, self.strategy, self.rows, self.columns, self.win_length
+
+    def __eq__(self, other):
+        return isinstance(other, GameRecord) and self.get_fields() == other.get_fields()
+
+    def __repr__(self):
+        return "GameRecord(%r, %r, %r, %r, %r, %r)" % self.get_fields()
+
+    def replay(self, board=None):
+        """
+        Method that plays the moves of the game on a board
+        :param board: board of the game's size and win length to play on (it is cleared first), None for a new one
+        :return: the board
+        :raises ValueError: if the board has another size or win length than the game
+        """
+        if board is None:
+            board = Board(self.rows, self.columns, self.win_length)
+        else:
+            if (board.get_number_of_rows, board.get_number_of_columns, board.get_win_length) != \
+                    (self.rows, self.columns, self.win_length):
+                raise ValueError("The board does not have the size and win length of the game!")
+            board.create_new_board()
+        for index, column in enumerate(self.moves):
+            board.make_move(column, 1 + index % 2)
+        return board
+
+    def to_bytes(self):
+        strategy = self.strategy.encode()
+        return RECORD_HEADER.pack(self.rows, self.columns, self.win_length, self.result, len(strategy),
+                                  len(self.moves)) + strategy + pack_moves(self.moves, self.columns)
+
+    @staticmethod
+    def get_size(header):
+        """
+        Function that computes the size of a record from its header
+        :param header: tuple unpacked with RECORD_HEADER
+        :return: number of bytes of the record, header included
+        """
+        rows, columns, win_length, result, strategy_length, number_of_moves = header
+        return RECORD_HEADER.size + strategy_length + (number_of_moves * get_bits_per_move(columns) + 7) // 8
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        header = RECORD_HEADER.unpack_from(data, offset)
+        rows, columns, win_length, result, strategy_length, number_of_moves = header
+        start = offset + RECORD_HEADER.size
+        strategy = bytes(data[start:start + strategy_length]).decode()
+        end = offset + cls.get_size(header)
+        moves = unpack_moves(bytes(data[start + strategy_length:end]), number_of_moves, columns)
+        return cls(moves, result, strategy, rows, columns, win_length)
+
+
+def get_index_path(path):
+    return str(path) + ".idx"
+
+
+class RecordWriter:
+    """
+    Class that appends game records to a file, and their offsets to its index file (path + ".idx"). Records are only
+    ever added at the end, so a file can be written by several sessions one after another
+    """
+    def __init__(self, path):
+        self._path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            open_records(path).close()  # records are only added to files of this version
+        self._file = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(FILE_HEADER.pack(MAGIC, VERSION))
+        elif not os.path.exists(get_index_path(path)):
+            build_index(path)
+        self._index = open(get_index_path(path), "ab")
+
+    def write(self, record):
+        """
+        Method that appends a record
+        :param record: GameRecord
+        :return: offset of the record in the file
+        """
+        offset = self._file.tell()
+        self._file.write(record.to_bytes())
+        self._index.write(INDEX_ENTRY.pack(offset))
+        return offset
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+
+def open_records(path):
+    """
+    Function that opens a records file and checks its header
+    :param path:
+    :return: the file, positioned on the first record
+    """
+    file = open(path, "rb")
+    magic, version = FILE_HEADER.unpack(file.read(FILE_HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        file.close()
+        raise ValueError("Invalid game records file: " + str(path))
+    return file
+
+
+def read_records(path):
+    """
+    Generator that reads the records of a file one at a time, without loading the whole file
+    :param path:
+    :return: GameRecord objects, in the order they were written
+    """
+    with open_records(path) as file:
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            body = file.read(GameRecord.get_size(RECORD_HEADER.unpack(header)) - RECORD_HEADER.size)
+            yield GameRecord.from_bytes(header + body)
+
+
+def build_index(path):
+    """
+    Function that (re)writes the index file of a records file, by reading the headers of its records
+    :param path:
+    :return: number of records
+    """
+    count = 0
+    with open_records(path) as file, open(get_index_path(path), "wb") as index:
+        offset = FILE_HEADER.size
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return count
+            size = GameRecord.get_size(RECORD_HEADER.unpack(header))
+            index.write(INDEX_ENTRY.pack(offset))
+            offset += size
+            file.seek(offset)
+            count += 1
+
+
+class RecordIndex:
+    """
+    Class that reads any record of a file by its number: the records file and its index file are memory-mapped, so
+    only the pages that are used are read
+    """
+    def __init__(self, path):
+        self._file = open_records(path)
+        self._index_file = open(get_index_path(path), "rb")
+        self._map = None
+        self._index_map = None
+        self._number_of_records = os.path.getsize(get_index_path(path)) // INDEX_ENTRY.size
+        if self._number_of_records:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self._number_of_records
+
+    def __getitem__(self, number):
+        if number < 0:
+            number += self._number_of_records
+        if not 0 <= number < self._number_of_records:
+            raise IndexError("Record number out of range: " + str(number))
+        offset = INDEX_ENTRY.unpack_from(self._index_map, number * INDEX_ENTRY.size)[0]
+        return GameRecord.from_bytes(self._map, offset)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._index_map.close()
+            self._map = None
+            self._index_map = None
+        self._file.close()
+        self._index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
@@ -0,0 +1,140 @@
+from server.server import get_latency_report, print_latency_report, GameServer, PLAYING
+import asyncio
+import collections
+import json
+import random
+import time
+
+
+class Client:
+    """
+    Class that sends requests to a GameServer over one connection and waits for their responses
+    """
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 1
+        self.latencies = collections.defaultdict(list)  # operation -> seconds of every request, as seen by the client
+
+    @classmethod
+    async def connect(cls, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """
+        Method that sends a request and waits for its response
+        :param op: operation: new, move, state, resign or stats
+        :param fields: other fields of the request
+        :return: the response
+        """
+        request = dict(fields, op=op, id=self._next_id)
+        self._next_id += 1
+        start = time.perf_counter()
+        self._writer.write((json.dumps(request) + "\n").encode())
+        await self._writer.drain()
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("The server closed the connection")
+        self.latencies[op].append(time.perf_counter() - start)
+        return json.loads(line)
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def play_game(client, generator, ai=True, depth=3):
+    """
+    Function that plays a game on the server with random human moves
+    :param client:
+    :param generator: random.Random choosing the human moves
+    :param ai: whether the computer uses the AI
+    :param depth: search depth of the computer
+    :return: final status of the game
+    """
+    response = await client.request("new", ai=ai, depth=depth)
+    game_id = response["game"]
+    state = response["state"]
+    while state["status"] == PLAYING:
+        columns = [column for column in range(state["columns"]) if state["board"][state["rows"] - 1][column] == 0]
+        response = await client.request("move", game=game_id, column=generator.choice(columns))
+        state = response["state"]
+        await client.request("state", game=game_id)
+    await client.request("resign", game=game_id)
+    return state["status"]
+
+
+async def run_load(host, port, games=20, concurrency=4, ai=True, depth=3, seed=None):
+    """
+    Function that plays games on a server from several connections at once
+    :param host:
+    :param port:
+    :param games: number of games to play
+    :param concurrency: number of connections, each playing its games one after another
+    :param ai: whether the computer uses the AI
+    :param depth: search depth of the computer
+    :param seed: seed of the human moves, None for random games
+    :return: dictionary with the number of games, their statuses, the elapsed seconds, the games per second and the
+    latencies measured by the clients and by the server (as returned by get_latency_report)
+    """
+    clients = [await Client.connect(host, port) for _ in range(concurrency)]
+    statuses = collections.Counter()
+
+    async def play(number, client):
+        generator = random.Random(None if seed is None else seed + number)
+        for _ in range(number, games, concurrency):
+            statuses[await play_game(client, generator, ai, depth)] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(play(number, client) for number, client in enumerate(clients)))
+    elapsed = time.perf_counter() - start
+    server_stats = await clients[0].request("stats")
+    latencies = collections.defaultdict(list)
+    for client in clients:
+        for operation, values in client.latencies.items():
+            latencies[operation].extend(values)
+        await client.close()
+    return {"games": games, "statuses": dict(statuses), "seconds": elapsed,
+            "games_per_second": games / elapsed if elapsed > 0 else float("inf"),
+            "client_latency": get_latency_report(latencies), "server_latency": server_stats["latency"]}
+
+
+if __name__ == "__main__":
+    # python -m server.client [--port 8765] [--games 100] [--concurrency 8] [--depth 3]
+    # with --local, a server is started in this process on a free port
+    import argparse
+
+    arguments = argparse.ArgumentParser(description="Play many games on a Connect Four server and report latencies")
+    arguments.add_argument("--host", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=8765)
+    arguments.add_argument("--local", action="store_true", help="start a server in this process")
+    arguments.add_argument("--workers", type=int, default=4, help="search threads of the --local server")
+    arguments.add_argument("--games", type=int, default=100)
+    arguments.add_argument("--concurrency", type=int, default=8)
+    arguments.add_argument("--depth", type=int, default=3)
+    arguments.add_argument("--no-ai", action="store_true")
+    arguments.add_argument("--seed", type=int, default=None)
+    options = arguments.parse_args()
+
+    async def main():
+        local_server = None
+        port = options.port
+        if options.local:
+            local_server = GameServer(options.host, 0, options.workers)
+            await local_server.start()
+            port = local_server.get_port
+        try:
+            return await run_load(options.host, port, options.games, options.concurrency, not options.no_ai,
+                                  options.depth, options.seed)
+        finally:
+            if local_server is not None:
+                await local_server.close()
+
+    results = asyncio.run(main())
+    print("%d games in %.3fs: %.1f games/s, %s" % (results["games"], results["seconds"], results["games_per_second"],
+                                                  results["statuses"]))
+    print("client latency:")
+    print_latency_report(results["client_latency"])
+    print("server latency:")
+    print_latency_report(results["server_latency"])
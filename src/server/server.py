@@ -0,0 +1,341 @@
+from board.board import Board
+from concurrent.futures import ThreadPoolExecutor
+from exceptions.exceptions import RequestError
+from game.game import Game
+from records.records import GameRecord, RecordWriter, UNFINISHED, FIRST_WON, SECOND_WON, DRAW as RECORD_DRAW
+from validators.validators import ValidateBoard
+import asyncio
+import collections
+import json
+import logging
+import math
+import time
+
+"""
+Protocol: every request and every response is one json object on one line. A request has an "op" and may have an
+"id", which is copied to its response. Every response has "ok": true, or "ok": false and an "error" message.
+    {"op": "new", "ai": true, "depth": 5}       -> {"ok": true, "game": 1, "state": {...}}   (the human moves first)
+    {"op": "move", "game": 1, "column": 3}      -> {"ok": true, "human": {"row": 0, "column": 3},
+                                                    "computer": {"row": 0, "column": 2} or null, "state": {...}}
+    {"op": "state", "game": 1}                  -> {"ok": true, "state": {...}}
+    {"op": "resign", "game": 1}                 -> {"ok": true, "state": {...}}   (the game is removed)
+    {"op": "stats"}                             -> {"ok": true, "games": 1, "latency": {"move": {"count": ...}, ...}}
+A state is {"rows": 6, "columns": 7, "board": [[...], ...] (row 0 at the bottom), "moves": [3, 2, ...],
+"status": "playing", "human_won", "computer_won", "draw" or "resigned"}. Games are removed when the connection that
+created them closes, and only that connection can use them: for the others they are unknown games. With a records
+file, every game is appended to it when it is removed. The depth of a game is at most the server's max_depth
+"""
+
+PLAYING = "playing"
+HUMAN_WON = "human_won"
+COMPUTER_WON = "computer_won"
+DRAW = "draw"
+RESIGNED = "resigned"
+
+LATENCY_SAMPLES = 10000     # latencies kept for every operation, the most recent ones
+
+logger = logging.getLogger(__name__)
+
+
+def get_latency_report(latencies, percentiles=(50, 90, 99)):
+    """
+    Function that summarizes latencies
+    :param latencies: dictionary of operation -> list of latencies in seconds
+    :param percentiles:
+    :return: dictionary of operation -> {"count", "p50_ms", "p90_ms", "p99_ms", "max_ms"} (nearest-rank percentiles)
+    """
+    report = {}
+    for operation, values in latencies.items():
+        if not values:
+            continue
+        values = sorted(values)
+        summary = {"count": len(values)}
+        for percentile in percentiles:
+            index = max(0, math.ceil(percentile / 100 * len(values)) - 1)
+            summary["p" + str(percentile) + "_ms"] = values[index] * 1000
+        summary["max_ms"] = values[-1] * 1000
+        report[operation] = summary
+    return report
+
+
+class Session:
+    """
+    Class that holds a game played through the server
+    """
+    def __init__(self, game, ai):
+        self.game = game
+        self.ai = ai
+        self.status = PLAYING
+        self.lock = asyncio.Lock()  # one move of a game at a time
+        # state after the last change, for the state requests: the board is searched on a worker thread during a move
+        self.state = self.get_state()
+
+    def get_record(self):
+        board = self.game.get_board
+        results = {PLAYING: UNFINISHED, HUMAN_WON: FIRST_WON, COMPUTER_WON: SECOND_WON, DRAW: RECORD_DRAW,
+                   RESIGNED: SECOND_WON}
+        return GameRecord([move[1] for move in board.get_moves()], results[self.status],
+                          "server/" + ("ai" if self.ai else "no_ai"), board.get_number_of_rows,
+                          board.get_number_of_columns, board.get_win_length)
+
+    def get_state(self):
+        board = self.game.get_board
+        return {"rows": board.get_number_of_rows, "columns": board.get_number_of_columns,
+                "board": board.get_matrix(), "moves": [move[1] for move in board.get_moves()], "status": self.status}
+
+    def update_state(self):
+        """
+        Method that takes a new snapshot of the state, when the board is not being searched
+        :return: the state
+        """
+        self.state = self.get_state()
+        return self.state
+
+
+class GameServer:
+    """
+    Class that hosts many games at once for clients connected over TCP, with the newline delimited json protocol
+    described above. The connections and games are handled by one asyncio event loop; the computer moves are searched
+    by a bounded pool of threads, so a slow search does not stop the other games from being served. The searches are
+    pure Python, so the threads share one core: more workers keep more searches going at once, not faster; to use more
+    cores, run one server per core
+    """
+    def __init__(self, host="127.0.0.1", port=0, workers=4, search_depth=5, search_time_ms=0,
+                 transposition_table_size=4096, max_games=1000, records_path=None, max_depth=10):
+        self._host = host
+        self._port = port
+        self._workers = workers
+        self._search_depth = search_depth
+        self._search_time_ms = search_time_ms
+        self._max_depth = max_depth             # deepest search a client can ask for, searches grow exponentially
+        self._transposition_table_size = transposition_table_size
+        self._max_games = max_games
+        self._records_path = records_path     # game records file the finished games are added to, None for none
+        self._record_writer = None
+        self._server = None
+        self._executor = None
+        self._sessions = {}
+        self._next_game = 1
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=LATENCY_SAMPLES))
+
+    @property
+    def get_port(self):
+        return self._port
+
+    async def start(self):
+        """
+        Method that starts listening; with port 0 a free port is chosen, see get_port
+        :return:
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self._workers)
+        if self._records_path:
+            self._record_writer = RecordWriter(self._records_path)
+        self._server = await asyncio.start_server(self.handle_connection, self._host, self._port)
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Method that stops listening, stops the computer moves being searched and removes the games once their moves
+        are done
+        :return:
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for session in self._sessions.values():
+            session.game.stop_search()
+        for game_id, session in list(self._sessions.items()):
+            async with session.lock:
+                self.remove_session(game_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._record_writer is not None:
+            self._record_writer.close()
+            self._record_writer = None
+
+    def remove_session(self, game_id):
+        """
+        Method that removes a game, saving it to the records file if there is one
+        :param game_id:
+        :return: the removed session, or None if there was no such game
+        """
+        session = self._sessions.pop(game_id, None)
+        if session is not None:
+            session.game.close()
+            if self._record_writer is not None:
+                self._record_writer.write(session.get_record())
+        return session
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    def get_latency_report(self):
+        return get_latency_report(self._latencies)
+
+    async def handle_connection(self, reader, writer):
+        owned = set()   # games created by this connection
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.handle_request(line, owned)
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for game_id in owned:
+                self.remove_session(game_id)
+            writer.close()
+
+    async def handle_request(self, line, owned):
+        """
+        Method that answers one request, and records how long it took
+        :param line: the request, as read from the connection
+        :param owned: ids of the games created by the connection
+        :return: the response
+        """
+        start = time.perf_counter()
+        operation = "invalid"
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RequestError("Invalid json!")
+            if not isinstance(request, dict):
+                raise RequestError("A request must be a json object!")
+            request_id = request.get("id")
+            operation = request.get("op")
+            handler = None
+            if isinstance(operation, str):
+                handler = {"new": self.new_game, "move": self.move, "state": self.get_state, "resign": self.resign,
+                           "stats": self.get_stats}.get(operation)
+            if handler is None:
+                operation = "invalid"
+                raise RequestError("Unknown op! Must be new, move, state, resign or stats!")
+            response = await handler(request, owned)
+            response["ok"] = True
+        except RequestError as re:
+            response = {"ok": False, "error": str(re)}
+        except Exception:
+            # a bug must not close the connection, nor the other games of the client
+            logger.exception("Request failed: %r", line)
+            response = {"ok": False, "error": "Internal error!"}
+        if request_id is not None:
+            response["id"] = request_id
+        self._latencies[operation].append(time.perf_counter() - start)
+        return response
+
+    def get_session(self, request, owned):
+        """
+        Method that finds the game of a request
+        :param request:
+        :param owned: ids of the games created by the connection, the only ones it can use
+        :return: the session
+        """
+        game_id = request.get("game")
+        session = self._sessions.get(game_id) if isinstance(game_id, int) and game_id in owned else None
+        if session is None:
+            raise RequestError("Unknown game!")
+        return session
+
+    async def new_game(self, request, owned):
+        if len(self._sessions) >= self._max_games:
+            raise RequestError("Too many games!")
+        depth = request.get("depth", self._search_depth)
+        if not isinstance(depth, int) or not 1 <= depth <= self._max_depth:
+            raise RequestError("Invalid depth! Must be an integer between 1 and " + str(self._max_depth) + "!")
+        game = Game(Board(6, 7), ValidateBoard(), self._transposition_table_size, depth, self._search_time_ms)
+        game_id = self._next_game
+        self._next_game += 1
+        session = Session(game, bool(request.get("ai", True)))
+        self._sessions[game_id] = session
+        owned.add(game_id)
+        return {"game": game_id, "state": session.state}
+
+    async def move(self, request, owned):
+        session = self.get_session(request, owned)
+        async with session.lock:
+            board = session.game.get_board
+            if session.status != PLAYING:
+                raise RequestError("The game is over!")
+            column = request.get("column")
+            if not isinstance(column, int) or not 0 <= column < board.get_number_of_columns:
+                raise RequestError("Invalid move! Must be an integer between 0 and " +
+                                   str(board.get_number_of_columns - 1) + "!")
+            if not board.is_valid_column(column):
+                raise RequestError("Invalid move! Column " + str(column) + " is full!")
+            human = {"row": board.make_move(column, 1), "column": column}
+            computer = None
+            if board.get_winner() == 1:
+                session.status = HUMAN_WON
+            elif board.is_board_full():
+                session.status = DRAW
+            else:
+                session.update_state()
+                loop = asyncio.get_running_loop()
+                column = await loop.run_in_executor(self._executor, session.game.compute_computer_move, session.ai)
+                computer = {"row": board.make_move(column, 2), "column": column}
+                if board.get_winner() == 2:
+                    session.status = COMPUTER_WON
+                elif board.is_board_full():
+                    session.status = DRAW
+            return {"human": human, "computer": computer, "state": session.update_state()}
+
+    async def get_state(self, request, owned):
+        return {"state": self.get_session(request, owned).state}
+
+    async def resign(self, request, owned):
+        session = self.get_session(request, owned)
+        async with session.lock:
+            if session.status == PLAYING:
+                session.status = RESIGNED
+            self.remove_session(request.get("game"))
+            owned.discard(request.get("game"))
+            return {"state": session.update_state()}
+
+    async def get_stats(self, request, owned):
+        return {"games": len(self._sessions), "workers": self._workers, "latency": self.get_latency_report()}
+
+
+def print_latency_report(report):
+    print("%-8s %8s %10s %10s %10s %10s" % ("op", "count", "p50 ms", "p90 ms", "p99 ms", "max ms"))
+    for operation, summary in sorted(report.items()):
+        print("%-8s %8d %10.2f %10.2f %10.2f %10.2f" % (operation, summary["count"], summary["p50_ms"],
+                                                        summary["p90_ms"], summary["p99_ms"], summary["max_ms"]))
+
+
+if __name__ == "__main__":
+    # python -m server.server [--port 8765] [--workers 4] [--depth 5]; Ctrl+C stops it and prints the latencies
+    import argparse
+
+    arguments = argparse.ArgumentParser(description="Host Connect Four games over a local TCP socket")
+    arguments.add_argument("--host", default="127.0.0.1")
+    arguments.add_argument("--port", type=int, default=8765)
+    arguments.add_argument("--workers", type=int, default=4,
+                           help="threads searching the computer moves; they share one core, run a server per core")
+    arguments.add_argument("--depth", type=int, default=5)
+    arguments.add_argument("--max-depth", type=int, default=10, help="deepest search a client can ask for")
+    arguments.add_argument("--time-ms", type=int, default=0)
+    arguments.add_argument("--table-size", type=int, default=4096)
+    arguments.add_argument("--records", help="append the games to this game records file")
+    options = arguments.parse_args()
+    game_server = GameServer(options.host, options.port, options.workers, options.depth, options.time_ms,
+                             options.table_size, records_path=options.records, max_depth=options.max_depth)
+
+    async def serve():
+        await game_server.start()
+        print("Listening on " + options.host + ":" + str(game_server.get_port))
+        try:
+            await game_server.serve_forever()
+        finally:
+            await game_server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        print_latency_report(game_server.get_latency_report())
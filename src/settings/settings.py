@@ -1,9 +1,7 @@
 from configparser import ConfigParser
 from board.board import Board
 from exceptions.exceptions import SettingsError
-from game.game import Game
-from gui.gui import Gui
-from ui.ui import Ui
+from game.game import Game, MOVE_ORDERINGS, STRATEGIES
 from validators.validators import ValidateBoard
 import os
 
@@ -24,6 +22,42 @@ class Settings:
             no_of_columns = int(no_of_columns)
         except ValueError:
             raise SettingsError("Invalid board dimensions! They must be positive integers!")
+        if no_of_rows <= 0 or no_of_columns <= 0:
+            raise SettingsError("Invalid board dimensions! They must be positive integers!")
+        win_length = self.read_non_negative_integer(parser, "win_length", 4)
+        if win_length < 2 or win_length > max(no_of_rows, no_of_columns):
+            raise SettingsError("Invalid win_length setting! It must be at least 2 and fit on the board!")
+        transposition_table_size = self.read_non_negative_integer(parser, "transposition_table_size", 65536)
+        search_depth = self.read_non_negative_integer(parser, "search_depth", 5)
+        search_time_ms = self.read_non_negative_integer(parser, "search_time_ms", 0)
+        search_workers = self.read_non_negative_integer(parser, "search_workers", 1)
+        endgame_threshold = self.read_non_negative_integer(parser, "endgame_threshold", 12)
+        opening_book = parser.get("settings", "opening_book", fallback="").strip()
+        if opening_book:
+            opening_book = os.path.join(thisfolder, opening_book)   # relative to this folder, unless absolute
+            if not os.path.isfile(opening_book):
+                raise SettingsError("Invalid opening_book setting! File " + opening_book + " does not exist!")
+        statistics_file = parser.get("settings", "statistics_file", fallback="").strip()
+        if statistics_file:
+            statistics_file = os.path.join(thisfolder, statistics_file)
+        ponder = parser.get("settings", "ponder", fallback="no").strip().lower()
+        if ponder not in ("yes", "no"):
+            raise SettingsError("Invalid ponder setting! It must be yes or no!")
+        mirror_symmetry = parser.get("settings", "mirror_symmetry", fallback="yes").strip().lower()
+        if mirror_symmetry not in ("yes", "no"):
+            raise SettingsError("Invalid mirror_symmetry setting! It must be yes or no!")
+        move_ordering = parser.get("settings", "move_ordering", fallback="history").strip().lower()
+        if move_ordering not in MOVE_ORDERINGS:
+            raise SettingsError("Invalid move_ordering setting! It must be one of: " + ", ".join(MOVE_ORDERINGS) + "!")
+        strategy = parser.get("settings", "strategy", fallback="minimax").strip().lower()
+        if strategy not in STRATEGIES:
+            raise SettingsError("Invalid strategy setting! It must be one of: " + ", ".join(STRATEGIES) + "!")
+        mcts_playouts = self.read_non_negative_integer(parser, "mcts_playouts", 20000)
+        if strategy == "mcts" and mcts_playouts == 0 and search_time_ms == 0:
+            raise SettingsError("Invalid mcts_playouts setting! It must be positive when search_time_ms is 0!")
+        mcts_rollout = parser.get("settings", "mcts_rollout", fallback="random").strip().lower()
+        if mcts_rollout not in ("random", "no_ai"):
+            raise SettingsError("Invalid mcts_rollout setting! It must be random or no_ai!")
         ui_style = parser.get("settings", "UI")
         ui_style.lower()
 
@@ -32,28 +66,69 @@ class Settings:
         """
         Initialize board
         """
-        board = Board(int(no_of_rows), int(no_of_columns))
+        board = Board(int(no_of_rows), int(no_of_columns), win_length)
         board_valid = ValidateBoard()
+        if opening_book:
+            self.check_opening_book(opening_book, board)
         """
         Initialize game
         """
-        game = Game(board, board_valid)
+        game = Game(board, board_valid, transposition_table_size, search_depth, search_time_ms, search_workers,
+                    opening_book, statistics_file=statistics_file or None, endgame_threshold=endgame_threshold,
+                    ponder=ponder == "yes", mirror_symmetry=mirror_symmetry == "yes", move_ordering=move_ordering,
+                    strategy=strategy, mcts_playouts=mcts_playouts, mcts_rollout=mcts_rollout)
         if ai == "yes":
-            if ui_style == "ui":
-                self._ui = Ui(game, ai=True)
-            elif ui_style == "gui":
-                self._ui = Gui(game, ai=True)
-            else:
-                raise SettingsError("Invalid UI settings!")
+            ai = True
         elif ai == "no":
-            if ui_style == "ui":
-                self._ui = Ui(game, ai=False)
-            elif ui_style == "gui":
-                self._ui = Gui(game, ai=False)
-            else:
-                raise SettingsError("Invalid UI settings!")
+            ai = False
         else:
             raise SettingsError("Invalid AI settings!")
+        # only the selected interface is imported: the graphical one loads pygame
+        if ui_style == "ui":
+            from ui.ui import Ui
+            self._ui = Ui(game, ai=ai)
+        elif ui_style == "gui":
+            from gui.gui import Gui
+            self._ui = Gui(game, ai=ai)
+        else:
+            raise SettingsError("Invalid UI settings!")
+
+    @staticmethod
+    def check_opening_book(path, board):
+        """
+        Check that an opening book file is valid and was built for the board's size and win length
+        :param path:
+        :param board:
+        :return:
+        """
+        from book.book import OpeningBook
+        book = OpeningBook(path)
+        try:
+            if not book.is_for(board):
+                raise SettingsError("Invalid opening_book setting! The book was built for another board size or win "
+                                    "length!")
+        except ValueError as ve:
+            raise SettingsError("Invalid opening_book setting! " + str(ve) + "!")
+        finally:
+            book.close()
+
+    @staticmethod
+    def read_non_negative_integer(parser, option, default):
+        """
+        Read an optional integer setting
+        :param parser: ConfigParser of 'settings.properties'
+        :param option: name of the setting
+        :param default: value used when the setting is missing
+        :return:
+        """
+        value = parser.get("settings", option, fallback=str(default))
+        try:
+            value = int(value)
+        except ValueError:
+            raise SettingsError("Invalid " + option + " setting! It must be a non-negative integer!")
+        if value < 0:
+            raise SettingsError("Invalid " + option + " setting! It must be a non-negative integer!")
+        return value
 
     @property
     def ui(self):
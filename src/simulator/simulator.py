@@ -0,0 +1,219 @@
+from records.records import GameRecord, FIRST_WON, SECOND_WON, DRAW
+import numpy as np
+import time
+
+RANDOM = "random"   # move on a random available column, like Game.move_computer_random
+NO_AI = "no_ai"     # win if possible, else block the opponent, else random, like Game.move_computer_no_ai
+STRATEGIES = (RANDOM, NO_AI)
+
+
+class BatchSimulator:
+    """
+    Class that plays many games at once without any user interface: the boards are one (games, rows, columns) NumPy
+    array (row 0 being the bottom row, as in Board), and every turn picks, drops and checks the moves of all the
+    unfinished games with array operations. Piece 1 (the human in Game) moves first, and win_length pieces in a row
+    win
+    """
+    def __init__(self, number_of_games, rows=6, columns=7, seed=None, win_length=4):
+        self._number_of_games = number_of_games
+        self._number_of_rows = rows
+        self._number_of_columns = columns
+        self._win_length = win_length
+        self._random = np.random.default_rng(seed)
+        self._boards = np.zeros((number_of_games, rows, columns), dtype=np.int8)
+        self._heights = np.zeros((number_of_games, columns), dtype=np.int64)
+        self._winners = np.zeros(number_of_games, dtype=np.int8)        # 0 = no winner (yet)
+        self._finished = np.zeros(number_of_games, dtype=bool)
+        self._moves = np.full((number_of_games, rows * columns), -1, dtype=np.int8)  # columns played, -1 = no move
+        self._number_of_moves = np.zeros(number_of_games, dtype=np.int64)
+
+    @property
+    def get_boards(self):
+        return self._boards
+
+    @property
+    def get_winners(self):
+        return self._winners
+
+    @property
+    def get_moves(self):
+        return self._moves
+
+    def get_available_locations(self, games):
+        """
+        Method that returns the legal moves of some games
+        :param games: indices of the games
+        :return: (games, columns) boolean array, True for the columns that are not full
+        """
+        return self._heights[games] < self._number_of_rows
+
+    def drop_pieces(self, games, columns, piece):
+        """
+        Method that drops piece in the given column of every given game
+        :param games: indices of the games
+        :param columns: column of every game (must not be full)
+        :param piece:
+        :return: rows the pieces fell on
+        """
+        rows = self._heights[games, columns]
+        self._boards[games, rows, columns] = piece
+        self._heights[games, columns] += 1
+        self._moves[games, self._number_of_moves[games]] = columns
+        self._number_of_moves[games] += 1
+        return rows
+
+    @staticmethod
+    def is_winning_move(boards, piece, win_length=4):
+        """
+        Function that checks a stack of boards for lines of win_length pieces, in all directions at once
+        :param boards: (games, rows, columns) array
+        :param piece:
+        :param win_length:
+        :return: (games,) boolean array, True for the boards where piece has win_length in a row
+        """
+        pieces = boards == piece
+        rows, columns = pieces.shape[1:]
+        length = win_length
+        wins = np.zeros(len(boards), dtype=bool)
+        # every array holds the first cells of lines, growing by one cell at a time; a direction in which a line does
+        # not fit on the board has no wins
+        if length <= columns:
+            horizontal = pieces[:, :, :columns - length + 1]
+            for i in range(1, length):
+                horizontal = horizontal & pieces[:, :, i:columns - length + 1 + i]
+            wins |= horizontal.any(axis=(1, 2))
+        if length <= rows:
+            vertical = pieces[:, :rows - length + 1, :]
+            for i in range(1, length):
+                vertical = vertical & pieces[:, i:rows - length + 1 + i, :]
+            wins |= vertical.any(axis=(1, 2))
+        if length <= rows and length <= columns:
+            upwards = pieces[:, :rows - length + 1, :columns - length + 1]
+            downwards = pieces[:, length - 1:, :columns - length + 1]
+            for i in range(1, length):
+                upwards = upwards & pieces[:, i:rows - length + 1 + i, i:columns - length + 1 + i]
+                downwards = downwards & pieces[:, length - 1 - i:rows - i, i:columns - length + 1 + i]
+            wins |= upwards.any(axis=(1, 2)) | downwards.any(axis=(1, 2))
+        return wins
+
+    def get_winning_columns(self, games, piece, available):
+        """
+        Method that finds, for every given game, the columns where dropping piece would make win_length in a row
+        :param games: indices of the games
+        :param piece:
+        :param available: (games, columns) legal moves of the games
+        :return: (games, columns) boolean array
+        """
+        winning = np.zeros(available.shape, dtype=bool)
+        for column in range(self._number_of_columns):
+            playable = np.flatnonzero(available[:, column])
+            if len(playable) == 0:
+                continue
+            boards = self._boards[games[playable]]
+            boards[np.arange(len(playable)), self._heights[games[playable], column], column] = piece
+            winning[playable, column] = self.is_winning_move(boards, piece, self._win_length)
+        return winning
+
+    def choose_random(self, available):
+        """
+        Method that picks a random legal column for every game
+        :param available: (games, columns) legal moves
+        :return: (games,) columns
+        """
+        return np.argmax(np.where(available, self._random.random(available.shape), -1), axis=1)
+
+    def choose_no_ai(self, games, piece, available):
+        """
+        Method that picks, for every game, the first column that wins, else the first column that blocks a win of the
+        opponent, else a random column
+        :param games: indices of the games
+        :param piece: piece to move
+        :param available: (games, columns) legal moves
+        :return: (games,) columns
+        """
+        columns = self.choose_random(available)
+        blocking = self.get_winning_columns(games, 3 - piece, available)
+        can_block = blocking.any(axis=1)
+        columns[can_block] = np.argmax(blocking[can_block], axis=1)
+        winning = self.get_winning_columns(games, piece, available)
+        can_win = winning.any(axis=1)
+        columns[can_win] = np.argmax(winning[can_win], axis=1)
+        return columns
+
+    def get_records(self, strategy=""):
+        """
+        Method that converts the finished games to game records
+        :param strategy: name of the strategies that played, saved in the records
+        :return: list of GameRecord
+        """
+        results = {0: DRAW, 1: FIRST_WON, 2: SECOND_WON}
+        return [GameRecord(self._moves[game, :self._number_of_moves[game]].tolist(), results[int(self._winners[game])],
+                           strategy, self._number_of_rows, self._number_of_columns, self._win_length)
+                for game in np.flatnonzero(self._finished)]
+
+    def play(self, first_strategy=RANDOM, second_strategy=NO_AI):
+        """
+        Method that plays all the games to the end
+        :param first_strategy: strategy of piece 1, which moves first
+        :param second_strategy: strategy of piece 2
+        :return: dictionary of statistics: number of games, wins of both pieces, draws, average number of moves,
+        elapsed seconds and games per second
+        """
+        for strategy in (first_strategy, second_strategy):
+            if strategy not in STRATEGIES:
+                raise ValueError("Unknown strategy: " + str(strategy))
+        start = time.perf_counter()
+        piece = 1
+        while not self._finished.all():
+            games = np.flatnonzero(~self._finished)
+            available = self.get_available_locations(games)
+            strategy = first_strategy if piece == 1 else second_strategy
+            if strategy == RANDOM:
+                columns = self.choose_random(available)
+            else:
+                columns = self.choose_no_ai(games, piece, available)
+            self.drop_pieces(games, columns, piece)
+
+            won = self.is_winning_move(self._boards[games], piece, self._win_length)
+            self._winners[games[won]] = piece
+            self._finished[games[won]] = True
+            full = (self._heights[games] == self._number_of_rows).all(axis=1)
+            self._finished[games[full]] = True
+            piece = 3 - piece
+        elapsed = time.perf_counter() - start
+        return {
+            "games": self._number_of_games,
+            "first_wins": int((self._winners == 1).sum()),
+            "second_wins": int((self._winners == 2).sum()),
+            "draws": int((self._winners == 0).sum()),
+            "average_moves": float(self._number_of_moves.mean()),
+            "seconds": elapsed,
+            "games_per_second": self._number_of_games / elapsed if elapsed > 0 else float("inf"),
+        }
+
+
+if __name__ == "__main__":
+    # python -m simulator.simulator [--games 10000] [--first random] [--second no_ai] [--seed 0] [--records file]
+    import argparse
+    from records.records import RecordWriter
+
+    arguments = argparse.ArgumentParser(description="Play many headless games at once")
+    arguments.add_argument("--games", type=int, default=10000)
+    arguments.add_argument("--rows", type=int, default=6)
+    arguments.add_argument("--columns", type=int, default=7)
+    arguments.add_argument("--win-length", type=int, default=4)
+    arguments.add_argument("--first", choices=STRATEGIES, default=RANDOM)
+    arguments.add_argument("--second", choices=STRATEGIES, default=NO_AI)
+    arguments.add_argument("--seed", type=int, default=None)
+    arguments.add_argument("--records", help="append the games to this game records file")
+    options = arguments.parse_args()
+    simulator = BatchSimulator(options.games, options.rows, options.columns, options.seed, options.win_length)
+    statistics = simulator.play(options.first, options.second)
+    print("%d games in %.3fs: %.0f games/s" % (statistics["games"], statistics["seconds"],
+                                             statistics["games_per_second"]))
+    print("first player wins: %d, second player wins: %d, draws: %d, average moves: %.1f" % (
+        statistics["first_wins"], statistics["second_wins"], statistics["draws"], statistics["average_moves"]))
+    if options.records:
+        with RecordWriter(options.records) as writer:
+            for record in simulator.get_records(options.first + "/" + options.second):
+                writer.write(record)
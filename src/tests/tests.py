@@ -1,8 +1,40 @@
 from board.board import Board
+from concurrent.futures import ThreadPoolExecutor
+from benchmark.benchmark import load_corpus, run_benchmark, find_regressions, measure_startup, benchmark_scaling, \
+    benchmark_move_orderings
+from board.geometry import get_geometry
+from book.book import OpeningBook, build_opening_book
+from book.table import SortedTable, TableWriter
+import random
 import unittest
 from exceptions.exceptions import InputError
-from game.game import Game
+from game.game import Game, MCTS, WINNING_SCORE
+from game.mcts import MonteCarloTreeSearch, Playouts, RANDOM, NO_AI
+from game.solver import EndgameSolver, WIN, DRAW, LOSS
+from game.transposition import TranspositionTable, EXACT, LOWER_BOUND
+from records.records import GameRecord, RecordWriter, RecordIndex, read_records, build_index, pack_moves, \
+    unpack_moves, get_index_path, FIRST_WON, SECOND_WON, DRAW as RECORD_DRAW, UNFINISHED, FILE_HEADER
+from records.positions import PositionIndex, build_position_index, get_game_positions
+from server.client import Client, run_load
+from server.server import GameServer, PLAYING, RESIGNED
+import asyncio
+import json
+import math
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
 from validators.validators import ValidateBoard
+try:
+    import numpy
+    from board.batch import evaluate_boards, boards_to_array
+    from simulator.simulator import BatchSimulator
+except ImportError:     # NumPy is only needed by the batch tools
+    numpy = None
 
 
 class TestBoard(unittest.TestCase):
@@ -17,8 +49,8 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(self._board.get_number_of_columns, 7)
 
     def test_get_board_position(self):
-        self._board._board[2][0] = 2
-        self._board._board[4][2] = 1
+        self._board.drop_piece_on_board(2, 0, 2)
+        self._board.drop_piece_on_board(4, 2, 1)
         self.assertEqual(self._board.get_board_value(2, 0), 2)
         self.assertEqual(self._board.get_board_value(4, 2), 1)
         self.assertEqual(self._board.get_board_value(0, 0), 0)
@@ -102,6 +134,211 @@ class TestBoard(unittest.TestCase):
         self._board.drop_piece_on_board(2, 5, 4)
         self.assertTrue(self._board.is_winning_move(4))
 
+    def test_winning_move_does_not_wrap(self):
+        # 2 pieces at the top of column 0 and 2 at the bottom of column 1 are not a vertical line
+        self._board.drop_piece_on_board(4, 0, 1)
+        self._board.drop_piece_on_board(5, 0, 1)
+        self._board.drop_piece_on_board(0, 1, 1)
+        self._board.drop_piece_on_board(1, 1, 1)
+        self.assertFalse(self._board.is_winning_move(1))
+        # same for a diagonal starting on the top row
+        self._board.drop_piece_on_board(5, 2, 2)
+        self._board.drop_piece_on_board(0, 3, 2)
+        self._board.drop_piece_on_board(1, 4, 2)
+        self._board.drop_piece_on_board(2, 5, 2)
+        self.assertFalse(self._board.is_winning_move(2))
+
+    def test_winning_move_random_boards(self):
+        generator = random.Random(7)
+        for _ in range(200):
+            board = Board(6, 7)
+            for _ in range(generator.randint(0, 30)):
+                column = generator.choice(board.get_available_locations())
+                board.drop_piece_on_board(board.get_next_available_row(column), column, generator.randint(1, 2))
+            matrix = board.get_matrix()
+            for piece in (1, 2):
+                expected = False
+                for row in range(6):
+                    for column in range(7):
+                        for row_step, column_step in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                            cells = [(row + i * row_step, column + i * column_step) for i in range(4)]
+                            if all(0 <= r < 6 and 0 <= c < 7 and matrix[r][c] == piece for r, c in cells):
+                                expected = True
+                self.assertEqual(board.is_winning_move(piece), expected)
+
+    def test_win_length(self):
+        generator = random.Random(5)
+        for rows, columns, length in ((6, 7, 3), (6, 7, 5), (10, 12, 5), (20, 20, 4), (20, 20, 8), (5, 5, 5)):
+            for _ in range(5):
+                board = Board(rows, columns, length)
+                self.assertEqual(board.get_win_length, length)
+                for _ in range(generator.randint(0, rows * columns)):
+                    column = generator.choice(board.get_available_locations())
+                    row = board.make_move(column, generator.randint(1, 2))
+                    if board.is_board_full():
+                        break
+                matrix = board.get_matrix()
+                for piece in (1, 2):
+                    expected = False
+                    for row in range(rows):
+                        for column in range(columns):
+                            for row_step, column_step in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+                                cells = [(row + i * row_step, column + i * column_step) for i in range(length)]
+                                if all(0 <= r < rows and 0 <= c < columns and matrix[r][c] == piece
+                                       for r, c in cells):
+                                    expected = True
+                    self.assertEqual(board.is_winning_move(piece), expected)
+                    self.assertEqual(board.get_score(piece), board.recompute_score(piece))
+                # the last move wins if it is on a line of win_length
+                if board.get_moves():
+                    row, column, piece = board.get_last_move()
+                    board.undo_move()
+                    had_line = board.is_winning_move(piece)
+                    board.make_move(column, piece)
+                    if not had_line:
+                        self.assertEqual(board.get_winner() == piece, board.is_winning_move(piece))
+                self.assertEqual(board.get_board_copy().get_win_length, length)
+        board = Board(6, 7, 5)
+        for column in range(4):
+            board.make_move(column, 1)
+        self.assertEqual(board.get_winner(), 0)     # 4 in a row do not win at 5
+        board.make_move(4, 1)
+        self.assertEqual(board.get_winner(), 1)
+
+    def test_get_winner(self):
+        self.assertIsNone(self._board.get_last_move())
+        self.assertEqual(self._board.get_winner(), 0)
+        for column in range(3):
+            self._board.drop_piece_on_board(0, column, 1)
+            self._board.drop_piece_on_board(1, column, 2)
+        self.assertEqual(self._board.get_last_move(), (1, 2, 2))
+        self.assertEqual(self._board.get_winner(), 0)
+        self._board.drop_piece_on_board(0, 3, 1)
+        self.assertEqual(self._board.get_winner(), 1)
+        # only the last move counts: the line of 1s is not through the 2 dropped on top of it
+        self._board.drop_piece_on_board(1, 3, 2)
+        self.assertEqual(self._board.get_winner(), 2)
+        self._board.drop_piece_on_board(2, 3, 1)
+        self.assertEqual(self._board.get_winner(), 0)
+        self.assertTrue(self._board.is_winning_move(1))
+
+    def test_is_line_through(self):
+        # diagonal downwards, completed in the middle
+        self._board.drop_piece_on_board(3, 1, 1)
+        self._board.drop_piece_on_board(1, 3, 1)
+        self.assertFalse(self._board.is_line_through(2, 2, 1))
+        self._board.drop_piece_on_board(0, 4, 1)
+        self._board.drop_piece_on_board(2, 2, 1)
+        self.assertTrue(self._board.is_line_through(2, 2, 1))
+        self.assertTrue(self._board.is_line_through(0, 4, 1))
+        self.assertFalse(self._board.is_line_through(2, 2, 2))
+
+    def test_get_hash(self):
+        self.assertEqual(self._board.get_hash(), 0)
+        self._board.drop_piece_on_board(0, 3, 1)
+        self._board.drop_piece_on_board(0, 2, 2)
+        other_board = Board(6, 7)
+        other_board.drop_piece_on_board(0, 2, 2)
+        other_board.drop_piece_on_board(0, 3, 1)
+        self.assertEqual(self._board.get_hash(), other_board.get_hash())  # independent of move order
+        self.assertEqual(self._board.get_board_copy().get_hash(), self._board.get_hash())
+        other_board.drop_piece_on_board(0, 3, 2)    # overwrite
+        self.assertNotEqual(self._board.get_hash(), other_board.get_hash())
+        other_board.drop_piece_on_board(0, 3, 1)
+        self.assertEqual(self._board.get_hash(), other_board.get_hash())
+
+    def test_make_and_undo_move(self):
+        self.assertEqual(self._board.make_move(3, 1), 0)
+        hash_after_first_move = self._board.get_hash()
+        self.assertEqual(self._board.make_move(3, 2), 1)
+        self.assertEqual(self._board.get_last_move(), (1, 3, 2))
+        self.assertEqual(self._board.undo_move(), (1, 3, 2))
+        self.assertEqual(self._board.get_board_value(1, 3), 0)
+        self.assertEqual(self._board.get_next_available_row(3), 1)
+        self.assertEqual(self._board.get_last_move(), (0, 3, 1))
+        self.assertEqual(self._board.get_hash(), hash_after_first_move)
+        for _ in range(6):
+            self._board.make_move(0, 2)
+        self.assertEqual(self._board.get_available_locations(), [1, 2, 3, 4, 5, 6])
+        self._board.undo_move()
+        self.assertEqual(self._board.get_available_locations(), [0, 1, 2, 3, 4, 5, 6])
+        # undoing an overwrite puts back the previous piece
+        self._board.drop_piece_on_board(0, 3, 2)
+        self._board.undo_move()
+        self.assertEqual(self._board.get_board_value(0, 3), 1)
+        while self._board.get_moves():
+            self._board.undo_move()
+        self.assertIsNone(self._board.get_last_move())
+        self.assertEqual(self._board.get_hash(), 0)
+        self.assertEqual(self._board.get_winner(), 0)
+
+    def test_get_score_matches_full_scan(self):
+        generator = random.Random(11)
+        for rows, columns in ((6, 7), (4, 4), (7, 9), (5, 12)):
+            board = Board(rows, columns)
+            for _ in range(300):
+                action = generator.random()
+                if action < 0.2 and board.get_moves():
+                    board.undo_move()
+                elif action < 0.25:     # overwrite any cell, empty included
+                    board.drop_piece_on_board(generator.randrange(rows), generator.randrange(columns),
+                                              generator.randint(0, 2))
+                elif board.get_available_locations():
+                    board.make_move(generator.choice(board.get_available_locations()), generator.randint(1, 2))
+                for piece in (1, 2):
+                    self.assertEqual(board.get_score(piece), board.recompute_score(piece))
+            board_copy = board.get_board_copy()
+            if board_copy.get_available_locations():
+                board_copy.make_move(board_copy.get_available_locations()[0], 2)
+            self.assertEqual(board_copy.get_score(2), board_copy.recompute_score(2))
+        self.assertEqual(self._board.get_score(3), 0)
+
+    def test_is_line_through_random_boards(self):
+        generator = random.Random(5)
+        for rows, columns in ((6, 7), (5, 4), (8, 10)):
+            for _ in range(50):
+                board = Board(rows, columns)
+                for _ in range(generator.randint(0, rows * columns - 1)):
+                    board.make_move(generator.choice(board.get_available_locations()), generator.randint(1, 2))
+                for column in board.get_available_locations():
+                    for piece in (1, 2):
+                        row = board.make_move(column, piece)
+                        expected = board.is_winning_move(piece)
+                        board.undo_move()
+                        if not board.is_winning_move(piece):
+                            self.assertEqual(board.is_line_through(row, column, piece), expected)
+
+    def test_position_keys(self):
+        self._board.make_move(1, 1)
+        self._board.make_move(1, 2)
+        self._board.make_move(2, 1)
+        mirror = Board(6, 7)
+        mirror.make_move(4, 1)
+        mirror.make_move(5, 1)
+        mirror.make_move(5, 2)
+        self.assertEqual(self._board.get_mirrored_position_key(), mirror.get_position_key())
+        self.assertEqual(self._board.get_canonical_key(), mirror.get_canonical_key())
+        other = Board(6, 7)
+        other.make_move(1, 2)
+        other.make_move(1, 1)
+        other.make_move(2, 1)
+        self.assertNotEqual(other.get_position_key(), self._board.get_position_key())
+        self.assertNotEqual(Board(6, 7).get_position_key(), self._board.get_position_key())
+
+    def test_mirror_symmetry(self):
+        generator = random.Random(4)
+        for _ in range(20):
+            board = Board(6, 7)
+            mirror = Board(6, 7)
+            for _ in range(generator.randint(0, 30)):
+                column = generator.choice(board.get_available_locations())
+                piece = generator.randint(1, 2)
+                board.make_move(column, piece)
+                mirror.make_move(6 - column, piece)
+            self.assertEqual(board.get_mirrored_hash(), mirror.get_hash())
+            self.assertEqual(board.get_hash(), mirror.get_mirrored_hash())
+            self.assertEqual(board.get_board_copy().get_mirrored_hash(), board.get_mirrored_hash())
+
     def test_is_board_full(self):
         self.assertFalse(self._board.is_board_full())
         rows = self._board.get_number_of_rows
@@ -131,6 +368,522 @@ class TestBoard(unittest.TestCase):
         self.assertEqual(len(valid_locations), 0)
 
 
+class TestGeometry(unittest.TestCase):
+    def test_windows(self):
+        geometry = get_geometry(6, 7)
+        self.assertIs(get_geometry(6, 7), geometry)     # built once per size
+        self.assertEqual(len(geometry.windows), 6 * 4 + 7 * 3 + 2 * 3 * 4)
+        self.assertEqual(sum(geometry.negative_diagonals), 12)
+        corner = geometry.cell_windows[0]               # bit of cell (0, 0)
+        self.assertEqual(len(corner), 3)
+        self.assertEqual(sorted(negative_diagonal for window, negative_diagonal in corner), [0, 0, 0])
+        center = geometry.cell_windows[3 * 7 + 2]       # bit of cell (2, 3)
+        self.assertEqual(len(center), 4 + 3 + 3 + 3)
+        for rows, columns, length in ((4, 4, 4), (5, 9, 4), (9, 5, 4), (20, 20, 4), (20, 20, 6), (7, 3, 3)):
+            geometry = get_geometry(rows, columns, length)
+            expected = rows * (columns - length + 1) + columns * (rows - length + 1) + \
+                2 * max(0, rows - length + 1) * max(0, columns - length + 1)
+            self.assertEqual(len(geometry.windows), expected)
+            self.assertTrue(all(len(window) == length for window in geometry.windows))
+            # a cell is in at most win_length windows in every direction, whatever the size of the board
+            self.assertLessEqual(max(len(windows) for windows in geometry.cell_windows), 4 * length)
+        self.assertIsNot(get_geometry(6, 7, 5), get_geometry(6, 7))
+
+    def test_pattern_scores(self):
+        board = Board(6, 7)
+        normal, negative_diagonal = board.get_pattern_scores()
+        self.assertEqual(len(normal[0]), 25)
+        self.assertEqual(normal[0][4], 100)                # 4 player pieces, scored for the player
+        self.assertEqual(normal[1][3], -4)                 # 3 player pieces and 1 empty, scored for the computer
+        self.assertEqual(normal[0][2], 2)
+        self.assertEqual(normal[0][2 + 5], 0)              # 2 player pieces and a computer piece
+        self.assertEqual(negative_diagonal[1][3 * 5], 10)
+        self.assertIs(Board(4, 5).get_pattern_scores(), board.get_pattern_scores())
+        normal, negative_diagonal = Board(20, 20, 6).get_pattern_scores()
+        self.assertEqual(len(normal[0]), 49)
+        self.assertEqual(normal[1][6 * 7], 100)
+        self.assertEqual(normal[1][5 * 7], 5)
+        self.assertEqual(normal[0][5 * 7], -4)
+
+
+class TestOpeningBook(unittest.TestCase):
+    def setUp(self) -> None:
+        self._directory = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._directory.name, "book.bin")
+        build_opening_book(self._path, 6, 7, plies=4, depth=2, transposition_table_size=0)
+        self._book = OpeningBook(self._path)
+
+    def tearDown(self) -> None:
+        self._book.close()
+        self._directory.cleanup()
+
+    def test_probe(self):
+        board = Board(6, 7)
+        self.assertIsNone(self._book.probe(board))      # human moves first: no computer move on the empty board
+        for moves in ([0], [3], [2, 4, 4], [6, 6, 0]):
+            board = Board(6, 7)
+            for index, column in enumerate(moves):
+                board.make_move(column, 1 + index % 2)
+            expected_score = Game(board.get_board_copy(), ValidateBoard, 0).iterative_deepening(2)[1]
+            column, score = self._book.probe(board)
+            self.assertEqual(score, expected_score)
+            self.assertIn(column, board.get_available_locations())
+            mirror = Board(6, 7)
+            for index, move in enumerate(moves):
+                mirror.make_move(6 - move, 1 + index % 2)
+            self.assertEqual(self._book.probe(mirror), (6 - column, score))
+        self.assertIsNone(self._book.probe(Board(5, 7)))
+        board = Board(6, 7, 5)
+        board.make_move(3, 1)
+        self.assertIsNone(self._book.probe(board))      # built for 4 in a row
+        self.assertTrue(self._book.is_for(Board(6, 7)))
+        self.assertFalse(self._book.is_for(board))
+        self.assertEqual(len(self._book), 125)
+
+    def test_game_uses_book(self):
+        game = Game(Board(6, 7), ValidateBoard, opening_book=self._path)
+        game.move_human(3)
+        book_column = self._book.probe(game.get_board)[0]
+        game.move_computer(ai=True)
+        self.assertEqual(game.get_board.get_last_move()[1], book_column)
+        game.close()
+
+    def test_sorted_table(self):
+        path = os.path.join(self._directory.name, "table.bin")
+        value = struct.Struct(">H")
+        with TableWriter(path, b"TEST", 1, 6, 7, 4, value) as writer:
+            for key in (2, 5, 1 << 50):
+                writer.write(key, (key % 1000,))
+        table = SortedTable(path, b"TEST", 1, value, "test table")
+        self.assertEqual((len(table), table.get_number_of_rows, table.get_number_of_columns), (3, 6, 7))
+        self.assertEqual(table.find(5), (5,))
+        self.assertEqual(table.find(1 << 50), ((1 << 50) % 1000,))
+        self.assertIsNone(table.find(3))
+        table.close()
+        with self.assertRaises(ValueError):     # another kind of table
+            SortedTable(self._path, b"TEST", 1, value, "test table").open()
+        with self.assertRaises(ValueError):
+            PositionIndex(self._path).open()
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatchEvaluation(unittest.TestCase):
+    def test_evaluate_boards(self):
+        generator = random.Random(2)
+        for rows, columns, length in ((6, 7, 4), (5, 8, 4), (12, 10, 5)):
+            boards = []
+            for _ in range(300):
+                board = Board(rows, columns, length)
+                for _ in range(generator.randint(0, rows * columns - 1)):
+                    board.make_move(generator.choice(board.get_available_locations()), generator.randint(1, 2))
+                boards.append(board)
+            scores = evaluate_boards(boards_to_array(boards), length)
+            self.assertEqual(scores.shape, (300, 2))
+            for board, (player_score, computer_score) in zip(boards, scores.tolist()):
+                self.assertEqual(player_score, board.get_score(1))
+                self.assertEqual(computer_score, board.get_score(2))
+                self.assertEqual(player_score, board.recompute_score(1))
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TestBatchSimulator(unittest.TestCase):
+    def test_play(self):
+        simulator = BatchSimulator(200, seed=3)
+        statistics = simulator.play("random", "no_ai")
+        self.assertEqual(statistics["games"], 200)
+        self.assertEqual(statistics["first_wins"] + statistics["second_wins"] + statistics["draws"], 200)
+        self.assertGreater(statistics["games_per_second"], 0)
+        # replay every game on a Board: same final position and winner, and nobody moved after the game was over
+        for game in range(200):
+            board = Board(6, 7)
+            moves = [column for column in simulator.get_moves[game] if column >= 0]
+            for index, column in enumerate(moves):
+                self.assertEqual(board.get_winner(), 0)
+                board.make_move(int(column), 1 + index % 2)
+            self.assertEqual(board.get_matrix(), simulator.get_boards[game].tolist())
+            self.assertEqual(board.get_winner(), simulator.get_winners[game])
+
+    def test_play_win_length(self):
+        simulator = BatchSimulator(50, 8, 9, seed=1, win_length=5)
+        simulator.play("no_ai", "random")
+        for game in range(50):
+            board = Board(8, 9, 5)
+            for index, column in enumerate(simulator.get_moves[game]):
+                if column >= 0:
+                    self.assertEqual(board.get_winner(), 0)
+                    board.make_move(int(column), 1 + index % 2)
+            self.assertEqual(board.get_winner(), simulator.get_winners[game])
+
+    def test_play_win_length_longer_than_a_side(self):
+        # lines only fit in one direction: the others must not be checked
+        for rows, columns in ((4, 9), (9, 4)):
+            simulator = BatchSimulator(20, rows, columns, seed=2, win_length=6)
+            simulator.play("no_ai", "random")
+            for game in range(20):
+                board = Board(rows, columns, 6)
+                for index, column in enumerate(simulator.get_moves[game]):
+                    if column >= 0:
+                        board.make_move(int(column), 1 + index % 2)
+                self.assertEqual(board.get_winner(), simulator.get_winners[game])
+        pieces = numpy.zeros((1, 4, 9), dtype=numpy.int8)
+        pieces[0, 0, 2:8] = 1
+        self.assertEqual(BatchSimulator.is_winning_move(pieces, 1, 6).tolist(), [True])
+        self.assertEqual(BatchSimulator.is_winning_move(pieces, 1, 7).tolist(), [False])
+        self.assertEqual(BatchSimulator.is_winning_move(pieces[:, :, :4], 1, 20).tolist(), [False])
+
+    def test_no_ai_wins_and_blocks(self):
+        simulator = BatchSimulator(2, seed=0)
+        games = numpy.arange(2)
+        simulator.drop_pieces(games, numpy.array([0, 0]), 2)
+        simulator.drop_pieces(games, numpy.array([0, 1]), 2)
+        simulator.drop_pieces(games, numpy.array([0, 2]), 2)
+        simulator.drop_pieces(games, numpy.array([6, 4]), 1)
+        simulator.drop_pieces(games, numpy.array([6, 5]), 1)
+        simulator.drop_pieces(games, numpy.array([6, 6]), 1)
+        available = simulator.get_available_locations(games)
+        self.assertEqual(simulator.choose_no_ai(games, 2, available).tolist(), [0, 3])  # win
+        self.assertEqual(simulator.choose_no_ai(games, 1, available).tolist(), [6, 3])  # win, then win over block
+
+
+class TestBenchmark(unittest.TestCase):
+    def setUp(self) -> None:
+        self._corpus = load_corpus()
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_corpus(self):
+        self.assertEqual({position["phase"] for position in self._corpus["positions"]},
+                         {"opening", "midgame", "endgame"})
+        for position in self._corpus["positions"]:
+            board = Board(self._corpus["rows"], self._corpus["columns"])
+            for index, column in enumerate(position["moves"]):
+                self.assertEqual(board.get_winner(), 0)
+                board.make_move(column, 1 + index % 2)
+            self.assertFalse(board.get_winner() != 0 or board.is_board_full())
+
+    def test_run_and_compare(self):
+        results = run_benchmark(self._corpus, depths=(1, 2), repeat=1, phases=["opening"])
+        self.assertEqual(len(results["search"]), 3 * 2)
+        self.assertGreater(results["totals"]["nodes_per_second"], 0)
+        self.assertEqual(find_regressions(results, results, 0.2), [])
+        faster = json.loads(json.dumps(results))
+        faster["totals"]["nodes_per_second"] *= 2
+        faster["calls_per_second"]["get_score"] *= 2
+        regressions = find_regressions(results, faster, 0.2)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("totals nodes_per_second"))
+        faster["corpus_version"] += 1
+        self.assertEqual(len(find_regressions(results, faster, 0.2)), 1)
+
+    def test_move_orderings(self):
+        results = benchmark_move_orderings(self._corpus, depth=5, phases=["opening", "midgame"])
+        nodes = {result["move_ordering"]: result["nodes"] for result in results}
+        self.assertLess(nodes["center"], nodes["none"])
+        self.assertLessEqual(nodes["history"], nodes["center"])
+        for result in results:
+            self.assertGreater(result["first_move_cutoff_rate"], 0.5)
+
+    def test_scaling(self):
+        small, large = benchmark_scaling(((6, 7), (20, 20)), repeat=1, number=500, depth=2)
+        self.assertEqual((large["rows"], large["columns"]), (20, 20))
+        # a move and its undo update the windows through one cell, at most 4 directions of win_length windows, not the
+        # whole board
+        for size in (small, large):
+            self.assertGreater(size["window_updates_per_move"], 0)
+            self.assertLessEqual(size["window_updates_per_move"], 2 * 4 * 4)
+
+    def test_startup(self):
+        startup = measure_startup(repeat=1, moves=[3, 3, 3], depth=3)
+        self.assertGreater(startup["import_seconds"], 0)
+        self.assertGreater(startup["first_move_seconds"], 0)
+        self.assertGreater(startup["process_seconds"], startup["import_seconds"] + startup["first_move_seconds"])
+        # the headless engine and the settings (before choosing an interface) load no optional dependency
+        source_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = "import sys, engine, settings.settings; print(' '.join(sys.modules))"
+        modules = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                 cwd=source_folder).stdout.split()
+        for module in ("pygame", "texttable", "numpy", "gui.gui", "ui.ui", "concurrent.futures.process",
+                       "game.parallel", "book.book"):
+            self.assertNotIn(module, modules)
+
+
+class TestGameRecords(unittest.TestCase):
+    def setUp(self) -> None:
+        self._folder = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._folder.name, "games.c4r")
+
+    def tearDown(self) -> None:
+        self._folder.cleanup()
+
+    def test_pack_moves(self):
+        self.assertEqual(pack_moves([6, 0, 3], 7), bytes([0b11000001, 0b10000000]))
+        self.assertEqual(len(pack_moves([3] * 42, 7)), 16)    # 3 bits per move
+        generator = random.Random(0)
+        for columns in (2, 7, 8, 9, 16, 20):
+            moves = [generator.randrange(columns) for _ in range(generator.randint(0, 60))]
+            packed = pack_moves(moves, columns)
+            self.assertEqual(unpack_moves(packed, len(moves), columns), moves)
+
+    def test_write_and_read(self):
+        generator = random.Random(1)
+        records = []
+        for number in range(50):
+            board = Board(6, 7)
+            for index in range(generator.randint(0, 42)):
+                board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+                if board.get_winner() != 0:
+                    break
+            result = {0: RECORD_DRAW if board.is_board_full() else UNFINISHED, 1: FIRST_WON, 2: SECOND_WON}[
+                board.get_winner()]
+            records.append(GameRecord([move[1] for move in board.get_moves()], result, "random" * (number % 2)))
+        with RecordWriter(self._path) as writer:
+            for record in records[:30]:
+                writer.write(record)
+        with RecordWriter(self._path) as writer:    # appends
+            for record in records[30:]:
+                writer.write(record)
+        self.assertEqual(list(read_records(self._path)), records)
+        with RecordIndex(self._path) as index:
+            self.assertEqual(len(index), 50)
+            self.assertEqual(index[37], records[37])
+            self.assertEqual(index[-1], records[-1])
+            with self.assertRaises(IndexError):
+                index[50]
+        with open(get_index_path(self._path), "rb") as file:
+            index_bytes = file.read()
+        self.assertEqual(build_index(self._path), 50)
+        with open(get_index_path(self._path), "rb") as file:
+            self.assertEqual(file.read(), index_bytes)
+
+        board = records[7].replay()
+        self.assertEqual([move[1] for move in board.get_moves()], records[7].moves)
+        self.assertEqual(board.get_moves()[0][2], 1)
+
+    def test_win_length(self):
+        record = GameRecord([0, 6, 1, 6, 2, 6, 3], FIRST_WON, "", 6, 7, 5)
+        self.assertEqual(GameRecord.from_bytes(record.to_bytes()), record)
+        self.assertNotEqual(GameRecord.from_bytes(record.to_bytes()), GameRecord(record.moves, FIRST_WON))
+        board = record.replay()
+        self.assertEqual(board.get_win_length, 5)
+        self.assertEqual(board.get_winner(), 0)     # 4 in a row does not win connect 5
+        self.assertEqual(record.replay(Board(6, 7, 5)).get_moves(), board.get_moves())
+        with self.assertRaises(ValueError):
+            record.replay(Board(6, 7))
+        with RecordWriter(self._path) as writer:
+            writer.write(record)
+        self.assertEqual(list(read_records(self._path)), [record])
+        # a position index of 4 in a row skips the game, one of 5 in a row has it
+        index_path = os.path.join(self._folder.name, "positions.c4p")
+        self.assertEqual(build_position_index(index_path, [self._path])[0], 0)
+        self.assertEqual(build_position_index(index_path, [self._path], win_length=5)[0], 1)
+        with PositionIndex(index_path) as index:
+            self.assertIsNone(index.probe(Board(6, 7)))
+            self.assertEqual(index.probe(Board(6, 7, 5)), (1, 1, 0, 0))
+
+    def test_older_version(self):
+        with open(self._path, "wb") as file:
+            file.write(FILE_HEADER.pack(b"C4GR", 1))
+        with self.assertRaises(ValueError):
+            RecordWriter(self._path)
+        with self.assertRaises(ValueError):
+            list(read_records(self._path))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_simulator_records(self):
+        simulator = BatchSimulator(20, seed=3)
+        statistics = simulator.play()
+        with RecordWriter(self._path) as writer:
+            for record in simulator.get_records("random/no_ai"):
+                writer.write(record)
+        records = list(read_records(self._path))
+        self.assertEqual(len(records), 20)
+        self.assertEqual(sum(record.result == FIRST_WON for record in records), statistics["first_wins"])
+        for record in records:
+            board = record.replay()
+            self.assertEqual(board.get_winner(), {FIRST_WON: 1, SECOND_WON: 2, RECORD_DRAW: 0}[record.result])
+
+    def test_position_index(self):
+        generator = random.Random(2)
+        records = []
+        for _ in range(60):
+            board = Board(6, 7)
+            while board.get_winner() == 0 and not board.is_board_full():
+                board.make_move(generator.choice(board.get_available_locations()[:3]), 1 + len(board.get_moves()) % 2)
+            result = {0: RECORD_DRAW, 1: FIRST_WON, 2: SECOND_WON}[board.get_winner()]
+            records.append(GameRecord([move[1] for move in board.get_moves()], result))
+        records.append(GameRecord([3, 3], UNFINISHED))
+        records.append(GameRecord([0, 1], FIRST_WON, rows=4, columns=5))     # other size, skipped
+        with RecordWriter(self._path) as writer:
+            for record in records[:30]:
+                writer.write(record)
+        other_path = os.path.join(self._folder.name, "more.c4r")
+        with RecordWriter(other_path) as writer:
+            for record in records[30:]:
+                writer.write(record)
+
+        expected = {}
+        board = Board(6, 7)
+        for record in records[:-1]:
+            keys = list(get_game_positions(record, board))
+            self.assertEqual(list(get_game_positions(record, board, Board(6, 7))), keys)
+            for key in keys:
+                entry = expected.setdefault(key, [0, 0, 0, 0])
+                entry[0] += 1
+                if record.result != UNFINISHED:
+                    entry[{FIRST_WON: 1, SECOND_WON: 2, RECORD_DRAW: 3}[record.result]] += 1
+
+        index_path = os.path.join(self._folder.name, "positions.c4p")
+        games, positions = build_position_index(index_path, [self._path, other_path], max_entries=100)
+        self.assertEqual((games, positions), (61, len(expected)))
+        with PositionIndex(index_path) as index:
+            self.assertEqual(len(index), len(expected))
+            self.assertEqual(index.probe(Board(6, 7)), (61, *expected[Board(6, 7).get_canonical_key()][1:]))
+            board = records[5].replay()
+            self.assertEqual(list(index.probe(board)), expected[board.get_canonical_key()])
+            mirror = Board(6, 7)
+            for move in records[5].moves:
+                mirror.make_move(6 - move, 1 + len(mirror.get_moves()) % 2)
+            self.assertEqual(index.probe(mirror), index.probe(board))
+            board = Board(6, 7)
+            board.make_move(3, 1)
+            board.make_move(4, 2)
+            self.assertIsNone(index.probe(board))
+            self.assertIsNone(index.probe(Board(4, 5)))
+
+
+class TestServer(unittest.TestCase):
+    @staticmethod
+    def run_with_server(scenario, **options):
+        async def run():
+            server = GameServer(**options)
+            await server.start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_protocol(self):
+        async def scenario(server):
+            client = await Client.connect("127.0.0.1", server.get_port)
+            response = await client.request("new", depth=2)
+            self.assertTrue(response["ok"])
+            game_id = response["game"]
+            self.assertEqual(response["state"]["status"], PLAYING)
+            response = await client.request("move", game=game_id, column=3)
+            self.assertEqual(response["human"], {"row": 0, "column": 3})
+            self.assertEqual(response["state"]["moves"], [3, response["computer"]["column"]])
+            self.assertEqual((await client.request("state", game=game_id))["state"], response["state"])
+            for request, error in (({"game": game_id, "column": 7}, "Invalid move! Must be an integer between 0 "
+                                                                   "and 6!"),
+                                   ({"game": 99, "column": 0}, "Unknown game!")):
+                response = await client.request("move", **request)
+                self.assertEqual((response["ok"], response["error"]), (False, error))
+            self.assertFalse((await client.request("fly"))["ok"])
+            for depth in (0, 11, "5"):
+                response = await client.request("new", depth=depth)
+                self.assertEqual((response["ok"], response["error"]),
+                                 (False, "Invalid depth! Must be an integer between 1 and 10!"))
+            response = await client.request("resign", game=game_id)
+            self.assertEqual(response["state"]["status"], RESIGNED)
+            self.assertEqual((await client.request("state", game=game_id))["error"], "Unknown game!")
+            stats = await client.request("stats")
+            self.assertEqual(stats["games"], 0)
+            self.assertEqual(stats["latency"]["move"]["count"], 3)
+            await client.close()
+        self.run_with_server(scenario)
+
+    @staticmethod
+    def block_search(server, game_id):
+        """
+        Make the computer moves of a game wait until the returned event is set, once they have set the other one
+        :return: tuple of (game, started, release events)
+        """
+        started = threading.Event()
+        release = threading.Event()
+        game = server.get_session({"game": game_id}, {game_id}).game
+        search = game.compute_computer_move
+
+        def blocked_search(ai):
+            started.set()
+            release.wait()
+            return search(ai)
+        game.compute_computer_move = blocked_search
+        return game, started, release
+
+    def test_slow_search_does_not_block_other_games(self):
+        async def scenario(server):
+            loop = asyncio.get_running_loop()
+            slow_client = await Client.connect("127.0.0.1", server.get_port)
+            client = await Client.connect("127.0.0.1", server.get_port)
+            slow_game = (await slow_client.request("new", depth=2))["game"]
+            game_id = (await client.request("new", depth=1))["game"]
+            _, started, release = self.block_search(server, slow_game)
+            slow_move = asyncio.ensure_future(slow_client.request("move", game=slow_game, column=3))
+            await loop.run_in_executor(None, started.wait)
+            for column in (0, 1, 2):
+                self.assertTrue((await client.request("move", game=game_id, column=column))["ok"])
+            # the games of another connection are unknown
+            for op in ("state", "move", "resign"):
+                response = await client.request(op, game=slow_game, column=0)
+                self.assertEqual((response["ok"], response["error"]), (False, "Unknown game!"))
+            self.assertFalse(slow_move.done())      # the other game was served during the search
+            release.set()
+            response = await slow_move
+            self.assertEqual(len(response["state"]["moves"]), 2)
+            await slow_client.close()
+            await client.close()
+        self.run_with_server(scenario, workers=2)
+
+    def test_close_waits_for_moves(self):
+        folder = tempfile.TemporaryDirectory()
+        path = os.path.join(folder.name, "games.c4r")
+
+        async def scenario(server):
+            loop = asyncio.get_running_loop()
+            client = await Client.connect("127.0.0.1", server.get_port)
+            game_id = (await client.request("new", depth=2))["game"]
+            game, started, release = self.block_search(server, game_id)
+            stop_search = game.stop_search
+
+            def release_search():   # closing stops the search, then waits for it
+                stop_search()
+                release.set()
+            game.stop_search = release_search
+            move = asyncio.ensure_future(client.request("move", game=game_id, column=3))
+            await loop.run_in_executor(None, started.wait)
+            await server.close()
+            self.assertTrue((await move)["ok"])
+            await client.close()
+        self.run_with_server(scenario, records_path=path)
+        # the game was recorded with the computer's move
+        self.assertEqual([len(record.moves) for record in read_records(path)], [2])
+        folder.cleanup()
+
+    def test_internal_error(self):
+        async def scenario(server):
+            def fail(request, owned):
+                raise RuntimeError("bug")
+            server.get_stats = fail
+            client = await Client.connect("127.0.0.1", server.get_port)
+            with self.assertLogs("server.server", "ERROR"):
+                response = await client.request("stats", id=1)
+            self.assertEqual(response, {"ok": False, "error": "Internal error!", "id": 1})
+            self.assertTrue((await client.request("new"))["ok"])     # the connection is still served
+            await client.close()
+        self.run_with_server(scenario)
+
+    def test_load(self):
+        async def scenario(server):
+            return await run_load("127.0.0.1", server.get_port, games=6, concurrency=3, depth=2, seed=0)
+        results = self.run_with_server(scenario)
+        self.assertEqual(sum(results["statuses"].values()), 6)
+        self.assertEqual(results["client_latency"]["new"]["count"], 6)
+        self.assertEqual(results["server_latency"]["resign"]["count"], 6)
+        self.assertLessEqual(results["server_latency"]["move"]["p50_ms"], results["server_latency"]["move"]["p99_ms"])
+
+
 class TestValidators(unittest.TestCase):
     def setUp(self) -> None:
         self._board = Board(6, 7)
@@ -149,6 +902,189 @@ class TestValidators(unittest.TestCase):
         with self.assertRaises(InputError) as ie:
             self._validator.validate_move(8)
         self.assertEqual(str(ie.exception), "Invalid move! Must be an integer between 0 and 6!\n")
+        self._validator.validate_move(6)
+        self._validator.validate_move(19, 20)
+        with self.assertRaises(InputError) as ie:
+            self._validator.validate_move(20, 20)
+        self.assertEqual(str(ie.exception), "Invalid move! Must be an integer between 0 and 19!\n")
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self._table = TranspositionTable(4)     # 2 buckets of 2 entries
+
+    def tearDown(self) -> None:
+        pass
+
+    def test_probe_and_store(self):
+        self.assertIsNone(self._table.probe(10))
+        self._table.store(10, 3, EXACT, 25, 4)
+        self.assertEqual(self._table.probe(10), (3, EXACT, 25, 4))
+        self._table.store(10, 4, LOWER_BOUND, 30, 2)
+        self.assertEqual(self._table.probe(10), (4, LOWER_BOUND, 30, 2))
+        self.assertEqual(self._table.get_statistics(), {"size": 4, "hits": 2, "misses": 1, "collisions": 0,
+                                                        "stores": 2})
+
+    def test_replacement(self):
+        self._table.store(0, 5, EXACT, 1, 0)
+        self._table.store(2, 1, EXACT, 2, 0)    # same bucket, shallower: goes to the always-replace entry
+        self._table.store(4, 2, EXACT, 3, 0)    # replaces it
+        self.assertEqual(self._table.probe(0), (5, EXACT, 1, 0))
+        self.assertIsNone(self._table.probe(2))
+        self.assertEqual(self._table.get_statistics()["collisions"], 1)     # misses do not count
+        self.assertEqual(self._table.probe(4), (2, EXACT, 3, 0))
+        self._table.store(6, 5, EXACT, 4, 0)    # as deep: replaces the depth-preferred entry
+        self.assertIsNone(self._table.probe(0))
+        self.assertEqual(self._table.get_statistics()["collisions"], 2)
+        self._table.clear()
+        self.assertIsNone(self._table.probe(6))
+
+
+class TestMonteCarloTreeSearch(unittest.TestCase):
+    def setUp(self) -> None:
+        self._board = Board(6, 7)
+
+    def tearDown(self) -> None:
+        pass
+
+    def play(self, moves):
+        for index, column in enumerate(moves):
+            self._board.make_move(column, 1 + index % 2)
+
+    def test_playouts(self):
+        self.play([0, 6, 1, 6, 2])      # piece 2 to move, piece 1 wins on column 3
+        player, opponent, mask = self._board.get_bitboard(2), self._board.get_bitboard(1), self._board.get_mask()
+        playouts = Playouts(6, 7, policy=NO_AI, seed=0)
+        self.assertTrue(playouts.has_line(opponent | playouts.get_column_move(mask, 3)))
+        self.assertFalse(playouts.has_line(opponent))
+        self.assertEqual(playouts.play(opponent, player, mask), 1)     # the winning cell is always taken
+        results = {Playouts(6, 7, policy=RANDOM, seed=seed).play(player, opponent, mask) for seed in range(20)}
+        self.assertTrue(results <= {-1, 0, 1})
+        self.assertIn(-1, results)
+        full = Board(2, 2)
+        for column in (0, 1, 0, 1):
+            full.make_move(column, 1 + column)
+        self.assertEqual(Playouts(2, 2, 3).play(full.get_bitboard(1), full.get_bitboard(2), full.get_mask()), 0)
+
+    def test_search(self):
+        self.play([0, 6, 1, 6, 2, 5])   # piece 1 wins on column 3
+        tree_search = MonteCarloTreeSearch(6, 7, playouts=500, seed=0)
+        column, win_rate = tree_search.search(self._board, 1)
+        self.assertEqual(column, 3)
+        self.assertGreater(win_rate, 0.9)
+        statistics = tree_search.get_statistics()
+        self.assertEqual(statistics["playouts"], 500)
+        self.assertEqual(statistics["nodes"], tree_search.get_number_of_nodes)
+        self.assertGreater(statistics["playouts_per_second"], 0)
+        column, win_rate = tree_search.search(self._board, 2)   # piece 2 must block it
+        self.assertEqual(column, 3)
+
+    def test_search_workers(self):
+        self.play([3])
+        tree_search = MonteCarloTreeSearch(6, 7, playouts=200, workers=2, batch_size=16, policy=NO_AI, seed=0)
+        try:
+            column, win_rate = tree_search.search(self._board, 2)
+        finally:
+            tree_search.close()
+        self.assertTrue(self._board.is_valid_column(column))
+        self.assertTrue(0 <= win_rate <= 1)
+        self.assertEqual(tree_search.get_statistics()["playouts"], 200)
+
+    def test_game_strategy(self):
+        game = Game(self._board, ValidateBoard, endgame_threshold=0, search_statistics=True, strategy="mcts",
+                    mcts_playouts=300)
+        self.play([0, 3, 0, 3, 0])      # the computer must block column 0
+        self.assertEqual(game.get_ai_column(), 0)
+        self.assertEqual(game.get_tree_search_statistics()["playouts"], 300)
+        self.assertEqual(game.get_search_statistics().playouts, 300)
+        self.assertGreater(game.get_search_statistics().get_playouts_per_second(), 0)
+        game.close()
+
+
+class TestEndgameSolver(unittest.TestCase):
+    def setUp(self) -> None:
+        self._solver = EndgameSolver(6, 7)
+
+    def tearDown(self) -> None:
+        pass
+
+    @staticmethod
+    def play(board, moves):
+        for index, column in enumerate(moves):
+            board.make_move(column, 1 + index % 2)
+        return board
+
+    def test_solve(self):
+        board = self.play(Board(6, 7), [1, 0, 2, 0, 6, 0, 5])
+        self.assertEqual(self._solver.solve(board, 2), (0, WIN, 1))
+        board = self.play(Board(6, 7), [1, 6, 2, 6, 3])     # two winning cells for the player
+        self.assertEqual(self._solver.solve(board, 2)[1:], (LOSS, 2))
+        board.drop_piece_on_board(5, 5, 7)
+        self.assertIsNone(self._solver.solve(board, 2))
+        self.assertIsNone(self._solver.solve(Board(4, 4), 1))
+        board = self.play(Board(4, 4), [0, 0, 0, 2, 1, 2, 2, 1, 0, 3, 3, 1, 2, 3, 3, 1])    # full, drawn
+        self.assertIsNone(EndgameSolver(4, 4).solve(board, 1))
+
+    def test_solve_matches_minimax(self):
+        generator = random.Random(3)
+        solver = EndgameSolver(4, 4, 256)
+        for _ in range(20):
+            board = Board(4, 4)
+            for index in range(generator.randint(8, 12)):
+                board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+                if board.get_winner() != 0:
+                    board.undo_move()
+                    break
+            if len(board.get_moves()) % 2 == 0:     # computer to move
+                board.make_move(board.get_available_locations()[0], 1)
+                if board.get_winner() != 0 or board.is_board_full():
+                    continue
+            game = Game(board.get_board_copy(), ValidateBoard, 0)
+            score = game.minimax_alpha_beta_pruning(16, -math.inf, math.inf, True)[1]
+            column, outcome, distance = solver.solve(board, 2)
+            self.assertEqual(outcome, WIN if score > 0 else LOSS if score < 0 else DRAW)
+            self.assertLessEqual(distance, board.get_number_of_empty_cells())
+            board.make_move(column, 2)
+            if board.get_winner() == 0 and not board.is_board_full():
+                score_after = Game(board, ValidateBoard, 0).minimax_alpha_beta_pruning(16, -math.inf, math.inf,
+                                                                                        False)[1]
+                self.assertEqual(score_after > 0, score > 0)    # the solver's column keeps the result
+
+    def test_solve_win_length(self):
+        generator = random.Random(6)
+        for rows, columns, length in ((4, 5, 3), (5, 5, 5)):
+            solver = EndgameSolver(rows, columns, 256, length)
+            for _ in range(10):
+                board = Board(rows, columns, length)
+                for index in range(generator.randint(rows * columns - 10, rows * columns - 7)):
+                    board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+                    if board.get_winner() != 0:
+                        board.undo_move()
+                        break
+                if len(board.get_moves()) % 2 == 0:     # computer to move
+                    board.make_move(board.get_available_locations()[0], 1)
+                    if board.get_winner() != 0 or board.is_board_full():
+                        continue
+                game = Game(board.get_board_copy(), ValidateBoard, 0, mirror_symmetry=False)
+                score = game.minimax_alpha_beta_pruning(rows * columns, -math.inf, math.inf, True)[1]
+                column, outcome, distance = solver.solve(board, 2)
+                self.assertEqual(outcome, WIN if score > 0 else LOSS if score < 0 else DRAW)
+        self.assertIsNone(EndgameSolver(6, 7).solve(Board(6, 7, 5), 2))
+
+    def test_move_computer_endgame(self):
+        generator = random.Random(7)
+        board = Board(6, 7)
+        while len(board.get_moves()) < 31 or board.get_winner() != 0:   # 11 empty cells, computer to move
+            board.create_new_board()
+            for index in range(31):
+                board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+                if board.get_winner() != 0:
+                    break
+        game = Game(board, ValidateBoard, endgame_threshold=12, search_statistics=True)
+        self.assertIsNotNone(game.solve_endgame())
+        game.move_computer(ai=True)
+        self.assertIn("endgame", game.get_search_statistics().phases)
+        self.assertIsNone(Game(Board(6, 7), ValidateBoard).solve_endgame())
 
 
 class TestGame(unittest.TestCase):
@@ -191,6 +1127,241 @@ class TestGame(unittest.TestCase):
         self.assertEqual(board.get_board_value(5, 5), 1)
         self.assertFalse(self._game.move_human(5))
 
+    def test_transposition_table(self):
+        board = Board(6, 7)
+        for index, column in enumerate([3, 2, 3, 3, 4, 4, 1, 5]):
+            board.drop_piece_on_board(board.get_next_available_row(column), column, 1 + index % 2)
+        score_without_table = Game(board.get_board_copy(), ValidateBoard, 0).minimax_alpha_beta_pruning(
+            4, -math.inf, math.inf, True)[1]
+        game = Game(board.get_board_copy(), ValidateBoard, 1024)
+        self.assertEqual(game.minimax_alpha_beta_pruning(4, -math.inf, math.inf, True)[1], score_without_table)
+        statistics = game.get_transposition_statistics()
+        self.assertEqual(statistics["size"], 1024)
+        self.assertGreater(statistics["hits"], 0)
+        self.assertGreater(statistics["stores"], 0)
+        self.assertIsNone(Game(board, ValidateBoard, 0).get_transposition_statistics())
+
+    def test_search_does_not_allocate(self):
+        board = Board(6, 7)
+        for index, column in enumerate([3, 2, 3, 3, 4, 4, 1, 5]):
+            board.make_move(column, 1 + index % 2)
+        moves = list(board.get_moves())
+        position_hash = board.get_hash()
+        game = Game(board, ValidateBoard, 0)
+        game.minimax_alpha_beta_pruning(1, -math.inf, math.inf, True)
+        tracemalloc.start()
+        game.minimax_alpha_beta_pruning(5, -math.inf, math.inf, True)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertLess(peak, 16 * 1024)    # no boards or games are created per node
+        self.assertEqual(board.get_moves(), moves)
+        self.assertEqual(board.get_hash(), position_hash)
+
+    def test_iterative_deepening(self):
+        board = Board(6, 7)
+        for index, column in enumerate([3, 2, 3, 3, 4, 4, 1, 5]):
+            board.make_move(column, 1 + index % 2)
+        expected_score = Game(board.get_board_copy(), ValidateBoard, 0).minimax_alpha_beta_pruning(
+            4, -math.inf, math.inf, True)[1]
+        game = Game(board, ValidateBoard)
+        column, score, depth = game.iterative_deepening(4)
+        self.assertEqual((score, depth), (expected_score, 4))
+        self.assertIn(column, board.get_available_locations())
+
+    def test_iterative_deepening_time_budget(self):
+        board = Board(6, 7)
+        board.make_move(3, 1)
+        moves = list(board.get_moves())
+        game = Game(board, ValidateBoard)
+        start = time.perf_counter()
+        column, score, depth = game.iterative_deepening(42, 50)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertGreaterEqual(depth, 1)
+        self.assertLess(depth, 42)
+        self.assertIn(column, board.get_available_locations())
+        self.assertEqual(board.get_moves(), moves)  # abandoned search took back its moves
+
+    def test_compute_computer_move(self):
+        game = Game(Board(6, 7), ValidateBoard, search_depth=4)
+        for index, column in enumerate([3, 3, 2, 4, 1]):
+            game.get_board.make_move(column, 1 + index % 2)
+        moves = list(game.get_board.get_moves())
+        for ai in (True, False):
+            column = game.compute_computer_move(ai)
+            self.assertIn(column, (0, 4))  # stop the line of 3 on the bottom row
+            self.assertEqual(game.get_board.get_moves(), moves)
+        game.play_computer_move(0)
+        self.assertEqual(game.get_board.get_last_move(), (0, 0, 2))
+
+    def test_stop_search(self):
+        # every search stops, the way the user interface quits in the middle of a computer move
+        for options in ({}, {"search_workers": 2}, {"endgame_threshold": 42},
+                        {"strategy": MCTS, "mcts_playouts": 0, "search_time_ms": 60000},
+                        {"strategy": MCTS, "mcts_playouts": 0, "search_time_ms": 60000, "search_workers": 2}):
+            with self.subTest(**options):
+                board = Board(6, 7)
+                board.make_move(3, 1)
+                moves = list(board.get_moves())
+                game = Game(board, ValidateBoard, search_depth=42, **{"endgame_threshold": 0, **options})
+                executor = ThreadPoolExecutor(max_workers=1)
+                future = executor.submit(game.compute_computer_move, True)
+                time.sleep(0.5)
+                start = time.perf_counter()
+                game.stop_search()
+                executor.shutdown(cancel_futures=True)
+                game.close()
+                self.assertLess(time.perf_counter() - start, 2)
+                self.assertIn(future.result(), board.get_available_locations())
+                self.assertEqual(board.get_moves(), moves)
+
+    def test_pondering(self):
+        game = Game(Board(6, 7), ValidateBoard, search_depth=4, endgame_threshold=0, search_statistics=True,
+                    ponder=True)
+        board = game.get_board
+        for index, column in enumerate([3, 3, 2]):
+            board.make_move(column, 1 + index % 2)
+        moves = list(board.get_moves())
+        game.start_pondering()
+        game.stop_pondering()
+        self.assertFalse(game.get_ponderer.is_running())
+        self.assertEqual(board.get_moves(), moves)
+
+        game.start_pondering()
+        self.assertTrue(game.get_ponderer.join(30))
+        board.make_move(6, 1)
+        pondered = game.get_ponderer.get_result(board)
+        self.assertEqual(pondered[2], 4)
+        expected = Game(board.get_board_copy(), ValidateBoard).iterative_deepening(4)
+        self.assertEqual(pondered[1], expected[1])
+        self.assertEqual(game.compute_computer_move(True), pondered[0])
+        self.assertNotIn("search", game.get_search_statistics().phases)    # answered without searching
+        game.close()
+        self.assertFalse(game.get_ponderer.is_running())
+
+        # stopping does not wait for the deep search running at the time
+        game = Game(Board(6, 7), ValidateBoard, search_depth=20, endgame_threshold=0, ponder=True)
+        game.get_board.make_move(3, 2)
+        game.start_pondering()
+        board = game.get_board.get_board_copy()
+        board.make_move(0, 1)   # the last reply pondered: every reply has been searched at depth 9
+        while (game.get_ponderer.get_result(board) or (None, 0, 0))[2] < 9:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        game.stop_pondering()
+        self.assertLess(time.perf_counter() - start, 0.1)
+        self.assertEqual(len(game.get_board.get_moves()), 1)
+        game.close()
+
+    def test_mirror_symmetry(self):
+        # the heuristic scores of mirrored positions differ, so the search finds the same scores with or without
+        generator = random.Random(5)
+        games = [Game(Board(6, 7), ValidateBoard, 1024, endgame_threshold=0, mirror_symmetry=mirror_symmetry)
+                 for mirror_symmetry in (False, True)]
+        for _ in range(10):
+            board = Board(6, 7)
+            for index in range(generator.randint(0, 12)):
+                board.make_move(generator.choice(board.get_available_locations()), 1 + index % 2)
+                if board.get_winner() != 0:
+                    board.undo_move()
+                    break
+            moves = [move[1] for move in board.get_moves()]
+            scores = []
+            # the mirror image first, so the table holds the results of both
+            for game, columns in ((games[0], moves), (games[1], [6 - move for move in moves]), (games[1], moves)):
+                board = game.get_board
+                board.create_new_board()
+                for index, column in enumerate(columns):
+                    board.make_move(column, 1 + index % 2)
+                scores.append(game.minimax_alpha_beta_pruning(4, -math.inf, math.inf, True)[1])
+            self.assertEqual(scores[2], scores[0])
+
+        # a won position is answered from the entry of its mirror image, with the column mirrored
+        game = Game(Board(6, 7), ValidateBoard, 1024, endgame_threshold=0)
+        board = game.get_board
+        for column, piece in ((1, 2), (1, 1), (2, 2), (2, 1), (3, 2), (6, 1)):
+            board.make_move(column, piece)
+        column, score = game.minimax_alpha_beta_pruning(3, -math.inf, math.inf, True)
+        self.assertEqual(score, WINNING_SCORE)
+        stores = game.get_transposition_statistics()["stores"]
+        board.create_new_board()
+        for column_played, piece in ((5, 2), (5, 1), (4, 2), (4, 1), (3, 2), (0, 1)):
+            board.make_move(column_played, piece)
+        self.assertEqual(game.minimax_alpha_beta_pruning(3, -math.inf, math.inf, True), (6 - column, score))
+        self.assertEqual(game.get_transposition_statistics()["stores"], stores)
+        # other positions are searched again
+        board.create_new_board()
+        board.make_move(1, 1)
+        game.minimax_alpha_beta_pruning(3, -math.inf, math.inf, True)
+        stores = game.get_transposition_statistics()["stores"]
+        board.create_new_board()
+        board.make_move(5, 1)
+        game.minimax_alpha_beta_pruning(3, -math.inf, math.inf, True)
+        self.assertGreater(game.get_transposition_statistics()["stores"], stores)
+
+    def test_move_ordering(self):
+        board = Board(6, 7)
+        self.assertEqual(Game(board, ValidateBoard, move_ordering="none").order_moves([0, 1, 2, 3, 4, 5, 6], True),
+                         [0, 1, 2, 3, 4, 5, 6])
+        game = Game(board, ValidateBoard, move_ordering="center")
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], True), [3, 2, 4, 1, 5, 0, 6])
+        self.assertEqual(game.order_moves([0, 1, 5, 6], True, (None, 6)), [6, 1, 5, 0])
+        game = Game(board, ValidateBoard, move_ordering="history")
+        game.add_cutoff(0, 2, 3)
+        game.add_cutoff(6, 2, 1)
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], True), [6, 0, 3, 2, 4, 1, 5])
+        self.assertEqual(game.order_moves([1, 2, 3, 4, 5, 6], True), [6, 3, 2, 4, 1, 5])
+        board.make_move(3, 1)   # another ply: no killer moves, only the history of the piece
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], True), [0, 6, 3, 2, 4, 1, 5])
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], False), [3, 2, 4, 1, 5, 0, 6])
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], True, (5,), False), [5, 3, 2, 4, 1, 0, 6])
+        game.age_history()
+        self.assertEqual(game.order_moves([0, 1, 2, 3, 4, 5, 6], True), [0, 3, 2, 4, 1, 5, 6])
+
+        # every ordering finds the same score
+        scores = set()
+        for ordering in ("none", "center", "killer", "history"):
+            game = Game(Board(6, 7), ValidateBoard, 0, move_ordering=ordering, mirror_symmetry=False)
+            for index, column in enumerate([3, 2, 3, 3, 4]):
+                game.get_board.make_move(column, 1 + index % 2)
+            scores.add(game.minimax_alpha_beta_pruning(4, -math.inf, math.inf, True)[1])
+        self.assertEqual(len(scores), 1)
+
+    def test_parallel_search(self):
+        game = Game(Board(6, 7), ValidateBoard, search_workers=2)
+        try:
+            for index, column in enumerate([3, 2, 3, 3, 4]):
+                game.get_board.make_move(column, 1 + index % 2)
+                serial_game = Game(game.get_board.get_board_copy(), ValidateBoard)
+                self.assertEqual(game.iterative_deepening(4), serial_game.iterative_deepening(4))
+        finally:
+            game.close()
+
+    def test_search_statistics(self):
+        self.assertIsNone(self._game.get_search_statistics())
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "statistics.json")
+            game = Game(Board(6, 7), ValidateBoard, 0, search_depth=4, statistics_file=path)
+            game.get_board.make_move(3, 1)
+            game.move_computer(ai=True)
+            statistics = game.get_search_statistics()
+            self.assertEqual(statistics.nodes[0], 4)    # the root is searched once at every depth
+            self.assertEqual([iteration["depth"] for iteration in statistics.iterations], [1, 2, 3, 4])
+            self.assertEqual(sum(iteration["nodes"] for iteration in statistics.iterations),
+                             statistics.get_total_nodes())
+            self.assertGreater(statistics.leaf_evaluations, 0)
+            self.assertLessEqual(statistics.leaf_evaluations + statistics.terminal_nodes, statistics.get_total_nodes())
+            self.assertGreater(sum(statistics.beta_cutoffs) + sum(statistics.alpha_cutoffs), 0)
+            self.assertGreater(statistics.get_first_move_cutoff_rate(), 0.5)
+            self.assertGreater(statistics.get_effective_branching_factor(), 1)
+            self.assertIn("search", statistics.phases)
+            game.move_human(0)
+            game.move_computer(ai=True)
+            with open(path) as file:
+                lines = [json.loads(line) for line in file]
+            self.assertEqual(len(lines), 2)
+            self.assertEqual(lines[-1], json.loads(statistics.to_json()))
+            self.assertEqual(game.get_board.get_moves()[-1][1], lines[-1]["column"])
+
     def test_move_computer(self):
         self._game.move_computer(ai=True)
         self._game.move_computer(ai=False)
@@ -15,8 +15,9 @@ class Ui:
     def read_move(self):
         while True:
             try:
-                column = input("Input column on which you wish to make a move (0-6): ")
-                self._valid.validate_move(column)
+                column = input("Input column on which you wish to make a move (0-" +
+                               str(self._board.get_number_of_columns - 1) + "): ")
+                self._valid.validate_move(column, self._board.get_number_of_columns)
                 return int(column)
             except InputError as ie:
                 print(str(ie))
@@ -26,6 +27,8 @@ class Ui:
         print("Let's play! Human starts!")
         turn = self._player
         game_over = False
+        if self._ai:
+            self._game.start_pondering()    # think about the computer's answers while the human chooses
         while not game_over:
             print(self._board.__str__())
             if turn == self._player:
@@ -34,19 +37,22 @@ class Ui:
                 if make_move is not False:  # if the human player made a move, switch turns
                     turn += 1
                     turn = turn % 2
-                if self._board.is_winning_move(self._player_piece):
+                if self._board.get_winner() == self._player_piece:
                     print(self._board.__str__())
                     print("Congrats! You win!")
                     game_over = True
             else:
                 self._game.move_computer(self._ai)
-                if self._board.is_winning_move(self._computer_piece):
+                if self._board.get_winner() == self._computer_piece:
                     print(self._board.__str__())
                     print("Computer wins!")
                     game_over = True
                 turn += 1                  # switch turns
                 turn = turn % 2
-            if self._board.is_board_full is True:
+                if self._ai and not game_over:
+                    self._game.start_pondering()
+            if not game_over and self._board.is_board_full():
                 print(self._board.__str__())
                 print("It's draw!")
                 game_over = True
+        self._game.stop_pondering()
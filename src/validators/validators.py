@@ -6,10 +6,11 @@ class ValidateBoard:
     Class that validates a new move from human
     """
     @staticmethod
-    def validate_move(move):
+    def validate_move(move, number_of_columns=7):
+        message = "Invalid move! Must be an integer between 0 and " + str(number_of_columns - 1) + "!\n"
         try:
             move = int(move)
         except ValueError:
-            raise InputError("Invalid move! Must be an integer between 0 and 6!\n")
-        if int(move) < 0 or int(move) > 6:
-            raise InputError("Invalid move! Must be an integer between 0 and 6!\n")
+            raise InputError(message)
+        if int(move) < 0 or int(move) >= number_of_columns:
+            raise InputError(message)